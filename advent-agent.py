@@ -1,93 +1,371 @@
+import argparse
 import asyncio
-from dataclasses import dataclass
+import json
+import os
 from typing import Optional
 # customized
 from loop import run_demo_loop
 
-import pexpect
-from pexpect.replwrap import REPLWrapper
-
 from agents import Agent, Runner, RunContextWrapper, function_tool #, run_demo_loop
 
-# ---------- Node REPL manager (pexpect) ----------
-
-@dataclass
-class AdventSession:
-    repl: Optional[REPLWrapper] = None
-    proc: Optional[pexpect.spawn] = None
-
-    def start(self) -> None:
-        # Start a fresh Node REPL
-        # - 'node' uses '> ' as the prompt and '... ' for multiline continuation
-        # - We don't change the prompt (prompt_change=None)
-        game = "/usr/local/cellar/open-adventure/1.20/bin/advent"
-        self.proc = pexpect.spawn(game, encoding="utf-8", timeout=10)
-        self.repl = REPLWrapper(self.proc, orig_prompt="> ", prompt_change=None, continuation_prompt="... ")
-        # Small sanity check
-        # _ = self.repl.run_command("process.version")
-
-    def stop(self) -> None:
-        if self.proc is not None:
-            try:
-                self.proc.sendline(".exit")
-                self.proc.expect(pexpect.EOF, timeout=2)
-            except Exception:
-                try:
-                    self.proc.terminate(force=True)
-                except Exception:
-                    pass
-        self.repl = None
-        self.proc = None
-
-    def ensure_running(self) -> None:
-        if self.repl is None or self.proc is None or not self.proc.isalive():
-            self.stop()
-            self.start()
-
-    def eval(self, command: str) -> str:
-        """
-        Send the command to the game and return the response
-        """
-        self.ensure_running()
-        out = self.repl.run_command(command, timeout=15)
-        return out.strip()
-
-
-# A singleton session for this process
-ADVENT = AdventSession()
+from advent_aio import AsyncAdventSession, Checkpoint
+from advent_parser import EVENTS, StateTracker, parse
+from advent_session import SessionPool
+from advent_vocab import awaiting_answer, check, is_command, rejection
+import cassette
+from cave_map import MapStore
+from interning import DescriptionStore
+from journal import JournalStore
+from metrics import METRICS
+from procio import PipelineEOF, PipelineTimeout
+from tracing import TRACER, span
+
+# One warm game per conversation, with spares ready for new players and resets.
+# Commands are journaled to disk so a crashed game (or copilot) picks up where
+# it left off (ADVENT_JOURNAL=0 to turn this off); in the terminal only with --resume
+POOL = SessionPool(
+    size=int(os.environ.get("ADVENT_POOL_SIZE", "2")),
+    factory=AsyncAdventSession,
+    journals=JournalStore() if os.environ.get("ADVENT_JOURNAL", "1") != "0" else None,
+)
+
+# Room graph per conversation, learned from game_eval traffic
+MAPS = MapStore()
+
+# Seconds a game_eval_batch or game_fork may take, per command
+BATCH_TIMEOUT = float(os.environ.get("ADVENT_BATCH_TIMEOUT", "15"))
+
+# Check commands against the advent vocabulary before sending them (ADVENT_VALIDATE=0 to skip)
+VALIDATE = os.environ.get("ADVENT_VALIDATE", "1") != "0"
+
+# Named checkpoints per conversation, with the map position they were taken at
+CHECKPOINTS: dict[str, dict[str, tuple[Checkpoint, Optional[str]]]] = {}
+
+# Descriptions the model has already seen, sent again as short references
+SEEN = DescriptionStore()
+
+# Parsed game state per conversation (location, objects, inventory, score...)
+STATES: dict[str, StateTracker] = {}
+
+
+def _state(sid: str) -> StateTracker:
+    return STATES.setdefault(sid, StateTracker())
+
+
+def _key(ctx: RunContextWrapper) -> str:
+    # the server passes a run context with the player's session_id;
+    # otherwise session_id is set when a Session is passed to the runner
+    return getattr(ctx.context, "session_id", None) or getattr(ctx, "session_id", "default")
 
 
 # ---------- Agent tools ----------
 
 @function_tool
-def game_reset(ctx: RunContextWrapper[None]) -> str:
+async def game_reset(ctx: RunContextWrapper[None]) -> str:
     """
     Restart the Node.js REPL subprocess. Use if the session gets into a bad state
     (e.g., infinite loop) or to clear context.
     """
-    try:
-        ADVENT.stop()
-        ADVENT.start()
-        return "Game REPL restarted."
-    except Exception as e:
-        return f"Failed to restart Game REPL: {e!r}"
+    with span("game_reset", "tool"):
+        try:
+            await asyncio.to_thread(POOL.reset, _key(ctx))
+            MAPS.restarted(_key(ctx))
+            STATES.pop(_key(ctx), None)
+            return "Game REPL restarted."
+        except Exception as e:
+            return f"Failed to restart Game REPL: {e!r}"
 
 
 @function_tool
-def game_eval(ctx: RunContextWrapper[None], code: str) -> str:
+async def game_eval(ctx: RunContextWrapper[None], code: str) -> str:
     """
     Run command in the Game REPL and return the output as text.
 
     Args:
         code: JavaScript source to evaluate (single or multi-line).
     """
+    with span("game_eval", "tool", command=code):
+        try:
+            session = await asyncio.to_thread(POOL.acquire, _key(ctx))
+            if VALIDATE and not awaiting_answer(session.last_response):
+                canonical, unknown = check(code)
+                if unknown:
+                    METRICS.count("vocab.round_trips_avoided")
+                    return json.dumps(rejection(code, unknown))
+                code = canonical or code
+            out = await session.eval(code)
+            MAPS.observe(_key(ctx), code, out)
+            _state(_key(ctx)).observe(out)
+            return SEEN.shrink(_key(ctx), out)
+        except asyncio.TimeoutError:
+            return "Timed out waiting for REPL output. You may try node_reset()."
+        except Exception as e:
+            return f"REPL error: {e!r}"
+
+
+@function_tool
+async def game_eval_batch(
+    ctx: RunContextWrapper[None], commands: list[str], stop_on: Optional[list[str]] = None
+) -> str:
+    """
+    Run several game commands in order in one call and return a JSON list
+    with one {command, output, ...state} entry per command that ran; the
+    state fields (location, objects, score, events...) appear only when the
+    response mentions them. After an error, commands the game received but
+    did not answer are listed under "sent_no_response" and commands never
+    sent under "skipped".
+
+    Args:
+        commands: Game commands, e.g. ["get lamp", "east", "get keys"].
+        stop_on: Stop before the next command once a response reports one of
+            these events: "death", "unknown_word", "darkness".
+    """
+    sid = _key(ctx)
+    stop = set(stop_on or ()) & EVENTS.keys()
+    results: list[dict] = []
+    sent = 0  # commands written to the game, answered or not
+    error: Optional[str] = None
+    try:
+        session = await asyncio.to_thread(POOL.acquire, sid)
+        if VALIDATE and not awaiting_answer(session.last_response):
+            checked = [check(c) for c in commands]
+            unknown = {w: s for _, bad in checked for w, s in bad.items()}
+            if unknown:
+                METRICS.count("vocab.round_trips_avoided")
+                return json.dumps(rejection(" / ".join(commands), unknown))
+            commands = [canonical or c for c, (canonical, _) in zip(commands, checked)]
+        if stop:
+            # later commands depend on earlier responses: one at a time
+            for command in commands:
+                sent += 1
+                out = await session.eval(command)
+                results.append({"command": command, "output": out, **parse(out).compact()})
+                if stop.intersection(results[-1].get("events", ())):
+                    break
+        else:
+            sent = len(commands)
+            try:
+                outputs = await session.eval_many(commands, timeout=BATCH_TIMEOUT * max(1, len(commands)))
+            except PipelineTimeout as e:
+                outputs, sent = e.responses, e.sent
+                error = "Timed out waiting for REPL output. You may try game_reset()."
+            except PipelineEOF as e:
+                # what the command that ended the game printed on its way out
+                outputs, sent = e.responses + ([e.partial] if e.partial else []), e.sent
+                error = "The game exited; the next command starts a new one."
+            results = [{"command": c, "output": o, **parse(o).compact()} for c, o in zip(commands, outputs)]
+    except asyncio.TimeoutError:
+        error = "Timed out waiting for REPL output. You may try game_reset()."
+    except Exception as e:
+        error = f"REPL error: {e!r}"
+    for r in results:
+        MAPS.observe(sid, r["command"], r["output"])
+        _state(sid).observe(r["output"])
+        r["output"] = SEEN.shrink(sid, r["output"])
+    # the game has these, and may still act on them, but never answered
+    unanswered = commands[len(results):sent]
+    if error is not None:
+        results.append({"error": error})
+    if unanswered:
+        results.append({"sent_no_response": unanswered})
+    skipped = commands[sent:]
+    if skipped:
+        results.append({"skipped": skipped})
+    return json.dumps(results)
+
+
+@function_tool
+async def game_checkpoint(ctx: RunContextWrapper[None], name: str) -> str:
+    """
+    Save the current game position under a name so it can be restored later
+    with game_restore (e.g. before trying something dangerous).
+
+    Args:
+        name: Name for the checkpoint.
+    """
+    sid = _key(ctx)
+    session = await asyncio.to_thread(POOL.acquire, sid)
+    CHECKPOINTS.setdefault(sid, {})[name] = (session.checkpoint(name), MAPS.get(sid).current)
+    return f"Checkpoint {name!r} saved after {len(session.journal)} commands."
+
+
+@function_tool
+async def game_restore(ctx: RunContextWrapper[None], name: str) -> str:
+    """
+    Put the game back to a checkpoint saved with game_checkpoint, e.g. after
+    dying or getting stuck.
+
+    Args:
+        name: Name of the checkpoint.
+    """
+    sid = _key(ctx)
+    saved = CHECKPOINTS.get(sid, {}).get(name)
+    if saved is None:
+        return f"No checkpoint named {name!r}. Known: {sorted(CHECKPOINTS.get(sid, {}))}"
+    checkpoint, room = saved
+    try:
+        session = await asyncio.to_thread(POOL.reset, sid)
+        same = await session.restore(checkpoint)
+    except asyncio.TimeoutError:
+        return "Timed out replaying the checkpoint. You may try game_reset()."
+    except Exception as e:
+        return f"REPL error: {e!r}"
+    MAPS.get(sid).current = room
+    STATES.pop(sid, None)
+    _state(sid).observe(session.last_response)
+    note = "" if same else "\n(Random events played out differently; look around before relying on it.)"
+    return f"Restored {name!r}.{note}\n{SEEN.shrink(sid, session.last_response)}"
+
+
+@function_tool
+async def game_fork(ctx: RunContextWrapper[None], name: str, commands: list[str]) -> str:
+    """
+    Try commands from a checkpoint in a separate scratch game and return what
+    happened, without touching the real game.
+
+    Args:
+        name: Name of the checkpoint to start from.
+        commands: Commands to try, in order.
+    """
+    sid = _key(ctx)
+    saved = CHECKPOINTS.get(sid, {}).get(name)
+    if saved is None:
+        return f"No checkpoint named {name!r}. Known: {sorted(CHECKPOINTS.get(sid, {}))}"
+    scratch = f"{sid}#fork"
+    try:
+        session = await asyncio.to_thread(POOL.acquire, scratch)
+        await session.restore(saved[0])
+        outputs = await session.eval_many(commands, timeout=BATCH_TIMEOUT * max(1, len(commands)))
+    except asyncio.TimeoutError:
+        return "Timed out in the scratch game."
+    except Exception as e:
+        return f"REPL error: {e!r}"
+    finally:
+        await asyncio.to_thread(POOL.release, scratch)
+    return json.dumps([{"command": c, "output": o} for c, o in zip(commands, outputs)])
+
+
+@function_tool
+def game_map(ctx: RunContextWrapper[None], room: str = "") -> str:
+    """
+    Show what is known about the cave map: the current room and its exits,
+    or the exits of another room.
+
+    Args:
+        room: Part of a room description to look up; empty for the current room.
+    """
+    cave = MAPS.get(_key(ctx))
+    if not room:
+        return cave.summary()
+    matches = cave.find(room)
+    if not matches:
+        return f"No known room matches {room!r}."
+    return "\n".join(
+        f"{r}\n" + "\n".join(f"  {verb} -> {dst}" for verb, dst in sorted(cave.exits(r).items()))
+        for r in matches
+    )
+
+
+@function_tool
+def game_state(ctx: RunContextWrapper[None]) -> str:
+    """
+    Return what is known about the game right now as JSON: location,
+    exits, objects in the room, inventory, score, lamp and recent events.
+    Cheaper than sending 'look' or 'inventory'.
+    """
+    sid = _key(ctx)
+    state = _state(sid).state.compact()
+    cave = MAPS.get(sid)
+    known = cave.exits() if cave.current is not None else {}
+    if known:
+        state["known_exits"] = known
+    return json.dumps(state)
+
+
+@function_tool
+async def route_to(ctx: RunContextWrapper[None], room: str) -> str:
+    """
+    Walk to a previously visited room along the shortest known path, all in
+    one call. Stops at the first move that does not land where the map says.
+
+    Args:
+        room: Part of the destination's description (see game_map).
+    """
+    sid = _key(ctx)
+    cave = MAPS.get(sid)
+    matches = cave.find(room)
+    if not matches:
+        return f"No known room matches {room!r}."
+    if len(matches) > 1:
+        return "Which room did you mean?\n" + "\n".join(f"  {r}" for r in matches)
+    target = matches[0]
+    if cave.current is None:
+        return "Current room is unknown; send 'look' with game_eval first."
+    steps = cave.path(cave.current, target)
+    if steps is None:
+        return f"No known path from {cave.current!r} to {target!r}."
+    if not steps:
+        return f"Already at {target}."
+    moves: list[str] = []
     try:
-        ADVENT.ensure_running()
-        return ADVENT.eval(code)
-    except pexpect.TIMEOUT:
-        return "Timed out waiting for REPL output. You may try node_reset()."
+        session = await asyncio.to_thread(POOL.acquire, sid)
+        for verb, expected in steps:
+            out = await session.eval(verb)
+            here = MAPS.observe(sid, verb, out)
+            _state(sid).observe(out)
+            moves.append(verb)
+            if here != expected:
+                return (
+                    f"Stopped after {' '.join(moves)}: expected {expected!r} but the game said:\n"
+                    f"{SEEN.shrink(sid, out)}"
+                )
+    except asyncio.TimeoutError:
+        return f"Timed out after {' '.join(moves)}. You may try game_reset()."
     except Exception as e:
         return f"REPL error: {e!r}"
+    return f"Arrived via {' '.join(moves)}:\n{SEEN.shrink(sid, out)}"
+
+
+@function_tool
+def game_expand(ctx: RunContextWrapper[None], ref: str) -> str:
+    """
+    Return the full text behind a reference like [R3: You are in a…] that
+    stands in for a description already shown earlier.
+
+    Args:
+        ref: The reference, e.g. "R3".
+    """
+    return SEEN.get(_key(ctx)).expand(ref)
+
+
+# ---------- Direct play ----------
+
+async def play_direct(line: str, sid: str = "default") -> Optional[str]:
+    """
+    Send plain game commands ('north', 'get lamp') straight to the game
+    without a model call; anything else goes to the agent (returns None).
+    """
+    if not is_command(line):
+        return None
+    try:
+        with span("play_direct", "tool", command=line.strip()):
+            session = await asyncio.to_thread(POOL.acquire, sid)
+            out = await session.eval(line.strip())
+    except Exception:
+        # let the agent deal with a game that is down or stuck
+        return None
+    MAPS.observe(sid, line, out)
+    _state(sid).observe(out)
+    return out
+
+
+async def end_session(sid: str) -> None:
+    """Give a finished conversation's game back to the pool and forget its state."""
+    await asyncio.to_thread(POOL.release, sid)
+    STATES.pop(sid, None)
+    CHECKPOINTS.pop(sid, None)
+    SEEN.drop(sid)
+    MAPS.drop(sid)
 
 
 # ---------- Agent definition & runner ----------
@@ -103,25 +381,79 @@ def build_agent() -> Agent:
             # "- start the game with the node_eval tool"
             # "- echo the output of the node_eval tool"
             "- send 'help' to game_eval to understand how to play the game"
-            "- pass a user-input command to the game"
+            "- pass a user-input command to the game\n"
+            "- when you already know the next few commands, send them together with game_eval_batch\n"
             "- use the navigation commands to go to different rooms\n"
             "- If evaluation stalls or the REPL looks broken, call game_reset.\n"
-            "- remember the list of navigation commands needed to get to a particule room"
+            "- save a game_checkpoint before risky moves; after dying use game_restore instead of starting over\n"
+            "- use game_fork to test what a sequence of commands would do without committing to it\n"
+            "- call game_state for the current location, objects, inventory and score\n"
+            "- the cave map is recorded for you; call game_map to see known rooms and exits\n"
+            "- to travel to a room you have already visited, call route_to instead of moving step by step\n"
+            "- descriptions you have already seen come back as [R3: ...]; call game_expand for the full text"
         ),
-        tools=[game_eval, game_reset],
+        tools=[
+            game_eval, game_eval_batch, game_reset, game_state, game_map, route_to,
+            game_checkpoint, game_restore, game_fork, game_expand,
+        ],
         # You can set a specific OpenAI model via `model=...` if needed.
     )
 
-async def main() -> None:
-    # Ensure REPL is up before starting
-    ADVENT.start()
+async def serve(port: int) -> None:
+    from server import CopilotServer
+
+    POOL.fill()
+    tape = cassette.from_env()
+
+    def new_agent() -> Agent:
+        agent = build_agent()
+        return cassette.wrap_agent(agent, tape) if tape is not None else agent
+
+    server = CopilotServer(
+        new_agent,
+        router=None if os.environ.get("ADVENT_FAST_PATH") == "0" else play_direct,
+        on_close=end_session,
+        token_budget=int(os.environ.get("ADVENT_TOKEN_BUDGET", "8000")),
+    )
+    port = await server.start(port=port)
+    print(f"copilot serving on http://127.0.0.1:{port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+async def main(resume: bool = False) -> None:
+    # The terminal is always session "default": start a new game unless asked
+    # to pick up the last run's
+    if POOL.journals is not None and not resume:
+        POOL.journals.drop("default")
+    # Warm the pool before starting
+    POOL.fill()
     agent = build_agent()
+    tape = cassette.from_env()
+    if tape is not None:
+        cassette.wrap_agent(agent, tape)
     # Quick interactive loop in your terminal
     print("Your copilot is ready")
-    await run_demo_loop(agent)
+    await run_demo_loop(
+        agent,
+        token_budget=int(os.environ.get("ADVENT_TOKEN_BUDGET", "8000")),
+        router=None if os.environ.get("ADVENT_FAST_PATH") == "0" else play_direct,
+    )
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--serve", action="store_true", help="serve many players over HTTP instead of the terminal")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("ADVENT_SERVER_PORT", "8765")))
+    parser.add_argument("--resume", action="store_true", help="continue the last terminal game from its journal")
+    args = parser.parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(serve(args.port) if args.serve else main(args.resume))
     finally:
-        ADVENT.stop()
+        print(f"pool: {POOL.stats()}")
+        print(METRICS.summary())
+        trace = TRACER.export()
+        if trace:
+            print(f"trace: {trace} (open in https://ui.perfetto.dev)")
+        POOL.close()
+        METRICS.close()
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from advent_session import TRANSPORT, BaseAdventSession
+from procio import PipelineEOF, PipelineTimeout
+from tracing import span
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    name: str
+    journal: tuple[str, ...]
+    response: str  # what the game said after the last journal command
+    created: float = field(default_factory=time.time)
+
+
+class AsyncAdventSession(BaseAdventSession):
+    """
+    Game process driven from asyncio.
+
+    The game is a procio.Process like AdventSession's, driven with arun()
+    so a slow game response only suspends the calling coroutine; streaming
+    output and other sessions keep running. start()/stop() are plain calls
+    so SessionPool can pre-spawn these from its worker thread.
+    """
+
+    def __init__(self, game: Optional[str] = None, transport: str = TRANSPORT):
+        super().__init__(game, transport)
+        self._lock = asyncio.Lock()
+
+    async def ensure_running(self) -> None:
+        if not self.isalive():
+            self.stop()
+            await asyncio.to_thread(self.start)
+        if self._needs_replay():
+            await self._recover()
+
+    async def _recover(self, timeout: float = 60.0) -> None:
+        """AdventSession.recover() for a caller that holds the lock."""
+        try:
+            with span("game.replay", "io", commands=len(self.log.commands)):
+                out = await self.proc.areplay(self.log.commands, timeout=timeout)
+        except EOFError:
+            self.game_over()
+            await asyncio.to_thread(self.start)
+            return
+        self._replayed(out)
+
+    # ---- I/O ----
+
+    async def eval(self, command: str, timeout: Optional[float] = None) -> str:
+        """
+        Send the command to the game and return the response.
+
+        Raises asyncio.TimeoutError if no prompt arrives within `timeout`
+        seconds (default: learned per command class, see self.timeouts).
+        Cancelling or timing out leaves the session usable: the late
+        response is discarded before the next command is sent. Raises
+        EOFError if the command ended the game.
+        """
+        cls, learned, quiet = self._deadlines(command)
+        if timeout is None:
+            timeout = learned
+        else:
+            quiet = None
+        async with self._lock:
+            await self.ensure_running()
+            self._sending([command])
+            try:
+                with span("game.read", "io", command=command):
+                    result = await self.proc.arun(command, timeout=timeout, quiet=quiet)
+            except asyncio.TimeoutError:
+                self.timeouts.timed_out(cls)
+                raise
+            except EOFError:
+                self.game_over()
+                raise
+            return self._answered(command, cls, result)
+
+    async def eval_many(self, commands: list[str], timeout: float = 15.0) -> list[str]:
+        """
+        Pipeline several commands: write them all at once, then split the
+        output at prompt boundaries into one response per command.
+
+        The game runs every command, so use eval() one at a time when a
+        later command should depend on an earlier response. Out of time,
+        raises procio.PipelineTimeout with the responses that did arrive
+        and how many commands the game was sent; procio.PipelineEOF, with
+        the same, if a command ended the game.
+        """
+        if not commands:
+            return []
+        async with self._lock:
+            await self.ensure_running()
+            return await self._eval_many(commands, timeout)
+
+    async def _eval_many(self, commands: list[str], timeout: float) -> list[str]:
+        """eval_many() for a caller that holds the lock."""
+        self._sending(commands)
+        try:
+            with span("game.read_many", "io", commands=len(commands)):
+                responses = await self.proc.arun_many(commands, timeout=timeout)
+        except (PipelineTimeout, PipelineEOF) as e:
+            e.responses = [self._unecho(c, r) for c, r in zip(commands, e.responses)]
+            if isinstance(e, PipelineEOF):
+                if e.partial:
+                    e.partial = self._unecho(commands[len(e.responses)], e.partial)
+                self.game_over()
+            raise
+        except EOFError:
+            self.game_over()
+            raise
+        responses = [self._unecho(c, r) for c, r in zip(commands, responses)]
+        self.last_response = responses[-1]
+        return responses
+
+    # ---- checkpoints ----
+
+    def checkpoint(self, name: str = "") -> Checkpoint:
+        """Snapshot the game as the list of commands that produced it. O(n) copy, no I/O."""
+        return Checkpoint(name=name, journal=tuple(self.journal), response=self.last_response)
+
+    async def restore(self, checkpoint: Checkpoint, timeout: float = 60.0) -> bool:
+        """
+        Bring this session to `checkpoint`: restart the game if it has been
+        played, then replay the journal in one pipelined write, discarding
+        the intermediate output.
+
+        Returns False if the replayed game ended on a different response
+        than the one recorded, which happens when the game's random events
+        (dwarves, pirate) went another way. Holds the session lock
+        throughout, so an eval() waits for the restored game.
+        """
+        async with self._lock:
+            if self.journal or not self.isalive():
+                old, self.proc = self.proc, None
+                await asyncio.to_thread(self.start)
+                if old is not None:
+                    # stopping sleeps between signals; don't make the caller wait
+                    threading.Thread(target=old.stop, daemon=True).start()
+            if self.log is not None:
+                self.log.clear()
+            if checkpoint.journal:
+                await self._eval_many(list(checkpoint.journal), timeout)
+            return self.last_response == checkpoint.response
+
+    async def fork(self, checkpoint: Checkpoint, timeout: float = 60.0) -> "AsyncAdventSession":
+        """Start a second game at `checkpoint` for what-if exploration; stop() it when done."""
+        other = type(self)(self.game, self.transport)
+        await asyncio.to_thread(other.start)
+        await other.restore(checkpoint, timeout=timeout)
+        return other
@@ -0,0 +1,119 @@
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from cave_map import room_key
+
+# Notable things a response can report, matched anywhere in the text
+EVENTS = {
+    "death": re.compile(
+        r"you seem to have gotten yourself killed|you are dead|you're dead|broke every bone"
+        r"|reincarnate you|you have crawled around in some little holes", re.I),
+    "unknown_word": re.compile(r"i don't know (that word|the word|how)|i don't understand", re.I),
+    "darkness": re.compile(r"it is (now )?pitch dark", re.I),
+    "ended": re.compile(r"to achieve the next higher rating|you have reached maximum rating"
+                        r"|do you (really )?want to quit now", re.I),
+}
+
+# Objects lying about: "There is a shiny brass lamp nearby.", "There are some keys on the ground here."
+_OBJECT = re.compile(
+    r"^there (?:is|are) (.+?)(?: here| nearby| on the ground(?: here)?| lying (?:here|nearby))[.!]?$",
+    re.I | re.M)
+# Directions a room description mentions, as candidate exits
+_DIRECTION = re.compile(
+    r"\b(north(?:east|west)?|south(?:east|west)?|east|west|upward|downward|upstream|downstream)\b", re.I)
+_INVENTORY_HEAD = re.compile(r"^you are currently holding the following:\s*$", re.I | re.M)
+_EMPTY_HANDED = re.compile(r"you're not carrying anything|you are not carrying anything", re.I)
+_SCORE = re.compile(r"scored?\s+(\d+)\s+out of a possible\s+(\d+)", re.I)
+_LAMP = re.compile(r"your lamp is (now on|now off|getting dim)|lamp has run out of power", re.I)
+_PROMPT_TAIL = re.compile(r"\n?>\s*$")
+
+
+def events(text: str) -> list[str]:
+    """Names of the EVENTS that `text` reports, in table order."""
+    return [name for name, pattern in EVENTS.items() if pattern.search(text)]
+
+
+@dataclass
+class GameState:
+    """
+    What one advent response says about the game. Fields the response does
+    not mention stay None (or empty), so a state is also a delta that
+    StateTracker can fold into the running picture.
+    """
+    location: Optional[str] = None
+    exits: list[str] = field(default_factory=list)       # directions the description mentions
+    objects: list[str] = field(default_factory=list)     # things lying in the room
+    inventory: Optional[list[str]] = None                # only set by an inventory listing
+    score: Optional[int] = None
+    max_score: Optional[int] = None
+    lamp: Optional[str] = None                           # "on", "off", "dim", "dead"
+    dark: bool = False
+    events: list[str] = field(default_factory=list)
+
+    def compact(self) -> dict:
+        """Only the fields that say something, for tool output."""
+        return {k: v for k, v in asdict(self).items() if v not in (None, [], False)}
+
+
+def parse(text: str, command: Optional[str] = None) -> GameState:
+    """
+    Turn one advent response into a GameState. `command` is stripped off
+    the front if the transport echoed it (ptys do); a trailing prompt is
+    ignored.
+    """
+    text = _PROMPT_TAIL.sub("", text.replace("\r\n", "\n")).strip()
+    if command and text.startswith(command.strip()):
+        text = text[len(command.strip()):].lstrip()
+
+    state = GameState(events=events(text))
+    state.location = room_key(text)
+    if state.location is not None:
+        description = text.split("\n\n", 1)[0]
+        for word in _DIRECTION.findall(description):
+            word = word.lower()
+            if word not in state.exits:
+                state.exits.append(word)
+    state.objects = [" ".join(m.split()) for m in _OBJECT.findall(text)]
+
+    head = _INVENTORY_HEAD.search(text)
+    if head:
+        lines = text[head.end():].split("\n\n", 1)[0].splitlines()
+        state.inventory = [line.strip() for line in lines if line.strip()]
+    elif _EMPTY_HANDED.search(text):
+        state.inventory = []
+
+    m = _SCORE.search(text)
+    if m:
+        state.score, state.max_score = int(m.group(1)), int(m.group(2))
+    m = _LAMP.search(text)
+    if m:
+        said = (m.group(1) or "").lower()
+        state.lamp = {"now on": "on", "now off": "off", "getting dim": "dim"}.get(said, "dead")
+    state.dark = "darkness" in state.events
+    return state
+
+
+class StateTracker:
+    """Folds successive responses into the current GameState of one game."""
+
+    def __init__(self):
+        self.state = GameState()
+
+    def observe(self, text: str, command: Optional[str] = None) -> GameState:
+        """Parse one response, update the running state and return the parsed delta."""
+        seen = parse(text, command)
+        now = self.state
+        if seen.location is not None:
+            now.location, now.exits, now.objects = seen.location, seen.exits, seen.objects
+            now.dark = False
+        elif seen.objects:
+            now.objects = seen.objects
+        if seen.dark:
+            now.location, now.exits, now.objects, now.dark = None, [], [], True
+        for name in ("inventory", "score", "max_score", "lamp"):
+            value = getattr(seen, name)
+            if value is not None:
+                setattr(now, name, value)
+        now.events = seen.events
+        return seen
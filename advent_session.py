@@ -0,0 +1,372 @@
+import os
+import shlex
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict
+from typing import Callable, Optional, Sequence
+
+from advent_vocab import command_class
+from journal import Journal, JournalStore
+from procio import Process, PromptProtocol, Result
+from timeouts import AdaptiveTimeout
+from tracing import span
+
+# Override with ADVENT_GAME=/path/to/advent when the game lives elsewhere
+GAME = os.environ.get("ADVENT_GAME", "/usr/local/cellar/open-adventure/1.20/bin/advent")
+# "pty" (default) or "pipe": plain stdin/stdout pipes, for batch and server use
+TRANSPORT = os.environ.get("ADVENT_TRANSPORT", "pty")
+# Sent after every command: advent ignores input lines starting with "#" but
+# prompts again for them, so "> > " marks where a response ends.
+# ADVENT_FRAME= (empty) goes back to waiting for a single prompt.
+FRAME = os.environ.get("ADVENT_FRAME", "#") or None
+
+# How long games take to start, shared by every session on this machine
+SPAWN_TIMEOUTS = AdaptiveTimeout(floor=2.0, ceiling=30.0, name="game.spawn")
+
+
+def game_argv(game: str, transport: str = TRANSPORT) -> list[str]:
+    """
+    The command line for `game`. Over pipes the game's stdout is block
+    buffered and the prompt would sit in its buffer, so it is run through
+    stdbuf -o0 where that exists (GNU coreutils; gstdbuf from Homebrew).
+    """
+    argv = shlex.split(game)
+    if transport == "pipe":
+        stdbuf = shutil.which("stdbuf") or shutil.which("gstdbuf")
+        if stdbuf:
+            argv = [stdbuf, "-o0"] + argv
+    return argv
+
+
+def unecho(command: str, response: str) -> str:
+    """
+    Drop the copy of `command` that advent prints at the top of its
+    response when stdin is not a terminal (with or without the prompt).
+    """
+    first, sep, rest = response.lstrip("\n").partition("\n")
+    if first.strip().removeprefix(">").strip() == command.strip():
+        return rest.lstrip("\n") if sep else ""
+    return response
+
+
+def start_game(game: str, transport: str = TRANSPORT) -> Process:
+    """
+    Start a fresh game and wait for its first prompt, so the banner is
+    drained (proc.banner), with the spawn deadline learned across sessions.
+    """
+    # - advent uses '> ' as the prompt
+    # - every command is followed by the FRAME line, see above
+    # - over pipes there is no line discipline: no echo to turn off, no
+    #   \r\n, no canonical-mode line limit
+    protocol = PromptProtocol("> ", sentinel=FRAME)
+    proc = Process(game_argv(game, transport), protocol, pty=transport != "pipe", name="game")
+    t0 = time.perf_counter()
+    try:
+        proc.start(timeout=SPAWN_TIMEOUTS.timeout("spawn"))
+    except TimeoutError:
+        SPAWN_TIMEOUTS.timed_out("spawn")
+        proc.stop()
+        raise
+    SPAWN_TIMEOUTS.observe("spawn", time.perf_counter() - t0)
+    return proc
+
+
+# ---------- Advent REPL manager ----------
+
+class BaseAdventSession:
+    """
+    One game and what is known about it: the process, the commands sent to
+    it, its durable log and learned deadlines. AdventSession waits on the
+    game with blocking calls, advent_aio.AsyncAdventSession from asyncio;
+    everything else is here.
+    """
+
+    def __init__(self, game: Optional[str] = None, transport: str = TRANSPORT):
+        self.game = game or GAME
+        # "pty", or "pipe" for plain stdin/stdout (see game_argv)
+        self.transport = transport
+        self.proc: Optional[Process] = None
+        self.banner = ""
+        # every command sent to the current process, in order
+        self.journal: list[str] = []
+        # the same on disk, across processes; replayed after a crash (set by SessionPool)
+        self.log: Optional[Journal] = None
+        self.last_response = ""
+        # per-command deadlines learned from this game's response times
+        self.timeouts = AdaptiveTimeout()
+
+    def start(self) -> None:
+        self.proc = start_game(self.game, self.transport)
+        self.journal = []
+        self.banner = self.last_response = self.proc.banner
+
+    def stop(self) -> None:
+        if self.proc is not None:
+            self.proc.stop()
+        self.proc = None
+
+    def isalive(self) -> bool:
+        return self.proc is not None and self.proc.isalive()
+
+    def game_over(self) -> None:
+        """
+        The game exited: forget its log, which would only replay into the
+        exit again, so the next eval starts a new game.
+        """
+        if self.log is not None:
+            self.log.clear()
+        self.stop()
+
+    def _needs_replay(self) -> bool:
+        """A fresh game, and a log that says where play had got to."""
+        return self.log is not None and bool(self.log.commands) and not self.journal
+
+    def _replayed(self, out: str) -> str:
+        """The log was replayed into this game and `out` came back last; returns the response."""
+        self.journal = list(self.log.commands)
+        self.last_response = self._unecho(self.journal[-1], out)
+        return self.last_response
+
+    def _sending(self, commands: list[str]) -> None:
+        """Record commands about to go out, in memory and in the log."""
+        self.journal.extend(commands)
+        if self.log is not None:
+            self.log.extend(commands)
+
+    def _deadlines(self, command: str) -> tuple[str, float, Optional[float]]:
+        """(command class, timeout, quiet window) learned for `command`."""
+        cls = command_class(command)
+        # a framed response is never cut short by silence, only by its frame
+        return cls, self.timeouts.timeout(cls), None if FRAME else self.timeouts.quiet(cls)
+
+    def _answered(self, command: str, cls: str, result: Result) -> str:
+        """Learn from how long `result` took; returns the response."""
+        if result.quiesced:
+            self.timeouts.quiesced(cls)
+        else:
+            self.timeouts.observe(cls, result.elapsed)
+        self.last_response = self._unecho(command, result.output)
+        return self.last_response
+
+    def _unecho(self, command: str, out: str) -> str:
+        return unecho(command, out) if self.transport == "pipe" else out
+
+
+class AdventSession(BaseAdventSession):
+    """A game driven with blocking calls."""
+
+    def ensure_running(self) -> None:
+        if not self.isalive():
+            self.stop()
+            self.start()
+        if self._needs_replay():
+            self.recover()
+
+    def recover(self, timeout: float = 60.0) -> str:
+        """
+        Bring a fresh game to where the log left off: the whole log goes
+        out in one write and only the last response is kept. A log that
+        ends the game (e.g. "quit", "y") is dropped and play starts over.
+        """
+        try:
+            with span("game.replay", "io", commands=len(self.log.commands)):
+                out = self.proc.replay(self.log.commands, timeout=timeout)
+        except EOFError:
+            self.game_over()
+            self.start()
+            return self.banner
+        return self._replayed(out)
+
+    def eval(self, command: str) -> str:
+        """
+        Send the command to the game and return the response.
+        Raises EOFError if the command ended the game.
+        """
+        self.ensure_running()
+        self._sending([command])
+        cls, timeout, quiet = self._deadlines(command)
+        try:
+            with span("game.read", "io", command=command):
+                result = self.proc.run(command, timeout=timeout, quiet=quiet)
+        except TimeoutError:
+            self.timeouts.timed_out(cls)
+            raise
+        except EOFError:
+            self.game_over()
+            raise
+        return self._answered(command, cls, result)
+
+
+# ---------- Pre-warmed session pool ----------
+
+@dataclass
+class PoolMetrics:
+    hits: int = 0           # acquire served from a warm session
+    misses: int = 0         # acquire had to spawn while the caller waited
+    spawned: int = 0
+    released: int = 0
+    spawn_time: float = 0.0  # total seconds spent spawning
+    spawn_max: float = 0.0
+
+    def as_dict(self) -> dict:
+        d = asdict(self)
+        d["spawn_avg"] = self.spawn_time / self.spawned if self.spawned else 0.0
+        return d
+
+
+class SessionPool:
+    """
+    Keeps `size` started, banner-drained games ready and hands one out per
+    session id. Released games are stopped and a fresh one is spawned in the
+    background to take their place, so a reset is a swap instead of a spawn.
+
+    `factory` may build any session with start()/stop()/isalive(), e.g.
+    advent_aio.AsyncAdventSession. Concurrent acquire() calls for one
+    session id share a single lease: the first spawns or takes a game, the
+    rest wait for it.
+
+    With `journals`, a leased game gets the session's Journal as its `log`;
+    a game that dies, or a session id seen again after a restart, picks up
+    where its journal left off. release() deletes the journal.
+    """
+
+    def __init__(self, size: int = 2, factory: Callable[[], BaseAdventSession] = AdventSession,
+                 journals: Optional[JournalStore] = None):
+        self.size = size
+        self.factory = factory
+        self.journals = journals
+        self.metrics = PoolMetrics()
+        self._idle: deque[BaseAdventSession] = deque()
+        self._leased: dict[str, BaseAdventSession] = {}
+        # session ids being leased right now, resolved with the game they get
+        self._claims: dict[str, Future] = {}
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _spawn(self) -> BaseAdventSession:
+        t0 = time.perf_counter()
+        session = self.factory()
+        session.start()
+        dt = time.perf_counter() - t0
+        with self._lock:
+            self.metrics.spawned += 1
+            self.metrics.spawn_time += dt
+            self.metrics.spawn_max = max(self.metrics.spawn_max, dt)
+        return session
+
+    def fill(self) -> None:
+        """Spawn games until the idle queue is back to `size`."""
+        while True:
+            with self._lock:
+                if self._closed or len(self._idle) + self._pending >= self.size:
+                    return
+                self._pending += 1
+            try:
+                session = self._spawn()
+            finally:
+                with self._lock:
+                    self._pending -= 1
+            with self._lock:
+                if self._closed:
+                    closed = True
+                else:
+                    closed = False
+                    self._idle.append(session)
+            if closed:
+                session.stop()
+                return
+
+    def _refill_async(self, retired: Sequence[BaseAdventSession] = ()) -> None:
+        def work() -> None:
+            # Stopping a game can take seconds, keep it off the caller's path
+            for session in retired:
+                session.stop()
+            self.fill()
+
+        threading.Thread(target=work, name="advent-pool-fill", daemon=True).start()
+
+    def acquire(self, session_id: str = "default") -> BaseAdventSession:
+        """Return the game leased to `session_id`, leasing a warm one if needed."""
+        with self._lock:
+            session = self._leased.get(session_id)
+            if session is not None:
+                return session
+            claim = self._claims.get(session_id)
+            if claim is not None:
+                owner = False
+            else:
+                # reserve the lease; concurrent callers for this id wait on it
+                owner = True
+                claim = self._claims[session_id] = Future()
+                dead = []
+                while self._idle:
+                    candidate = self._idle.popleft()
+                    if candidate.isalive():
+                        session = candidate
+                        break
+                    dead.append(candidate)  # still holds its pty/pipe until stopped
+                if session is not None:
+                    self.metrics.hits += 1
+                else:
+                    self.metrics.misses += 1
+        if not owner:
+            return claim.result()
+        # replace what was taken from the idle queue while this lease is set up
+        self._refill_async(dead)
+        try:
+            if session is None:
+                with span("pool.spawn", "io"):
+                    session = self._spawn()
+            if self.journals is not None:
+                session.log = self.journals.get(session_id)
+        except BaseException as e:
+            with self._lock:
+                self._claims.pop(session_id, None)
+            claim.set_exception(e)
+            raise
+        with self._lock:
+            self._claims.pop(session_id, None)
+            leased = self._leased.setdefault(session_id, session)
+        if leased is not session:
+            # the claim makes this unreachable, but a second game must never leak
+            session.stop()
+        claim.set_result(leased)
+        return leased
+
+    def release(self, session_id: str = "default") -> None:
+        """Kill the game leased to `session_id` and top the pool back up."""
+        with self._lock:
+            session = self._leased.pop(session_id, None)
+            if session is not None:
+                self.metrics.released += 1
+        if self.journals is not None:
+            self.journals.drop(session_id)
+        self._refill_async([session] if session is not None else [])
+
+    def reset(self, session_id: str = "default") -> BaseAdventSession:
+        """Swap the game leased to `session_id` for a fresh one."""
+        self.release(session_id)
+        return self.acquire(session_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            sessions = list(self._idle) + list(self._leased.values())
+            self._idle.clear()
+            self._leased.clear()
+        for session in sessions:
+            session.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            d = self.metrics.as_dict()
+            d["idle"] = len(self._idle)
+            d["leased"] = len(self._leased)
+            leased = list(self._leased.items())
+        d["spawn_timeouts"] = SPAWN_TIMEOUTS.stats()
+        d["timeouts"] = {sid: s.timeouts.stats() for sid, s in leased if hasattr(s, "timeouts")}
+        return d
@@ -0,0 +1,110 @@
+import difflib
+import re
+from typing import Optional
+
+# advent only looks at the first five letters of a word
+TOKLEN = 5
+
+MOTIONS = """
+road hill enter upstream downstream forest forward continue onward back return retreat valley
+stair stairs out outside exit leave building house gully stream rock bed crawl cobble inward inside
+in surface null nowhere dark passage tunnel low canyon awkward giant view upward up u above ascend
+d downward down descend pit outdoors crack steps dome left right hall jump barren over across
+east e west w north n south s ne se sw nw northeast northwest southeast southwest debris hole wall
+broken y2 climb floor room slit slab slabroom xyzzy depression entrance plugh secret cave cross
+bedquilt plover oriental cavern shell reservoir office main fork go walk run travel proceed explore
+goto follow turn
+""".split()
+
+OBJECTS = """
+keys key lamp lantern headlamp grate cage rod wand steps bird door pillow velvet snake fissure tablet
+clam oyster magazine issue spelunker dwarf dwarves knife knives food ration rations bottle jar water
+h2o oil mirror plant beanstalk stalactite shadow figure axe drawing pirate genie dragon chasm troll
+bear message volcano geyser machine vending battery batteries carpet moss ogre urn cavity blood sign
+egg eggs nest chain ruby jade necklace amber gemstone sapphire ebony statue gold nugget diamonds
+silver bars jewelry jewels coins chest box treasure pearl rug persian spices pyramid platinum emerald
+vase ming shards pottery trident all
+""".split()
+
+ACTIONS = """
+get carry take keep catch steal capture tote drop release free discard dump say chant sing utter
+mumble unlock open nothing lock close light on extinguish off wave shake swing calm placate tame
+attack kill fight hit strike slay pour eat devour drink rub throw toss quit find where inventory inv
+feed fill blast detonate ignite blowup score fee fie foe foo fum brief read peruse break shatter
+smash wake disturb suspend pause save resume restart hours fly listen zzzz news look l examine touch
+describe info information help version yes y no n abra abracadabra sesame shazam hocus pocus
+""".split()
+
+# every word advent accepts, keyed by its first TOKLEN letters
+WORDS: dict[str, str] = {}
+for _word in MOTIONS + OBJECTS + ACTIONS:
+    WORDS.setdefault(_word[:TOKLEN], _word)
+
+_EXACT = set(MOTIONS + OBJECTS + ACTIONS)
+_ALL = sorted(_EXACT)
+
+# advent takes one or two words per command
+MAX_WORDS = 2
+_WORD = re.compile(r"^[a-z0-9']+$")
+
+
+def lookup(word: str) -> Optional[str]:
+    """The vocabulary word `word` means to advent, or None if advent doesn't know it."""
+    word = word.lower()
+    if not _WORD.match(word):
+        return None
+    if word in _EXACT:
+        return word
+    return WORDS.get(word[:TOKLEN])
+
+
+def is_command(line: str) -> bool:
+    """True if `line` is something to type straight into advent rather than a request for the agent."""
+    words = line.split()
+    return 0 < len(words) <= MAX_WORDS and all(lookup(w) for w in words)
+
+
+def suggest(word: str, n: int = 3) -> list[str]:
+    """Known words closest to `word`, best first."""
+    return difflib.get_close_matches(word.lower(), _ALL, n=n, cutoff=0.6)
+
+
+def check(command: str) -> tuple[str, dict[str, list[str]]]:
+    """
+    Validate a command before it costs a round trip to the game.
+
+    Returns (canonical command, {unknown word: suggestions}). The canonical
+    form is lower-cased with single spaces and every word spelled the way
+    the vocabulary spells it; the dict is empty when advent knows all words.
+    """
+    known, unknown = [], {}
+    for word in command.split():
+        found = lookup(word)
+        if found is None:
+            unknown[word] = suggest(word)
+        else:
+            known.append(found)
+    return " ".join(known), unknown
+
+
+def command_class(command: str) -> str:
+    """Coarse class for latency tracking: "move", the verb advent reads, or "other"."""
+    words = command.split()
+    word = lookup(words[0]) if words else None
+    if word is None:
+        return "other"
+    return "move" if word in MOTIONS else word
+
+
+def awaiting_answer(last_response: str) -> bool:
+    """True if the game just asked something (yes/no, a file name), so the next line is not a command."""
+    return last_response.rstrip().endswith(("?", ":"))
+
+
+def rejection(command: str, unknown: dict[str, list[str]]) -> dict:
+    """Tool-friendly answer for a command that was not sent."""
+    return {
+        "rejected": command,
+        "unknown": unknown,
+        "note": "advent does not know these words; nothing was sent to the game",
+    }
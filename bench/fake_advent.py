@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+A stand-in for the advent binary: same banner, same '> ' prompt.
+
+    python bench/fake_advent.py [--size BYTES] [--delay SECONDS]
+
+Every command gets a response padded to about --size bytes after waiting
+--delay seconds. 'dump N' prints N bytes regardless of --size, 'score'
+prints an advent-style score line, 'read' prints text with '> ' in it,
+'sleep S' answers after S seconds, 'quit' then 'y' exits. Like advent, lines starting with '#' are skipped
+and just prompted for again.
+"""
+import argparse
+import sys
+import time
+
+BANNER = "\nWelcome to Adventure!!  Would you like instructions?\n\n> "
+LINE = "The cave is dark and full of twisty little passages, all alike."
+
+
+def pad(text: str, size: int) -> str:
+    lines = [text] if text else []
+    n = len(text)
+    while n < size:
+        lines.append(LINE)
+        n += len(LINE) + 1
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=0)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    out = sys.stdout
+    out.write(BANNER)
+    out.flush()
+    quitting = False
+    turns = 0
+    for line in sys.stdin:
+        if line.startswith("#"):
+            out.write("> ")
+            out.flush()
+            continue
+        turns += 1
+        cmd = line.strip().lower()
+        if args.delay:
+            time.sleep(args.delay)
+        if quitting and cmd in ("y", "yes"):
+            out.write("\nOK\n")
+            out.flush()
+            return
+        quitting = cmd == "quit"
+        if quitting:
+            text = "Do you really want to quit now?"
+        elif cmd == "score":
+            text = f"You have scored 32 out of a possible 430, using {turns} turns."
+        elif cmd == "read":
+            text = "The message reads:\n> \n> Beware the dwarves > \n..."
+        elif cmd.startswith("sleep "):
+            time.sleep(float(cmd.split()[1]))
+            text = "Zzzzz."
+        elif cmd.startswith("dump "):
+            text = pad("", int(cmd.split()[1]))
+        else:
+            text = pad(f"You said {cmd!r}.", args.size)
+        out.write(f"\n{text}\n\n> ")
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+A scripted stand-in for the OpenAI model, for running the agents offline.
+
+FakeModel answers every user message by calling `tool` with the message as
+the command, then answers the tool output with a one-line summary. Pass
+`script` to replace that with explicit steps. scripted_input() types the
+player's side of loop.run_demo_loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+from agents import Model, ModelResponse, Usage
+
+_ids = itertools.count(1)
+
+
+def _last(input: Any) -> Any:
+    if isinstance(input, str):
+        return {"role": "user", "content": input}
+    return input[-1] if input else {}
+
+
+def echo_step(tool: str, argument: str) -> Callable[[Any], dict]:
+    """Default policy: forward user text to `tool`, then summarize its output."""
+    def step(last: Any) -> dict:
+        if isinstance(last, dict) and last.get("type") == "function_call_output":
+            first = str(last.get("output", "")).strip().split("\n", 1)[0]
+            return {"text": first[:200]}
+        content = last.get("content", "") if isinstance(last, dict) else str(last)
+        return {"tool": tool, "args": {argument: content if isinstance(content, str) else str(content)}}
+    return step
+
+
+def scripted_input(lines: Iterable[str]) -> Callable[..., str]:
+    """A stand-in for input() that returns `lines` in turn, then raises EOFError."""
+    lines = iter(lines)
+
+    def scripted(prompt: str = "") -> str:
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError
+    return scripted
+
+
+class FakeModel(Model):
+    def __init__(
+        self,
+        tool: str = "game_eval",
+        argument: str = "code",
+        script: Optional[list[dict]] = None,
+        latency: float = 0.0,
+    ):
+        self.step = echo_step(tool, argument)
+        self.script = list(script) if script is not None else None
+        self.latency = latency
+        self.calls = 0
+
+    def _next(self, input: Any) -> tuple[list[Any], Usage]:
+        self.calls += 1
+        if self.script is not None:
+            step = self.script.pop(0) if self.script else {"text": "done"}
+        else:
+            step = self.step(_last(input))
+        n = next(_ids)
+        if "tool" in step:
+            item = ResponseFunctionToolCall(
+                type="function_call", id=f"fc_{n}", call_id=f"call_{n}",
+                name=step["tool"], arguments=json.dumps(step.get("args", {})), status="completed",
+            )
+        else:
+            item = ResponseOutputMessage(
+                type="message", id=f"msg_{n}", role="assistant", status="completed",
+                content=[ResponseOutputText(type="output_text", text=step["text"], annotations=[])],
+            )
+        tokens_in = len(json.dumps(input, default=str)) // 4
+        tokens_out = len(json.dumps(step)) // 4
+        usage = Usage(requests=1, input_tokens=tokens_in, output_tokens=tokens_out,
+                      total_tokens=tokens_in + tokens_out)
+        return [item], usage
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, *args, **kwargs) -> ModelResponse:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        output, usage = self._next(input)
+        return ModelResponse(output=output, usage=usage, response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, *args, **kwargs) -> AsyncIterator[Any]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        output, usage = self._next(input)
+        seq = itertools.count()
+        for item in output:
+            if isinstance(item, ResponseOutputMessage):
+                yield ResponseTextDeltaEvent(
+                    type="response.output_text.delta", item_id=item.id, output_index=0,
+                    content_index=0, delta=item.content[0].text, logprobs=[], sequence_number=next(seq),
+                )
+        # model_construct: the required fields of these types vary between
+        # openai releases and nothing here needs validating
+        response = Response.model_construct(
+            id=f"resp_{next(_ids)}", object="response", created_at=time.time(), model="fake",
+            output=output, parallel_tool_calls=False, tool_choice="auto", tools=[],
+            usage=ResponseUsage.model_construct(
+                input_tokens=usage.input_tokens, output_tokens=usage.output_tokens,
+                total_tokens=usage.total_tokens,
+                input_tokens_details=InputTokensDetails.model_construct(cached_tokens=0),
+                output_tokens_details=OutputTokensDetails.model_construct(reasoning_tokens=0),
+            ),
+        )
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=next(seq))
@@ -0,0 +1,90 @@
+"""
+Per-command latency of demo/game_tool.GameSession against the fake game,
+current procio-based session vs the original join-and-rescan reader.
+
+    python bench/game_tool_bench.py [--reps N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import pexpect
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "demo"))
+
+from game_tool import GameSession  # noqa: E402
+
+FAKE = [sys.executable, os.path.join(HERE, "fake_advent.py")]
+SIZES = [100, 10_000, 100_000, 1_000_000]
+
+
+class LegacyGameSession:
+    """The reader as it was: 0.2 s polls, whole-buffer rescans, fixed sleeps."""
+
+    def __init__(self, cmd: list[str], timeout: float):
+        self.prompt = re.compile(r"\n?>\s*$", re.MULTILINE)
+        self.child = pexpect.spawnu(" ".join(cmd), timeout=timeout)
+        self.child.delaybeforesend = 0
+        self._drain_banner()
+
+    def _read_until_prompt(self) -> str:
+        buf = []
+        start = time.time()
+        while True:
+            try:
+                chunk = self.child.read_nonblocking(size=1024, timeout=0.2)
+                buf.append(chunk)
+                if self.prompt.search("".join(buf)):
+                    break
+            except pexpect.TIMEOUT:
+                if (time.time() - start) > self.child.timeout:
+                    break
+            except pexpect.EOF:
+                break
+        return "".join(buf)
+
+    def _drain_banner(self) -> str:
+        time.sleep(0.1)
+        return self._read_until_prompt()
+
+    def send(self, line: str) -> str:
+        if not line.endswith("\n"):
+            line += "\n"
+        self.child.send(line)
+        time.sleep(0.05)
+        return self._read_until_prompt()
+
+    def close(self) -> None:
+        self.child.close(force=True)
+
+
+def measure(cls, size: int, reps: int) -> float:
+    session = cls(cmd=FAKE, timeout=60.0)
+    try:
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            out = session.send(f"dump {size}")
+            # GameSession trims the final newline along with the prompt
+            assert len(out) >= size - 1, (cls.__name__, size, len(out))
+        return (time.perf_counter() - t0) / reps
+    finally:
+        session.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reps", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'bytes':>10} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+    for size in SIZES:
+        old = measure(LegacyGameSession, size, args.reps)
+        new = measure(GameSession, size, args.reps)
+        print(f"{size:>10} {old * 1000:>10.1f} {new * 1000:>11.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
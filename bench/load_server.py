@@ -0,0 +1,103 @@
+"""
+Load test for the copilot server (server.py), offline: scripted model, fake game.
+
+    python bench/load_server.py [--sessions 50] [--turns 10] [--delay 0.0] [--latency 0.0] [--fast-path]
+                                [--trace trace.json]
+
+Every simulated player opens its own conversation and plays `--turns`
+turns back to back; all players run at once against one server process.
+Prints turn latency percentiles, turns per second and CPU seconds per turn
+for the server process and its games, from which sessions per core follow.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+
+from metrics import percentile  # noqa: E402
+from run import fake_game, load_copilot  # noqa: E402
+
+
+async def post(port: int, path: str, body: str) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = body.encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    return raw.decode("utf-8", "replace")
+
+
+async def player(port: int, n: int, turns: int, first: list[float], samples: list[float]) -> None:
+    for i in range(turns):
+        t0 = time.perf_counter()
+        reply = await post(port, f"/sessions/p{n}/turn", "look")
+        (samples if i else first).append(time.perf_counter() - t0)
+        assert " 200 " in reply.split("\r\n", 1)[0], reply[:200]
+
+
+async def run(args) -> None:
+    from fake_model import FakeModel
+    from server import CopilotServer
+    from tracing import TRACER
+
+    TRACER.enabled = bool(args.trace)
+
+    copilot = load_copilot()
+    game = fake_game(args.size, args.delay)
+    copilot.POOL.factory = lambda: copilot.AsyncAdventSession(game=game)
+    copilot.POOL.size = args.sessions  # every player starts on a warm game
+    copilot.POOL.fill()
+
+    def new_agent():
+        agent = copilot.build_agent()
+        agent.model = FakeModel(latency=args.latency)
+        return agent
+
+    server = CopilotServer(new_agent, router=copilot.play_direct if args.fast_path else None,
+                           on_close=copilot.end_session)
+    port = await server.start(port=0)
+    first: list[float] = []
+    samples: list[float] = []
+    cpu0, t0 = os.times(), time.perf_counter()
+    await asyncio.gather(*(player(port, n, args.turns, first, samples) for n in range(args.sessions)))
+    wall, cpu1 = time.perf_counter() - t0, os.times()
+    await server.close()
+    copilot.POOL.close()
+
+    cpu = (cpu1.user - cpu0.user) + (cpu1.system - cpu0.system) \
+        + (cpu1.children_user - cpu0.children_user) + (cpu1.children_system - cpu0.children_system)
+    turns = len(first) + len(samples)
+    print(f"sessions {args.sessions}  turns {turns}  wall {wall:.2f}s  turns/s {turns / wall:.1f}")
+    # a player's first turn also pays for leasing a game (and the pool's refill spawn)
+    for label, values in (("first turn", first), ("later turns", samples)):
+        if values:
+            print(f"{label:<12} ms  p50 {percentile(values, 50) * 1000:.1f}  p95 {percentile(values, 95) * 1000:.1f}"
+                  f"  p99 {percentile(values, 99) * 1000:.1f}")
+    print(f"cpu {cpu:.2f}s  = {cpu / turns * 1000:.2f} ms/turn  -> {turns / cpu:.0f} turns per core-second")
+    if args.trace:
+        print(f"trace: {TRACER.export(args.trace)}  ({len(TRACER.events)} events)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--size", type=int, default=400, help="bytes per game response")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds the game waits per command")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the fake model waits per call")
+    parser.add_argument("--fast-path", action="store_true", help="let plain commands skip the model")
+    parser.add_argument("--trace", help="record spans and write a Chrome trace here")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
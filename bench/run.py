@@ -0,0 +1,200 @@
+"""
+Offline benchmarks: no advent install and no API key needed.
+
+    python bench/run.py [--size BYTES] [--delay SECONDS] [--reps N] [--json out.json] [names...]
+
+Runs each benchmark against bench/fake_advent.py (or bash) and prints
+latency percentiles and throughput. With --json the numbers are also
+written out so two runs can be compared.
+"""
+import argparse
+import asyncio
+import atexit
+import builtins
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "demo"), HERE]
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+
+from metrics import percentile  # noqa: E402
+
+
+def fake_game(size: int, delay: float) -> str:
+    return f"{sys.executable} {os.path.join(HERE, 'fake_advent.py')} --size {size} --delay {delay}"
+
+
+def load_script(name: str, path: str):
+    """Import one of the hyphenated scripts as a module."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_copilot():
+    """
+    advent-agent.py with its journals and cave maps in a scratch directory,
+    so a run neither replays nor overwrites the user's own games.
+    """
+    copilot = load_script("advent_agent", os.path.join(ROOT, "advent-agent.py"))
+    scratch = tempfile.mkdtemp(prefix="advent-bench-")
+    atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+    copilot.POOL.journals = copilot.JournalStore(os.path.join(scratch, "journals"))
+    copilot.MAPS = copilot.MapStore(os.path.join(scratch, "maps"))
+    return copilot
+
+
+def timed(fn: Callable[[], object], reps: int) -> list[float]:
+    samples = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+async def atimed(fn, reps: int) -> list[float]:
+    samples = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+# ---------- benchmarks ----------
+
+def bench_advent_session(args, transport: str = "pty") -> list[float]:
+    from advent_session import AdventSession
+
+    session = AdventSession(game=fake_game(args.size, args.delay), transport=transport)
+    session.start()
+    try:
+        return timed(lambda: session.eval("look"), args.reps)
+    finally:
+        session.stop()
+
+
+def bench_async_advent_session(args, transport: str = "pty") -> list[float]:
+    from advent_aio import AsyncAdventSession
+
+    async def run() -> list[float]:
+        session = AsyncAdventSession(game=fake_game(args.size, args.delay), transport=transport)
+        session.start()
+        try:
+            return await atimed(lambda: session.eval("look"), args.reps)
+        finally:
+            session.stop()
+
+    return asyncio.run(run())
+
+
+def bench_game_session(args) -> list[float]:
+    from game_tool import GameSession
+
+    session = GameSession(cmd=fake_game(args.size, args.delay).split(), timeout=30.0)
+    try:
+        return timed(lambda: session.send("look"), args.reps)
+    finally:
+        session.close()
+
+
+def bench_bash_session(args) -> list[float]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        shell = load_script("stateful_shell", os.path.join(ROOT, "demo", "stateful-shell.py"))
+    command = f"sleep {args.delay}; head -c {args.size} /dev/zero | tr '\\0' x; echo"
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return timed(lambda: shell.bash.run(command, timeout=5.0), args.reps)
+    finally:
+        shell.bash.close()
+
+
+def bench_demo_loop(args) -> list[float]:
+    """Whole copilot turns: fake model -> game_eval tool -> fake game -> fake model."""
+    from fake_model import FakeModel, scripted_input
+    from loop import run_demo_loop
+    from metrics import METRICS
+
+    copilot = load_copilot()
+    game = fake_game(args.size, args.delay)
+    copilot.POOL.factory = lambda: copilot.AsyncAdventSession(game=game)
+    agent = copilot.build_agent()
+    agent.model = FakeModel()
+    real_input = builtins.input
+    builtins.input = scripted_input(["look"] * args.reps)
+    try:
+        copilot.POOL.fill()
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(run_demo_loop(agent))
+    finally:
+        builtins.input = real_input
+        copilot.POOL.close()
+    return list(METRICS.samples["turn.wall"])
+
+
+BENCHMARKS = {
+    "advent_session": bench_advent_session,
+    "async_advent_session": bench_async_advent_session,
+    # the same over plain pipes instead of a pty (ADVENT_TRANSPORT=pipe)
+    "advent_session_pipe": lambda args: bench_advent_session(args, "pipe"),
+    "async_advent_session_pipe": lambda args: bench_async_advent_session(args, "pipe"),
+    "game_session": bench_game_session,
+    "bash_session": bench_bash_session,
+    "demo_loop": bench_demo_loop,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("names", nargs="*", help=f"any of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--size", type=int, default=400, help="bytes per game response")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds the game waits per command")
+    parser.add_argument("--reps", type=int, default=50)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    unknown = set(args.names) - BENCHMARKS.keys()
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    print(f"{'benchmark':<26} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9}")
+    for name in args.names or BENCHMARKS:
+        try:
+            samples = BENCHMARKS[name](args)
+        except Exception as e:
+            results[name] = {"error": repr(e)}
+            print(f"{name:<26} failed: {e!r}")
+            continue
+        row = {
+            "n": len(samples),
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+            "ops_per_s": len(samples) / sum(samples) if samples else 0.0,
+        }
+        results[name] = row
+        print(
+            f"{name:<26} {row['n']:>5} {row['p50'] * 1000:>9.2f} {row['p95'] * 1000:>9.2f}"
+            f" {row['p99'] * 1000:>9.2f} {row['ops_per_s']:>9.1f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Callable, Optional
+
+from pydantic import TypeAdapter
+
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputItem,
+    ResponseOutputMessage,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+from agents import Agent, Model, ModelResponse, OpenAIProvider, Usage
+
+# ADVENT_CASSETTE=path turns the layer on; see Cassette for the mode and miss policy
+CASSETTE_PATH = os.environ.get("ADVENT_CASSETTE")
+CASSETTE_MODE = os.environ.get("ADVENT_CASSETTE_MODE", "replay")
+CASSETTE_MISS = os.environ.get("ADVENT_CASSETTE_MISS", "record")
+
+_OUTPUT = TypeAdapter(list[ResponseOutputItem])
+
+
+class CassetteMiss(LookupError):
+    """A replayed request was not on the cassette and the miss policy is 'fail'."""
+
+
+def _plain(obj: Any) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(exclude_none=True)
+    if hasattr(obj, "__dict__"):
+        return {k: v for k, v in vars(obj).items() if not k.startswith("_") and not callable(v)}
+    return str(obj)
+
+
+def request_key(**parts: Any) -> str:
+    """Stable hash of a model request: same instructions, input and tools -> same key."""
+    blob = json.dumps(parts, sort_keys=True, default=_plain, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+class Cassette:
+    """
+    Model responses on disk, keyed by request hash.
+
+    Two files: `<path>.dat` holds zlib-compressed JSON records back to back,
+    `<path>.idx` holds one "key offset length" line per record (last wins).
+    Only the index is loaded at open; records are read on demand.
+
+    mode:   'replay' serves recorded responses, 'record' always calls the
+            model and stores the answer.
+    miss:   what replay does on an unknown request: 'fail' raises
+            CassetteMiss, 'passthrough' calls the model without storing,
+            'record' calls the model and stores the answer.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", miss: str = "record"):
+        if mode not in ("replay", "record"):
+            raise ValueError(f"unknown cassette mode {mode!r}")
+        if miss not in ("fail", "passthrough", "record"):
+            raise ValueError(f"unknown cassette miss policy {miss!r}")
+        self.path, self.mode, self.miss = path, mode, miss
+        self.hits = self.misses = 0
+        self._index: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        try:
+            with open(path + ".idx") as f:
+                for line in f:
+                    key, offset, length = line.split()
+                    self._index[key] = (int(offset), int(length))
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.path + ".dat", "rb") as f:
+            f.seek(offset)
+            return json.loads(zlib.decompress(f.read(length)))
+
+    def put(self, key: str, record: dict) -> None:
+        data = zlib.compress(json.dumps(record, default=_plain, separators=(",", ":")).encode())
+        with self._lock:
+            with open(self.path + ".dat", "ab") as f:
+                offset = f.tell()
+                f.write(data)
+            with open(self.path + ".idx", "a") as f:
+                f.write(f"{key} {offset} {len(data)}\n")
+            self._index[key] = (offset, len(data))
+
+    def lookup(self, key: str) -> tuple[Optional[dict], bool]:
+        """Return (recorded record or None, whether a live answer should be stored)."""
+        if self.mode == "record":
+            return None, True
+        record = self.get(key)
+        if record is not None:
+            self.hits += 1
+            return record, False
+        self.misses += 1
+        if self.miss == "fail":
+            raise CassetteMiss(f"request {key} is not on cassette {self.path}")
+        return None, self.miss == "record"
+
+
+def _record(output: list[Any], usage: Usage, response_id: Optional[str]) -> dict:
+    return {
+        "output": [_plain(item) for item in output],
+        "usage": {"input_tokens": usage.input_tokens, "output_tokens": usage.output_tokens,
+                  "total_tokens": usage.total_tokens},
+        "response_id": response_id,
+        "recorded": time.time(),
+    }
+
+
+def _usage(record: dict) -> Usage:
+    u = record["usage"]
+    return Usage(requests=1, input_tokens=u["input_tokens"], output_tokens=u["output_tokens"],
+                 total_tokens=u["total_tokens"])
+
+
+class CassetteModel(Model):
+    """An agents Model that records/replays another Model through a Cassette."""
+
+    def __init__(self, inner: Model, cassette: Cassette, name: str = ""):
+        self.inner, self.cassette, self.name = inner, cassette, name
+
+    def _key(self, system_instructions, input, tools, output_schema) -> str:
+        return request_key(
+            model=self.name,
+            instructions=system_instructions,
+            input=input,
+            tools=[{"name": getattr(t, "name", ""), "description": getattr(t, "description", ""),
+                    "params": getattr(t, "params_json_schema", None)} for t in tools],
+            output_schema=output_schema.json_schema() if output_schema else None,
+        )
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, *args, **kwargs) -> ModelResponse:
+        key = self._key(system_instructions, input, tools, output_schema)
+        record, store = self.cassette.lookup(key)
+        if record is not None:
+            return ModelResponse(output=_OUTPUT.validate_python(record["output"]), usage=_usage(record),
+                                 response_id=record["response_id"])
+        response = await self.inner.get_response(system_instructions, input, model_settings, tools,
+                                                 output_schema, handoffs, tracing, *args, **kwargs)
+        if store:
+            self.cassette.put(key, _record(response.output, response.usage, response.response_id))
+        return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, *args, **kwargs) -> AsyncIterator[Any]:
+        key = self._key(system_instructions, input, tools, output_schema)
+        record, store = self.cassette.lookup(key)
+        if record is not None:
+            for event in _replay_events(record):
+                yield event
+            return
+        async for event in self.inner.stream_response(system_instructions, input, model_settings, tools,
+                                                      output_schema, handoffs, tracing, *args, **kwargs):
+            if store and isinstance(event, ResponseCompletedEvent):
+                r = event.response
+                usage = Usage(requests=1, input_tokens=r.usage.input_tokens, output_tokens=r.usage.output_tokens,
+                              total_tokens=r.usage.total_tokens) if r.usage else Usage()
+                self.cassette.put(key, _record(r.output, usage, r.id))
+            yield event
+
+
+def _replay_events(record: dict) -> list[Any]:
+    """The whole recorded answer as one text delta per message plus the completed event."""
+    output = _OUTPUT.validate_python(record["output"])
+    events: list[Any] = []
+    for n, item in enumerate(output):
+        if isinstance(item, ResponseOutputMessage):
+            text = "".join(getattr(part, "text", "") for part in item.content)
+            events.append(ResponseTextDeltaEvent.model_construct(
+                type="response.output_text.delta", item_id=item.id, output_index=n, content_index=0,
+                delta=text, logprobs=[], sequence_number=len(events)))
+    # model_construct: Response's required fields vary between openai releases
+    response = Response.model_construct(
+        id=record["response_id"] or "replayed", object="response", created_at=record["recorded"],
+        model="cassette", output=output, parallel_tool_calls=False, tool_choice="auto", tools=[],
+        usage=_response_usage(record["usage"]),
+    )
+    events.append(ResponseCompletedEvent.model_construct(
+        type="response.completed", response=response, sequence_number=len(events)))
+    return events
+
+
+def _response_usage(u: dict) -> ResponseUsage:
+    return ResponseUsage.model_construct(
+        input_tokens=u["input_tokens"], output_tokens=u["output_tokens"], total_tokens=u["total_tokens"],
+        input_tokens_details=InputTokensDetails.model_construct(cached_tokens=0),
+        output_tokens_details=OutputTokensDetails.model_construct(reasoning_tokens=0),
+    )
+
+
+def wrap_agent(agent: Agent, cassette: Cassette) -> Agent:
+    """Route `agent`'s model calls (a model name or Model) through `cassette`."""
+    model = agent.model
+    if isinstance(model, Model):
+        name = str(getattr(model, "model", type(model).__name__))
+    else:
+        name = model or ""
+        model = OpenAIProvider().get_model(model)
+    agent.model = CassetteModel(model, cassette, name=name)
+    return agent
+
+
+def wrap_responses(client: Any, cassette: Cassette) -> Any:
+    """Route a raw OpenAI client's responses.create() through `cassette`."""
+    create: Callable[..., Any] = client.responses.create
+
+    def recorded_create(**kwargs: Any) -> Any:
+        key = request_key(**{k: kwargs.get(k) for k in ("model", "instructions", "input", "tools")})
+        record, store = cassette.lookup(key)
+        if record is not None:
+            return Response.model_validate(record["response"])
+        response = create(**kwargs)
+        if store:
+            cassette.put(key, {"response": response.model_dump()})
+        return response
+
+    client.responses.create = recorded_create
+    return client
+
+
+def from_env() -> Optional[Cassette]:
+    """The cassette configured by ADVENT_CASSETTE*, or None."""
+    if not CASSETTE_PATH:
+        return None
+    return Cassette(CASSETTE_PATH, mode=CASSETTE_MODE, miss=CASSETTE_MISS)
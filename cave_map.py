@@ -0,0 +1,263 @@
+import json
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Override with ADVENT_MAP_DIR=/some/dir; one JSON file per session id
+MAP_DIR = os.environ.get("ADVENT_MAP_DIR", "maps")
+
+# Movement words and their canonical form. Anything not listed here is not
+# recorded as an edge, even if it happens to change the room.
+MOVES = {
+    "n": "north", "s": "south", "e": "east", "w": "west",
+    "ne": "northeast", "nw": "northwest", "se": "southeast", "sw": "southwest",
+    "u": "up", "d": "down", "in": "enter", "inside": "enter", "outside": "out",
+    "exit": "out",
+}
+MOVES.update({v: v for v in list(MOVES.values())})
+MOVES.update({w: w for w in (
+    "upstream", "downstream", "forward", "back", "cross", "climb", "jump", "crawl",
+    "road", "building", "forest", "valley", "stairs", "gully", "stream", "hill",
+    "depression", "cave", "entrance", "passage", "canyon", "slab", "outdoors",
+    "xyzzy", "plugh", "plover", "y2", "bedquilt", "oriental", "cavern", "reservoir",
+    "barren", "office", "secret", "debris", "hall", "crack", "dome",
+)})
+
+# First lines that describe a place rather than report a failure
+_ROOM_START = re.compile(r"^(you're|you are|you have (walked|crawled|climbed)|dead end)", re.I)
+_NOT_ROOM = re.compile(
+    r"^(you're not|you are not|you are already|you can't|you have no|you have nothing|you are carrying"
+    r"|you're carrying|you are being|you're being|you are currently holding)", re.I)
+LOOK = {"look", "l"}
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+# Advent's short revisit descriptions: "You're at end of road again."
+_SHORT = re.compile(r"^you're (.+?)(?: again)?$")
+# what the long description may have between the short one's words
+_FILLER = r"(?:\W+(?:a|an|the|some))*\W+"
+
+
+def room_key(response: str) -> Optional[str]:
+    """
+    Return a stable room id for a response that describes a room, else None.
+
+    The id is the first sentence of the first paragraph, lower-cased with
+    whitespace collapsed.
+    """
+    text = response.replace("\r\n", "\n").strip()
+    if not text:
+        return None
+    para = " ".join(text.split("\n\n", 1)[0].split())
+    if not _ROOM_START.match(para) or _NOT_ROOM.match(para):
+        return None
+    first = _SENTENCE_END.split(para, 1)[0]
+    return first.rstrip(".!").lower()
+
+
+def move_verb(command: str) -> Optional[str]:
+    words = command.strip().lower().split()
+    if not words:
+        return None
+    verb = words[-1] if words[0] in ("go", "walk", "run") and len(words) > 1 else words[0]
+    return MOVES.get(verb)
+
+
+@dataclass
+class CaveMap:
+    """
+    Directed room graph learned from command/response pairs.
+
+    edges[room][verb] -> room gives O(1) exits per room; incoming() is O(E).
+    Advent prints a short description on revisits, so a never-seen
+    description reached over a known edge is recorded as an alias of the
+    edge's known target, as is a short one ("You're at end of road again.")
+    that opens exactly one known room id ("you are standing at the end of
+    a road..."), whichever way it was reached. A 'look' that prints a
+    different description for the current room merges the two.
+    """
+    rooms: dict[str, str] = field(default_factory=dict)   # id -> first full description
+    edges: dict[str, dict[str, str]] = field(default_factory=dict)
+    aliases: dict[str, str] = field(default_factory=dict)
+    current: Optional[str] = None
+    dirty: bool = field(default=False, compare=False)
+
+    def resolve(self, key: str) -> str:
+        return self.aliases.get(key, key)
+
+    def observe(self, command: str, response: str) -> Optional[str]:
+        """Fold one command/response pair into the graph; return the current room."""
+        key = room_key(response)
+        if key is None:
+            return self.current
+        verb = move_verb(command)
+        prev = self.current
+        if prev is not None and verb is None and command.strip().lower() in LOOK:
+            if self.resolve(key) != prev:
+                self._merge(prev, self.resolve(key))
+            prev = self.current = self.resolve(key)
+        if key not in self.rooms and key not in self.aliases:
+            known = self.edges.get(prev, {}).get(verb) if prev and verb else None
+            target = known if known is not None else self._short_form_of(key)
+            if target is not None:
+                self.aliases[key] = target
+                self.dirty = True
+        room = self.resolve(key)
+        if room not in self.rooms:
+            self.rooms[room] = " ".join(response.split())
+            self.edges.setdefault(room, {})
+            self.dirty = True
+        if prev is not None and verb is not None and room != prev and self.edges[prev].get(verb) != room:
+            self.edges[prev][verb] = room
+            self.dirty = True
+        if room != self.current:
+            self.current = room
+            self.dirty = True
+        return room
+
+    def _short_form_of(self, key: str) -> Optional[str]:
+        """The one known room that short description `key` can stand for, else None. O(V)."""
+        m = _SHORT.match(key)
+        if m is None:
+            return None
+        words = re.findall(r"[\w-]+", m.group(1))
+        # right after "you are", allowing one word ("standing at the end of a road")
+        phrase = re.compile(r"^you are(?:\W+\w+)?\W+" + _FILLER.join(map(re.escape, words)) + r"\b")
+        hits = [room for room in self.rooms if phrase.match(room)]
+        return hits[0] if len(hits) == 1 else None
+
+    def _merge(self, old: str, new: str) -> None:
+        """Fold room `old` into `new` (they are two descriptions of one place). O(E)."""
+        self.aliases[old] = new
+        for alias, target in self.aliases.items():
+            if target == old:
+                self.aliases[alias] = new
+        self.rooms.setdefault(new, self.rooms.get(old, ""))
+        self.rooms.pop(old, None)
+        merged = self.edges.setdefault(new, {})
+        for verb, dst in self.edges.pop(old, {}).items():
+            merged.setdefault(verb, dst)
+        for out in self.edges.values():
+            for verb, dst in out.items():
+                if dst == old:
+                    out[verb] = new
+        for verb in [v for v, dst in merged.items() if dst == new]:
+            del merged[verb]
+        if self.current == old:
+            self.current = new
+        self.dirty = True
+
+    def exits(self, room: Optional[str] = None) -> dict[str, str]:
+        return dict(self.edges.get(self.resolve(room) if room else self.current, {}))
+
+    def incoming(self, room: str) -> list[tuple[str, str]]:
+        room = self.resolve(room)
+        return [(src, verb) for src, out in self.edges.items() for verb, dst in out.items() if dst == room]
+
+    def path(self, src: str, dst: str) -> Optional[list[tuple[str, str]]]:
+        """
+        Shortest known route from `src` to `dst` as [(verb, room reached), ...].
+
+        Breadth-first over learned edges, O(V + E). Returns [] when already
+        there and None when no route is known.
+        """
+        src, dst = self.resolve(src), self.resolve(dst)
+        if src == dst:
+            return []
+        came_from: dict[str, tuple[str, str]] = {src: ("", "")}
+        frontier = deque([src])
+        while frontier:
+            room = frontier.popleft()
+            for verb, nxt in sorted(self.edges.get(room, {}).items()):
+                if nxt in came_from:
+                    continue
+                came_from[nxt] = (room, verb)
+                if nxt == dst:
+                    steps = []
+                    while nxt != src:
+                        prev, verb = came_from[nxt]
+                        steps.append((verb, nxt))
+                        nxt = prev
+                    return steps[::-1]
+                frontier.append(nxt)
+        return None
+
+    def find(self, query: str) -> list[str]:
+        """Room ids whose id or description contains `query`, exact id first."""
+        q = " ".join(query.lower().split())
+        if q in self.rooms:
+            return [q]
+        if q in self.aliases:
+            return [self.aliases[q]]
+        return [r for r, desc in self.rooms.items() if q in r or q in desc.lower()]
+
+    def summary(self) -> str:
+        lines = [f"{len(self.rooms)} rooms known. Current: {self.current or 'unknown'}"]
+        for verb, dst in sorted(self.exits().items()):
+            lines.append(f"  {verb} -> {dst}")
+        return "\n".join(lines)
+
+    # ---- persistence ----
+
+    def to_dict(self) -> dict:
+        return {"rooms": self.rooms, "edges": self.edges, "aliases": self.aliases, "current": self.current}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "CaveMap":
+        return cls(rooms=d.get("rooms", {}), edges=d.get("edges", {}),
+                   aliases=d.get("aliases", {}), current=d.get("current"))
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "CaveMap":
+        try:
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return cls()
+
+
+class MapStore:
+    """One CaveMap per session id, loaded lazily and saved after each update."""
+
+    def __init__(self, directory: str = MAP_DIR):
+        self.directory = directory
+        self._maps: dict[str, CaveMap] = {}
+
+    def _path(self, session_id: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)
+        return os.path.join(self.directory, f"{safe}.json")
+
+    def get(self, session_id: str) -> CaveMap:
+        m = self._maps.get(session_id)
+        if m is None:
+            m = self._maps[session_id] = CaveMap.load(self._path(session_id))
+        return m
+
+    def observe(self, session_id: str, command: str, response: str) -> Optional[str]:
+        m = self.get(session_id)
+        room = m.observe(command, response)
+        if m.dirty:
+            m.save(self._path(session_id))
+        return room
+
+    def drop(self, session_id: str) -> None:
+        """Forget the session's map and delete its file."""
+        self._maps.pop(session_id, None)
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def restarted(self, session_id: str) -> None:
+        """The game was restarted: the map still holds, the position does not."""
+        m = self.get(session_id)
+        m.current = None
+        m.save(self._path(session_id))
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+# Rough size of a token in characters; good enough for budgeting, no tokenizer needed
+CHARS_PER_TOKEN = 4
+# Collapsed tool outputs keep this much of their first line
+SUMMARY_CHARS = 100
+
+
+def estimate_tokens(item: Any) -> int:
+    text = item if isinstance(item, str) else json.dumps(item, default=str)
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _is_user_turn(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("role") == "user" and item.get("type", "message") == "message"
+
+
+def _is_game_reply(item: Any) -> bool:
+    # game output the fast path answered with, recorded as a plain-text
+    # assistant message (the model's own messages are lists of parts)
+    return isinstance(item, dict) and item.get("role") == "assistant" and isinstance(item.get("content"), str)
+
+
+def _summarize(output: str) -> str:
+    first = output.strip().split("\n", 1)[0]
+    try:
+        # a batch of game commands (game_eval_batch, game_fork): name them
+        results = json.loads(output)
+        if isinstance(results, list) and results and all(isinstance(r, dict) for r in results):
+            first = "; ".join(r["command"] for r in results if "command" in r) or first
+    except ValueError:
+        pass
+    if len(first) > SUMMARY_CHARS:
+        first = first[:SUMMARY_CHARS] + "..."
+    return f"{first} [earlier output, {len(output)} chars elided]"
+
+
+def _collapse(text: Any) -> Any:
+    if isinstance(text, str) and len(text) > SUMMARY_CHARS * 2 and "chars elided]" not in text:
+        return _summarize(text)
+    return text
+
+
+def compact(items: list[Any], budget: int, keep_turns: int = 2) -> tuple[list[Any], int]:
+    """
+    Shrink a conversation to about `budget` tokens.
+
+    The last `keep_turns` user turns are kept verbatim. Before that, tool
+    outputs (game_eval, game_eval_batch, route_to...) and game replies
+    from the fast path are collapsed to a one-line summary, then, if still
+    over budget, whole turns are dropped oldest first. Tool calls keep their
+    outputs (only the text shrinks), so call/output pairs stay matched.
+
+    Returns the new item list and the estimated tokens saved.
+    """
+    before = sum(estimate_tokens(i) for i in items)
+    if before <= budget:
+        return items, 0
+
+    starts = [n for n, item in enumerate(items) if _is_user_turn(item)]
+    cut = starts[-keep_turns] if len(starts) >= keep_turns else 0
+    old, recent = items[:cut], items[cut:]
+
+    collapsed = []
+    for item in old:
+        if isinstance(item, dict) and item.get("type") == "function_call_output":
+            item = {**item, "output": _collapse(item.get("output"))}
+        elif _is_game_reply(item):
+            item = {**item, "content": _collapse(item["content"])}
+        collapsed.append(item)
+
+    total = sum(estimate_tokens(i) for i in collapsed) + sum(estimate_tokens(i) for i in recent)
+    while total > budget and collapsed:
+        # drop the oldest whole turn: everything up to the next user message
+        end = next((n for n in range(1, len(collapsed)) if _is_user_turn(collapsed[n])), len(collapsed))
+        total -= sum(estimate_tokens(i) for i in collapsed[:end])
+        collapsed = collapsed[end:]
+
+    result = collapsed + recent
+    return result, before - total
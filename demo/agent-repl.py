@@ -1,10 +1,14 @@
-import asyncio, json, pty, os, signal
+import asyncio, json, pty, os, signal, sys
 import pexpect
 from typing import Any
 from agents import Agent, Runner, function_tool, RunContextWrapper, SQLiteSession
 
-# One REPL per session_id
-REPLS: dict[str, pexpect.spawn] = {}
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lifecycle import ChildRegistry
+
+# One REPL per session_id; idle and excess children are evicted, dead ones reaped
+# (limits from ADVENT_REPL_MAX_SESSIONS, _IDLE_TIMEOUT, _MEMORY_MB, _CPU_SECONDS)
+REPLS = ChildRegistry()
 
 def _key(ctx: RunContextWrapper[Any]) -> str:
     # session_id is set when you pass a Session to Runner.run(...)
@@ -21,12 +25,8 @@ def repl_start(ctx: RunContextWrapper[Any], cmd: str = "/usr/local/cellar/open-a
       timeout: Seconds to wait for the initial prompt.
     """
     sid = _key(ctx)
-    # Clean up any stale child
-    if sid in REPLS:
-        try: REPLS[sid].close(force=True)
-        except Exception: pass
-
-    child = pexpect.spawn(cmd, cwd=cwd, encoding="utf-8", timeout=timeout)
+    # Replaces (and closes) any previous child of this session
+    child = REPLS.spawn(sid, cmd, cwd=cwd, encoding="utf-8", timeout=timeout)
     # Make it look like a terminal
     child.setwinsize(40, 120)
     # Try to slurp whatever banner/prompt appears (best-effort)
@@ -35,7 +35,6 @@ def repl_start(ctx: RunContextWrapper[Any], cmd: str = "/usr/local/cellar/open-a
     except Exception:
         pass
 
-    REPLS[sid] = child
     return f"started:{cmd}"
 
 @function_tool
@@ -48,11 +47,13 @@ def repl_send(ctx: RunContextWrapper[Any], line: str, expect: str | None = None,
       expect: Optional regex/prompt to wait for; if None, try common prompts.
       timeout: Seconds to wait for output before giving up.
     """
-    sid = _key(ctx)
-    if sid not in REPLS:
-        return "error:repl_not_started"
+    # leased: the reaper won't close the child while we wait on it
+    with REPLS.lease(_key(ctx)) as child:
+        if child is None:
+            return "error:repl_not_started"
+        return _send(child, line, expect, timeout)
 
-    child = REPLS[sid]
+def _send(child: pexpect.spawn, line: str, expect: str | None, timeout: float) -> str:
     child.sendline(line)
 
     patterns = [expect] if expect else [
@@ -72,18 +73,8 @@ def repl_send(ctx: RunContextWrapper[Any], line: str, expect: str | None = None,
 @function_tool
 def repl_stop(ctx: RunContextWrapper[Any]) -> str:
     """Terminate the REPL for this session."""
-    sid = _key(ctx)
-    ch = REPLS.pop(sid, None)
-    if not ch:
+    if not REPLS.stop(_key(ctx)):
         return "stopped:none"
-    try:
-        ch.sendeof()
-    except Exception:
-        pass
-    try:
-        ch.close(force=True)
-    except Exception:
-        pass
     return "stopped:ok"
 
 # --- Wire up the Agent ---
@@ -110,4 +101,8 @@ async def main():
     await Runner.run(agent, "Stop the REPL.", session=session)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    finally:
+        print(f"repls: {REPLS.stats()}")
+        REPLS.close()
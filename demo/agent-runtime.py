@@ -3,7 +3,9 @@
 import asyncio, os, re, signal, sys, time
 from dataclasses import dataclass
 from typing import Optional, Literal
-from pexpect.replwrap import REPLWrapper
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from procio import Process, PromptProtocol
 
 FENCE_RE = re.compile(r"```(?:python)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
 
@@ -28,30 +30,29 @@ class StepResult:
 
 class Repl:
     def __init__(self):
-        self.repl = self._spawn()
-
-    def _spawn(self) -> REPLWrapper:
-        return REPLWrapper(
-            "python3 -q",
-            r">>> ",
-            prompt_change=None,
-            continuation_prompt=r"\.\.\. "
+        self.proc = self._spawn()
+
+    def _spawn(self) -> Process:
+        # -i over pipes: prompts without readline echo; -u keeps prints in order with the prompts
+        proc = Process(
+            ["python3", "-q", "-u", "-i"],
+            PromptProtocol(r">>> ", continuation=r"\.\.\. "),
+            name="python",
         )
+        proc.start()
+        return proc
 
     def reset(self):
-        try:
-            self.repl.child.close(force=True)
-        except Exception:
-            pass
-        self.repl = self._spawn()
+        self.proc.stop()
+        self.proc = self._spawn()
 
     def run(self, code: str, timeout: float = 15.0) -> str:
-        return self.repl.run_command(code + "\n", timeout=timeout).rstrip()
+        return self.proc.run(code + "\n", timeout=timeout).output.rstrip()
 
     def interrupt(self):
         # Send Ctrl-C to the child if supported
         try:
-            self.repl.child.sendintr()
+            self.proc.interrupt()
         except Exception:
             pass
 
@@ -1,8 +1,16 @@
 # agent_runner.py
+import os, sys
 from openai import OpenAI
 from game_tool import game_io
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import cassette
+
 client = OpenAI()
+# ADVENT_CASSETTE=path records/replays the model calls
+tape = cassette.from_env()
+if tape is not None:
+    cassette.wrap_responses(client, tape)
 
 # 1) Declare the tool schema for the model
 tools = [
@@ -0,0 +1,218 @@
+# batch_runner.py
+# Play many games headless and collect outcomes, e.g. to compare prompts or models overnight.
+#
+#   python batch_runner.py --games 200 --concurrency 16 --model gpt-4o-mini --out runs/
+#   python batch_runner.py --games 20 --fake            # offline, scripted model + bench/fake_advent.py
+#
+# Each game runs in its own worker process (this file with --worker) that owns a GameSession
+# and speaks JSON lines on stdin/stdout. Model calls for all games share one asyncio loop.
+import argparse, asyncio, json, os, re, statistics, sys, time
+from dataclasses import dataclass, asdict, field
+from typing import Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+GAME = os.environ.get("ADVENT_GAME", "/usr/local/cellar/open-adventure/1.20/bin/advent")
+
+INSTRUCTIONS = """You are an expert player of a text-based adventure.
+Always reason briefly about the current scene, then choose exactly one next command.
+Use the tool 'game_io' to send commands. The game prompt ends with '>'.
+Prefer concise commands: 'look', 'inventory', compass directions, 'get X', 'open Y'.
+Stop if the game ends or if you're stuck and need human input.
+"""
+
+SCORE = re.compile(r"scored\s+(\d+)\s+out of a possible\s+(\d+)", re.I)
+
+# ---------- worker process ----------
+
+def worker(game: str) -> None:
+    from game_tool import GameSession
+    session = GameSession(cmd=game.split(), timeout=6.0)
+    for line in sys.stdin:
+        command = json.loads(line)["command"]
+        try:
+            out = session.send(command)
+        except Exception as e:
+            out = f"[game error] {e!r}"
+        # drop the pty echo of the command itself and the trailing prompt
+        out = out.replace("\r\n", "\n")
+        if out.startswith(command):
+            out = out[len(command):]
+        out = re.sub(r"\n?>\s*$", "", out)
+        sys.stdout.write(json.dumps({"output": out.strip()}) + "\n")
+        sys.stdout.flush()
+
+
+class GameWorker:
+    """Handle on one worker process, used as the run context for the game_io tool."""
+
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self.steps = 0
+        self.transcript: list[tuple[str, str]] = []
+
+    @classmethod
+    async def start(cls, game: str) -> "GameWorker":
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--worker", "--game", game,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, cwd=HERE,
+        )
+        return cls(proc)
+
+    async def send(self, command: str) -> str:
+        self.proc.stdin.write((json.dumps({"command": command}) + "\n").encode())
+        await self.proc.stdin.drain()
+        line = await self.proc.stdout.readline()
+        if not line:
+            raise EOFError("game worker exited")
+        out = json.loads(line)["output"]
+        self.transcript.append((command, out))
+        return out
+
+    async def close(self) -> None:
+        if self.proc.returncode is None:
+            self.proc.stdin.close()
+            try:
+                await asyncio.wait_for(self.proc.wait(), 2)
+            except asyncio.TimeoutError:
+                self.proc.kill()
+                await self.proc.wait()
+
+# ---------- scheduler ----------
+
+@dataclass
+class Outcome:
+    game: int
+    score: Optional[int] = None
+    max_score: Optional[int] = None
+    steps: int = 0
+    wall: float = 0.0
+    end: str = "finished"       # finished | max_steps | error
+    error: str = ""
+    final: str = ""
+    transcript: list = field(default_factory=list)
+
+
+def build_agent(args, game_no: int):
+    from agents import Agent, RunContextWrapper, function_tool
+
+    @function_tool
+    async def game_io(ctx: RunContextWrapper[GameWorker], command: str) -> str:
+        """Send one command to the text adventure and get the resulting screen.
+
+        Args:
+            command: A single game command like 'look', 'north', 'get lamp'.
+        """
+        ctx.context.steps += 1
+        return await ctx.context.send(command)
+
+    agent = Agent(name="Adventurer", instructions=args.instructions, model=args.model, tools=[game_io])
+    if args.fake:
+        sys.path.insert(0, os.path.join(ROOT, "bench"))
+        from fake_model import FakeModel
+        walk = ["look", "east", "get lamp", "west", "inventory", "score"]
+        agent.model = FakeModel(script=[{"tool": "game_io", "args": {"command": c}} for c in walk]
+                                + [{"text": f"game {game_no} done"}])
+    return agent
+
+
+async def play(args, game_no: int, slots: asyncio.Semaphore) -> Outcome:
+    from agents import Runner, MaxTurnsExceeded
+    async with slots:
+        outcome = Outcome(game=game_no)
+        t0 = time.perf_counter()
+        game = await GameWorker.start(args.game)
+        try:
+            opening = await game.send("y")
+            result = await Runner.run(
+                build_agent(args, game_no),
+                f"You're connected to the game. Opening screen:\n\n{opening}\n\nPlay to reach the main goal.",
+                context=game, max_turns=args.max_steps,
+            )
+            outcome.final = str(result.final_output or "")
+        except MaxTurnsExceeded:
+            outcome.end = "max_steps"
+        except Exception as e:
+            outcome.end, outcome.error = "error", repr(e)
+        try:
+            m = SCORE.search(await game.send("score"))
+            if m:
+                outcome.score, outcome.max_score = int(m.group(1)), int(m.group(2))
+        except Exception:
+            pass
+        await game.close()
+        outcome.steps = game.steps
+        outcome.wall = time.perf_counter() - t0
+        outcome.transcript = game.transcript
+        print(f"game {game_no}: {outcome.end} score={outcome.score} steps={outcome.steps} "
+              f"{outcome.wall:.1f}s", flush=True)
+        return outcome
+
+
+def aggregate(outcomes: list[Outcome], wall: float) -> dict:
+    def stats(values):
+        values = [v for v in values if v is not None]
+        if not values:
+            return None
+        return {"mean": statistics.fmean(values), "median": statistics.median(values),
+                "min": min(values), "max": max(values)}
+    ends: dict[str, int] = {}
+    for o in outcomes:
+        ends[o.end] = ends.get(o.end, 0) + 1
+    return {
+        "games": len(outcomes),
+        "ends": ends,
+        "score": stats([o.score for o in outcomes]),
+        "steps": stats([o.steps for o in outcomes]),
+        "wall": stats([o.wall for o in outcomes]),
+        "total_wall": wall,
+        "games_per_hour": len(outcomes) / wall * 3600 if wall else 0.0,
+    }
+
+
+async def run_batch(args) -> None:
+    slots = asyncio.Semaphore(args.concurrency)
+    t0 = time.perf_counter()
+    outcomes = await asyncio.gather(*(play(args, n, slots) for n in range(args.games)))
+    summary = aggregate(outcomes, time.perf_counter() - t0)
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "games.jsonl"), "w") as f:
+        for o in outcomes:
+            f.write(json.dumps(asdict(o)) + "\n")
+    with open(os.path.join(args.out, "summary.json"), "w") as f:
+        json.dump({"model": args.model, "instructions": args.instructions, **summary}, f, indent=1)
+    print(json.dumps(summary, indent=1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--max-steps", type=int, default=50)
+    parser.add_argument("--instructions", help="file with the system instructions")
+    parser.add_argument("--game", default=GAME)
+    parser.add_argument("--out", default="batch-results")
+    parser.add_argument("--fake", action="store_true", help="scripted model and fake game, no API key needed")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.game)
+        return
+    if args.fake:
+        os.environ.setdefault("OPENAI_API_KEY", "offline")
+        os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+        if args.game == GAME:
+            args.game = f"{sys.executable} {os.path.join(ROOT, 'bench', 'fake_advent.py')}"
+    if args.instructions:
+        with open(args.instructions) as f:
+            args.instructions = f.read()
+    else:
+        args.instructions = INSTRUCTIONS
+    asyncio.run(run_batch(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,39 @@
 # game_tool.py
-import os, pexpect, re, time
+import os, re, shlex, sys
 from typing import Optional
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from advent_parser import EVENTS, parse
+from advent_session import start_game
+from advent_vocab import awaiting_answer, check, rejection
+from metrics import METRICS
+
 class GameSession:
-    def __init__(self, cmd: list[str], prompt_regex: str, timeout: float = 5.0, encoding="utf-8"):
-        self.prompt = re.compile(prompt_regex, re.MULTILINE)
-        self.child = pexpect.spawnu(" ".join(cmd), timeout=timeout, encoding=encoding)
-        self.child.delaybeforesend = 0  # snappy input
-        self._drain_banner()
+    """
+    One game on a procio.Process, started like the copilot's sessions
+    (advent_session.start_game): same reader, response framing and restart
+    after the game exits.
+    """
 
-    def _read_until_prompt(self) -> str:
-        """Read until prompt or EOF/timeout; return whatever we got."""
-        buf = []
-        start = time.time()
-        while True:
-            try:
-                chunk = self.child.read_nonblocking(size=1024, timeout=0.2)
-                buf.append(chunk)
-                if self.prompt.search("".join(buf)):
-                    break
-            except pexpect.TIMEOUT:
-                # soft timeout: if we've already read something, return it
-                if (time.time() - start) > self.child.timeout:
-                    break
-            except pexpect.EOF:
-                break
-        return "".join(buf)
-
-    def _drain_banner(self) -> str:
-        # Grab the initial splash screen/opening text
-        try:
-            time.sleep(0.1)
-            return self._read_until_prompt()
-        except Exception:
-            return ""
+    def __init__(self, cmd: list[str], timeout: float = 5.0, transport: str = "pty"):
+        self.timeout = timeout
+        self.proc = start_game(shlex.join(cmd), transport)
+        self.last = self.proc.banner
 
     def send(self, line: str) -> str:
-        if not line.endswith("\n"):
-            line += "\n"
-        self.child.send(line)
-        # Some games echo; a short pause helps coalesce output
-        time.sleep(0.05)
-        out = self._read_until_prompt()
-        # optional: trim ANSI codes if your game uses color
+        try:
+            out = self.proc.run(line.rstrip("\n"), timeout=self.timeout).output
+        except TimeoutError:
+            out = f"[no response from the game within {self.timeout}s]"
+        except EOFError:
+            self.proc.stop()  # the next run() starts a new game
+            out = "[the game exited; the next command starts a new one]"
+        self.last = out
         return out
 
+    def close(self) -> None:
+        self.proc.stop()
+
 # Singleton-ish session for the process lifetime
 _game: Optional[GameSession] = None
 
@@ -53,22 +42,61 @@ def get_game() -> GameSession:
     if _game is None:
         _game = GameSession(
             cmd=["/usr/local/cellar/open-adventure/1.20/bin/advent"],          # e.g., "./adventure"
-            prompt_regex=r"\n?>\s*$",            # e.g., lines ending with ">"
             timeout=6.0
         )
     return _game
 
+
+_PROMPT_TAIL = re.compile(r"\n?>\s*$")
+
+def _validate(session: GameSession, command: str) -> tuple[str, Optional[dict]]:
+    """(command to send, None) or (command, rejection) when advent would not know a word."""
+    if awaiting_answer(_PROMPT_TAIL.sub("", session.last)):
+        return command, None
+    canonical, unknown = check(command)
+    if unknown:
+        METRICS.count("vocab.round_trips_avoided")
+        return command, rejection(command, unknown)
+    return canonical or command, None
+
 # ---- Tool entrypoint the agent will call
 def game_io(command: str) -> dict:
     """
-    Sends a command to the game and returns the resulting text block.
+    Sends a command to the game and returns the resulting text block plus
+    the parsed game state (location, objects, score, events...).
     Return shape is a dict to stay friendly with tool schemas.
     """
     print("send: ",  command)
     session = get_game()
+    command, rejected = _validate(session, command)
+    if rejected:
+        return {"output": "", **rejected}
     text = session.send(command)
     # Safety: truncate huge blobs
     if len(text) > 20000:
         text = text[:20000] + "\n...[truncated]..."
     print("reply:" , text)
-    return {"output": text}
+    return {"output": text, "state": parse(text, command).compact()}
+
+def game_io_batch(commands: list[str], stop_on: Optional[list[str]] = None) -> dict:
+    """
+    Sends several commands in order and returns one result per command.
+    Stops early once a response reports one of the `stop_on` events
+    ("death", "unknown_word", "darkness"); the rest are listed as skipped.
+    """
+    stop = set(stop_on or ()) & EVENTS.keys()
+    session = get_game()
+    results = []
+    for command in commands:
+        command, rejected = _validate(session, command)
+        if rejected:
+            results.append({"command": command, "output": "", **rejected})
+            break
+        text = session.send(command)
+        if len(text) > 20000:
+            text = text[:20000] + "\n...[truncated]..."
+        hit = [name for name in stop if EVENTS[name].search(text)]
+        results.append({"command": command, "output": text, "events": hit})
+        if hit:
+            break
+    return {"results": results, "skipped": commands[len(results):]}
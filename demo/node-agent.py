@@ -1,43 +1,39 @@
 import asyncio
+import os
+import sys
 from dataclasses import dataclass
 from typing import Optional
 
-import pexpect
-from pexpect.replwrap import REPLWrapper
-
 from agents import Agent, Runner, RunContextWrapper, function_tool, run_demo_loop
 
-# ---------- Node REPL manager (pexpect) ----------
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from procio import Process, PromptProtocol
+
+# ---------- Node REPL manager ----------
 
 @dataclass
 class NodeSession:
-    repl: Optional[REPLWrapper] = None
-    proc: Optional[pexpect.spawn] = None
+    proc: Optional[Process] = None
 
     def start(self) -> None:
         # Start a fresh Node REPL
         # - 'node' uses '> ' as the prompt and '... ' for multiline continuation
-        # - We don't change the prompt (prompt_change=None)
-        self.proc = pexpect.spawn("node", encoding="utf-8", timeout=10)
-        self.repl = REPLWrapper(self.proc, orig_prompt="> ", prompt_change=None, continuation_prompt="... ")
+        # - NODE_NO_READLINE keeps it from echoing input and colouring output
+        self.proc = Process(
+            ["node"], PromptProtocol("> ", continuation=r"\.\.\. "), pty=True, name="node",
+            env=dict(os.environ, NODE_NO_READLINE="1"),
+        )
+        self.proc.start(timeout=10)
         # Small sanity check
-        _ = self.repl.run_command("process.version")
+        _ = self.proc.run("process.version")
 
     def stop(self) -> None:
         if self.proc is not None:
-            try:
-                self.proc.sendline(".exit")
-                self.proc.expect(pexpect.EOF, timeout=2)
-            except Exception:
-                try:
-                    self.proc.terminate(force=True)
-                except Exception:
-                    pass
-        self.repl = None
+            self.proc.stop()
         self.proc = None
 
     def ensure_running(self) -> None:
-        if self.repl is None or self.proc is None or not self.proc.isalive():
+        if self.proc is None or not self.proc.isalive():
             self.stop()
             self.start()
 
@@ -46,10 +42,8 @@ class NodeSession:
         Evaluate JavaScript in the Node REPL and return the REPL's textual output.
         """
         self.ensure_running()
-        # REPLWrapper.run_command returns the text printed between prompts.
-        # Node echoes results; errors also appear here.
-        out = self.repl.run_command(code, timeout=15)
-        return out.strip()
+        # The text printed between prompts: node echoes results; errors also appear here.
+        return self.proc.run(code, timeout=15).output
 
 
 # A singleton session for this process
@@ -83,7 +77,7 @@ def node_eval(ctx: RunContextWrapper[None], code: str) -> str:
     try:
         NODE.ensure_running()
         return NODE.eval(code)
-    except pexpect.TIMEOUT:
+    except TimeoutError:
         return "Timed out waiting for REPL output. You may try node_reset()."
     except Exception as e:
         return f"REPL error: {e!r}"
@@ -1,25 +1,23 @@
 # generated byt cahtgpt5
 
 #!/usr/bin/env python3
-import subprocess
-import uuid
-import time
 import os
-import select
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from procio import OUTPUT_CAP, Process, SentinelProtocol
 
 class BashAgent:
     def __init__(self, bash_path="/bin/bash"):
         # Start a *persistent* bash with a clean environment (no rc/profile)
-        self.proc = subprocess.Popen(
+        self.proc = Process(
             [bash_path, "--noprofile", "--norc"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1  # line-buffered
+            SentinelProtocol(),  # unique marker echoed with $? after each command
+            name="bash",
+            cap=OUTPUT_CAP,
+            spill=True,
         )
-        if self.proc.stdin is None or self.proc.stdout is None:
-            raise RuntimeError("Failed to create pipes to bash")
+        self.proc.start()
 
     def run(self, cmd: str, timeout: float = 10.0):
         """
@@ -27,63 +25,20 @@ class BashAgent:
         Returns (exit_code:int, output:str).
 
         The shell is persistent, so things like `cd` will carry over to
-        subsequent calls.
+        subsequent calls. Output over OUTPUT_CAP keeps its first and last
+        half, with a note of how much was dropped and which temp file holds
+        all of it.
         """
-        if self.proc.poll() is not None:
+        if not self.proc.isalive():
             raise RuntimeError("Bash process is not running")
 
-        # Unique marker to know when the command is finished and capture exit code
-        marker = f"__CMD_DONE__{uuid.uuid4().hex}__"
-        trailer = f'echo {marker} $?'
-
-        # Write the command + trailer to the shell
-        self.proc.stdin.write(cmd.rstrip() + "\n" + trailer + "\n")
-        self.proc.stdin.flush()
-
-        # Read until we see the marker line
-        output_lines = []
-        end_line = None
-        deadline = time.monotonic() + timeout
-
-        # Use select() so we can enforce a timeout without blocking indefinitely
-        fd = self.proc.stdout.fileno()
-
-        while time.monotonic() < deadline:
-            r, _, _ = select.select([fd], [], [], max(0.0, deadline - time.monotonic()))
-            if not r:
-                continue  # timeout slice elapsed, loop again
-
-            line = self.proc.stdout.readline()
-            if not line:  # EOF
-                break
-
-            # Strip trailing newline to make processing a bit easier
-            stripped = line.rstrip("\n")
-            if stripped.startswith(marker + " "):
-                end_line = stripped
-                break
-            else:
-                output_lines.append(line)  # keep original with newline
-
-        if end_line is None:
-            raise TimeoutError(f"Command did not finish within {timeout} seconds")
-
-        # Parse exit code from the marker line
-        try:
-            exit_code = int(end_line.split(" ", 1)[1])
-        except Exception:
-            exit_code = 1  # fall back if parsing fails
-
-        return exit_code, "".join(output_lines)
+        result = self.proc.run(cmd, timeout=timeout)
+        # fall back to 1 if the exit code could not be parsed
+        exit_code = result.exit_code if result.exit_code is not None else 1
+        return exit_code, result.output
 
     def close(self):
-        if self.proc.poll() is None:
-            try:
-                self.proc.stdin.write("exit\n")
-                self.proc.stdin.flush()
-            except Exception:
-                pass
-            self.proc.wait(timeout=2.0)
+        self.proc.stop()
 
 if __name__ == "__main__":
     sh = BashAgent()
@@ -1,54 +1,36 @@
 # generated by chatgpt5
 
 # pip install openai-agents
-import asyncio, subprocess, uuid, time, select
+import asyncio, os, sys
 from agents import Agent, Runner, function_tool, ItemHelpers
 from openai.types.responses import ResponseTextDeltaEvent
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import cassette
+from procio import OUTPUT_CAP, Process, SentinelProtocol
+
 class BashSession:
     def __init__(self, bash="/bin/bash"):
-        self.p = subprocess.Popen(
-            [bash, "--noprofile", "--norc"],
-            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-            text=True, bufsize=1
+        self.p = Process(
+            [bash, "--noprofile", "--norc"], SentinelProtocol(), name="bash", cap=OUTPUT_CAP, spill=True
         )
-        if not self.p.stdin or not self.p.stdout:
-            raise RuntimeError("Failed to start bash")
+        self.p.start()
 
     def run(self, cmd: str, timeout: float = 15.0):
-        if self.p.poll() is not None:
+        if not self.p.isalive():
             raise RuntimeError("bash exited")
-        marker = f"__DONE__{uuid.uuid4().hex}__"
-        self.p.stdin.write(cmd.rstrip() + f"\necho {marker} $?\n")
-        self.p.stdin.flush()
         print("sent to shell", cmd)
-
-        out_lines, deadline = [], time.monotonic() + timeout
-        fd = self.p.stdout.fileno()
-        exit_code = None
-        while time.monotonic() < deadline:
-            r, _, _ = select.select([fd], [], [], max(0.0, deadline - time.monotonic()))
-            if not r:
-                continue
-            line = self.p.stdout.readline()
-            if not line:
-                break
-            s = line.rstrip("\n")
-            if s.startswith(marker + " "):
-                exit_code = int(s.split(" ", 1)[1])
-                break
-            out_lines.append(line)
-        if exit_code is None:
-            raise TimeoutError("command timed out")
-        return exit_code, "".join(out_lines)
+        # large non-blocking reads, marker found by scanning only the newest output
+        try:
+            result = self.p.run(cmd, timeout=timeout)
+        except (TimeoutError, EOFError):
+            # still running (its output is dropped before the next command), or bash died
+            return "killed/timeout", ""
+        # "0", "1", "killed by SIGKILL", ...
+        return result.status, result.output
 
     def close(self):
-        try:
-            if self.p.poll() is None:
-                self.p.stdin.write("exit\n"); self.p.stdin.flush()
-                self.p.wait(timeout=2)
-        except Exception:
-            pass
+        self.p.stop()
 
 bash = BashSession()
 
@@ -71,6 +53,11 @@ agent = Agent(
     tools=[bash_run],
 )
 
+# ADVENT_CASSETTE=path records/replays the model calls
+tape = cassette.from_env()
+if tape is not None:
+    cassette.wrap_agent(agent, tape)
+
 async def main():
     # Example: maintain state across multiple tool calls
 
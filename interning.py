@@ -0,0 +1,69 @@
+import re
+from dataclasses import dataclass, field
+
+from metrics import METRICS
+
+# Paragraphs shorter than this are cheaper to repeat than to reference
+MIN_CHARS = 60
+LABEL_CHARS = 40
+
+_PARAGRAPHS = re.compile(r"\n\s*\n")
+
+
+@dataclass
+class DescriptionTable:
+    """
+    Replaces paragraphs the model has already seen (room descriptions,
+    mostly) with a short reference like "[R3: You are inside a building, a…]".
+
+    The first time a paragraph appears it is passed through with its
+    reference in front, so the model learns the mapping; expand() gives the
+    full text back on request.
+    """
+    refs: dict[str, str] = field(default_factory=dict)    # normalized text -> ref
+    texts: dict[str, str] = field(default_factory=dict)   # ref -> original text
+    saved_chars: int = 0
+
+    def _label(self, ref: str, text: str) -> str:
+        flat = " ".join(text.split())
+        short = flat if len(flat) <= LABEL_CHARS else flat[:LABEL_CHARS].rstrip() + "…"
+        return f"[{ref}: {short}]"
+
+    def shrink(self, response: str) -> str:
+        out = []
+        for para in _PARAGRAPHS.split(response.replace("\r\n", "\n").strip()):
+            key = " ".join(para.split())
+            if len(key) < MIN_CHARS:
+                out.append(para)
+                continue
+            ref = self.refs.get(key)
+            if ref is None:
+                ref = self.refs[key] = f"R{len(self.refs) + 1}"
+                self.texts[ref] = para
+                out.append(f"[{ref}] {para}")
+            else:
+                label = self._label(ref, para)
+                self.saved_chars += len(para) - len(label)
+                METRICS.count("intern.chars_saved", len(para) - len(label))
+                out.append(label)
+        return "\n\n".join(out)
+
+    def expand(self, ref: str) -> str:
+        ref = ref.strip().strip("[]").split(":", 1)[0].upper()
+        return self.texts.get(ref, f"Unknown reference {ref!r}.")
+
+
+class DescriptionStore:
+    """One DescriptionTable per conversation."""
+
+    def __init__(self):
+        self._tables: dict[str, DescriptionTable] = {}
+
+    def get(self, session_id: str) -> DescriptionTable:
+        return self._tables.setdefault(session_id, DescriptionTable())
+
+    def shrink(self, session_id: str, response: str) -> str:
+        return self.get(session_id).shrink(response)
+
+    def drop(self, session_id: str) -> None:
+        self._tables.pop(session_id, None)
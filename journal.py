@@ -0,0 +1,89 @@
+import json
+import os
+import re
+from typing import Iterable
+
+# Override with ADVENT_JOURNAL_DIR=/some/dir; one file per session id
+JOURNAL_DIR = os.environ.get("ADVENT_JOURNAL_DIR", "journals")
+# ADVENT_JOURNAL_FSYNC=1 also survives a machine crash, at one fsync per command
+FSYNC = os.environ.get("ADVENT_JOURNAL_FSYNC", "0") == "1"
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class Journal:
+    """
+    Every command sent to one game, in order, on disk: one JSON string per
+    line, appended and flushed as the command goes out. Replaying it into a
+    fresh game rebuilds the position after the game or the copilot died.
+    """
+
+    def __init__(self, path: str, fsync: bool = FSYNC):
+        self.path, self.fsync = path, fsync
+        self.commands: list[str] = []
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self.commands.append(json.loads(line))
+                    except ValueError:
+                        break  # torn last line from a crash mid-write
+        except FileNotFoundError:
+            pass
+
+    def extend(self, commands: Iterable[str]) -> None:
+        commands = list(commands)
+        if not commands:
+            return
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(c) + "\n" for c in commands))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.commands.extend(commands)
+
+    def append(self, command: str) -> None:
+        self.extend([command])
+
+    def rewrite(self, commands: Iterable[str]) -> None:
+        """Replace the journal, e.g. after restoring a checkpoint."""
+        commands = list(commands)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write("".join(json.dumps(c) + "\n" for c in commands))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.commands = commands
+
+    def clear(self) -> None:
+        self.rewrite([])
+
+    def delete(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.commands = []
+
+
+class JournalStore:
+    """One Journal per session id, under `directory`."""
+
+    def __init__(self, directory: str = JOURNAL_DIR):
+        self.directory = directory
+        self._journals: dict[str, Journal] = {}
+
+    def get(self, session_id: str) -> Journal:
+        journal = self._journals.get(session_id)
+        if journal is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, _UNSAFE.sub("_", session_id) + ".jsonl")
+            journal = self._journals[session_id] = Journal(path)
+        return journal
+
+    def drop(self, session_id: str) -> None:
+        """Forget the session's journal and delete its file."""
+        self.get(session_id).delete()
+        self._journals.pop(session_id, None)
@@ -0,0 +1,229 @@
+import contextlib
+import os
+import resource
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional
+
+import pexpect
+
+from metrics import METRICS
+
+# Limits for per-conversation REPL children; 0 means no limit
+MAX_SESSIONS = int(os.environ.get("ADVENT_REPL_MAX_SESSIONS", "32"))
+IDLE_TIMEOUT = float(os.environ.get("ADVENT_REPL_IDLE_TIMEOUT", "600"))
+# Off by default: node (V8) and the JVM reserve far more address space than
+# they use and fail to start under a RLIMIT_AS of a few GB
+MEMORY_MB = int(os.environ.get("ADVENT_REPL_MEMORY_MB", "0"))
+CPU_SECONDS = int(os.environ.get("ADVENT_REPL_CPU_SECONDS", "0"))
+
+
+def rlimits(memory_mb: int = MEMORY_MB, cpu_seconds: int = CPU_SECONDS) -> Callable[[], None]:
+    """A preexec_fn that caps the child's address space and CPU time."""
+
+    def apply() -> None:
+        # address space, not resident memory: only for runtimes that don't reserve much up front
+        if memory_mb:
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+
+    return apply
+
+
+class ChildRegistry:
+    """
+    Spawned children by session id with bounded resource use.
+
+    At most `capacity` children are live; spawning one more evicts the least
+    recently used that is not in a call. A background reaper closes children
+    that have exited or sat idle for `idle_timeout` seconds. A child in use
+    through lease() is never reaped or evicted, and stop() or a respawn
+    waits for the call to end. Every child gets `limits` as its preexec_fn unless spawn()
+    is given its own. Counters are kept in `counts` and mirrored to METRICS
+    under `name`.
+    """
+
+    def __init__(
+        self,
+        capacity: int = MAX_SESSIONS,
+        idle_timeout: float = IDLE_TIMEOUT,
+        limits: Optional[Callable[[], None]] = None,
+        reap_interval: float = 5.0,
+        name: str = "repl",
+    ):
+        self.capacity, self.idle_timeout, self.name = capacity, idle_timeout, name
+        self.limits = limits if limits is not None else rlimits()
+        self.counts = {"started": 0, "evicted_lru": 0, "evicted_idle": 0, "reaped": 0, "stopped": 0}
+        self._children: OrderedDict[str, pexpect.spawn] = OrderedDict()
+        self._used: dict[str, float] = {}
+        # held while a caller is using the session's child (lease) or closing it;
+        # reentrant so a caller may stop() or respawn the child it holds
+        self._busy: dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reaper = threading.Thread(target=self._reap_loop, args=(reap_interval,), daemon=True)
+        self._reaper.start()
+
+    def _count(self, what: str, n: int = 1) -> None:
+        self.counts[what] += n
+        METRICS.count(f"{self.name}.{what}", n)
+
+    def spawn(self, session_id: str, cmd: str, limits: Optional[Callable[[], None]] = None,
+              **kwargs) -> pexpect.spawn:
+        """
+        Start `cmd` for the session, replacing its previous child once any
+        call on it has finished; `limits` overrides the registry's (e.g.
+        rlimits(memory_mb=512) for python), kwargs go to pexpect.spawn.
+        """
+        child = pexpect.spawn(cmd, preexec_fn=limits or self.limits, **kwargs)
+        with self._lock:
+            busy = self._busy.setdefault(session_id, threading.RLock())
+        with busy:
+            with self._lock:
+                old = self._children.get(session_id)
+                self._forget(session_id)
+                self._children[session_id] = child
+                self._used[session_id] = time.monotonic()
+                self._busy[session_id] = busy
+                self._count("started")
+            if old is not None:
+                _close(old)
+        self._evict_lru(keep=session_id)
+        return child
+
+    def _evict_lru(self, keep: str) -> None:
+        """Close least recently used children until at capacity, skipping any mid-call and `keep`."""
+        while True:
+            with self._lock:
+                if not self.capacity or len(self._children) <= self.capacity:
+                    return
+                candidates = [(sid, child, self._busy[sid]) for sid, child in self._children.items() if sid != keep]
+            for sid, child, busy in candidates:
+                if busy.acquire(blocking=False):
+                    break
+            else:
+                return  # all in use: over capacity until one is free again
+            try:
+                with self._lock:
+                    if self._children.get(sid) is not child:
+                        continue  # replaced or stopped meanwhile
+                    self._forget(sid)
+                self._count("evicted_lru")
+                _close(child)
+            finally:
+                busy.release()
+
+    def _forget(self, session_id: str) -> None:
+        """Drop the session's bookkeeping; caller holds self._lock."""
+        self._children.pop(session_id, None)
+        self._used.pop(session_id, None)
+        self._busy.pop(session_id, None)
+
+    def get(self, session_id: str) -> Optional[pexpect.spawn]:
+        """The session's child, marked as just used, or None."""
+        with self._lock:
+            child = self._children.get(session_id)
+            if child is not None:
+                self._children.move_to_end(session_id)
+                self._used[session_id] = time.monotonic()
+            return child
+
+    @contextlib.contextmanager
+    def lease(self, session_id: str) -> Iterator[Optional[pexpect.spawn]]:
+        """
+        The session's child (or None) for the length of one call: reap()
+        leaves it alone meanwhile and its idle time starts when the call ends.
+        """
+        with self._lock:
+            busy = self._busy.get(session_id)
+        if busy is None:
+            yield None
+            return
+        with busy:
+            child = self.get(session_id)
+            try:
+                yield child
+            finally:
+                with self._lock:
+                    if session_id in self._used:
+                        self._used[session_id] = time.monotonic()
+
+    def stop(self, session_id: str) -> bool:
+        """Close the session's child, once any call on it has finished."""
+        with self._lock:
+            busy = self._busy.get(session_id)
+        if busy is None:
+            return False
+        with busy:
+            with self._lock:
+                child = self._children.get(session_id)
+                if child is None:
+                    return False  # stopped or evicted meanwhile
+                self._forget(session_id)
+            self._count("stopped")
+            try:
+                child.sendeof()
+            except Exception:
+                pass
+            _close(child)
+        return True
+
+    def reap(self) -> None:
+        """
+        Close children that have exited or been idle too long. Each one is
+        checked and closed under its session's lease, so a child that is
+        mid-call is skipped.
+        """
+        with self._lock:
+            sessions = [(sid, child, self._busy[sid]) for sid, child in self._children.items()]
+        for sid, child, busy in sessions:
+            if not busy.acquire(blocking=False):
+                continue  # in use, so not idle
+            try:
+                with self._lock:
+                    if self._children.get(sid) is not child:
+                        continue  # replaced or stopped meanwhile
+                    if not child.isalive():
+                        what = "reaped"
+                    elif self.idle_timeout and time.monotonic() - self._used[sid] > self.idle_timeout:
+                        what = "evicted_idle"
+                    else:
+                        continue
+                    self._forget(sid)
+                self._count(what)
+                _close(child)
+            finally:
+                busy.release()
+
+    def _reap_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self.reap()
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = len(self._children)
+        return {"live": live, **self.counts}
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            children = list(self._children.values())
+            self._children.clear()
+            self._used.clear()
+            self._busy.clear()
+        for child in children:
+            _close(child)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._children
+
+
+def _close(child: pexpect.spawn) -> None:
+    try:
+        child.close(force=True)
+    except Exception:
+        pass
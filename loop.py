@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Any
+import time
+from typing import Any, Awaitable, Callable, Optional
 
 from openai.types.responses.response_text_delta_event import ResponseTextDeltaEvent
 
@@ -15,9 +16,137 @@ from agents import Agent, Runner, TResponseInputItem
 from agents import TContext
 from agents.result import RunResultBase
 from agents import AgentUpdatedStreamEvent, RawResponsesStreamEvent, RunItemStreamEvent
+from agents import RunHooks, RunContextWrapper, Tool
+from agents.items import ModelResponse
+
+from compaction import compact
+from metrics import METRICS
+from tracing import TRACER, span
+
+
+class TimingHooks(RunHooks):
+    """Records model call and tool call latency in METRICS, and as trace spans."""
+
+    def __init__(self) -> None:
+        # (perf_counter, trace timestamp) per call in flight
+        self._started: dict[Any, tuple[float, float]] = {}
+
+    async def on_llm_start(self, context: RunContextWrapper, agent: Agent, system_prompt, input_items) -> None:
+        self._started[("llm", id(context))] = (time.perf_counter(), TRACER.now())
+
+    async def on_llm_end(self, context: RunContextWrapper, agent: Agent, response: ModelResponse) -> None:
+        started = self._started.pop(("llm", id(context)), None)
+        if started is not None:
+            t0, ts = started
+            tokens_in, tokens_out = response.usage.input_tokens, response.usage.output_tokens
+            METRICS.observe("model.call", time.perf_counter() - t0, tokens_in=tokens_in, tokens_out=tokens_out)
+            TRACER.complete("model", ts, TRACER.now(), "model", agent=agent.name,
+                            tokens_in=tokens_in, tokens_out=tokens_out)
+
+    async def on_tool_start(self, context: RunContextWrapper, agent: Agent, tool: Tool) -> None:
+        self._started[("tool", getattr(context, "tool_call_id", tool.name))] = (time.perf_counter(), TRACER.now())
+
+    async def on_tool_end(self, context: RunContextWrapper, agent: Agent, tool: Tool, result: object) -> None:
+        started = self._started.pop(("tool", getattr(context, "tool_call_id", tool.name)), None)
+        if started is not None:
+            t0, ts = started
+            METRICS.observe(f"tool.{tool.name}", time.perf_counter() - t0)
+            TRACER.complete(f"tool.{tool.name}", ts, TRACER.now(), "tool")
+
+async def _print(text: str) -> None:
+    print(text, end="", flush=True)
+
+
+async def stream_turn(
+    agent: Agent[Any],
+    input_items: list[TResponseInputItem],
+    emit: Callable[[str], Awaitable[None]],
+    *,
+    context: TContext | None = None,
+    hooks: RunHooks | None = None,
+) -> RunResultBase:
+    """Run one streamed turn and hand what a terminal would show to `emit`.
+
+    Text deltas go out as they arrive, tool calls and outputs as bracketed
+    lines. `emit` is awaited, so a slow consumer slows the turn down instead
+    of piling up output. Records turn.first_delta.
+    """
+    turn_start = time.perf_counter()
+    first_delta: float | None = None
+    result = Runner.run_streamed(agent, input=input_items, context=context, hooks=hooks)
+    try:
+        async for event in result.stream_events():
+            if isinstance(event, RawResponsesStreamEvent):
+                if isinstance(event.data, ResponseTextDeltaEvent):
+                    if first_delta is None:
+                        first_delta = time.perf_counter() - turn_start
+                        METRICS.observe("turn.first_delta", first_delta)
+                    with span("emit", "io"):
+                        await emit(event.data.delta)
+            elif isinstance(event, RunItemStreamEvent):
+                if event.item.type == "tool_call_item":
+                    await emit("\n[tool called]\n")
+                elif event.item.type == "tool_call_output_item":
+                    await emit(f"\n[tool output: {event.item.output}]\n")
+            elif isinstance(event, AgentUpdatedStreamEvent):
+                await emit(f"\n[Agent updated: {event.new_agent.name}]\n")
+    except BaseException:
+        # nobody is listening any more; stop the run instead of finishing it in the background
+        result.cancel()
+        raise
+    return result
+
+
+async def begin_turn(
+    items: list[TResponseInputItem],
+    line: str,
+    emit: Callable[[str], Awaitable[None]],
+    *,
+    router: Callable[[str], Awaitable[Optional[str]]] | None = None,
+    token_budget: int | None = None,
+    keep_turns: int = 2,
+) -> list[TResponseInputItem] | None:
+    """Add the player's line to the history and try the fast path first.
+
+    Returns None if `router` answered: the reply has been emitted and the
+    exchange added to `items`. Otherwise returns the history to send to the
+    model, compacted to `token_budget` if one is set.
+    """
+    turn_start = time.perf_counter()
+    items.append({"role": "user", "content": line})
+    if router is not None:
+        with span("route", "turn"):
+            reply = await router(line)
+            if reply is not None:
+                with span("emit", "io"):
+                    await emit(reply + "\n")
+        if reply is not None:
+            items.append({"role": "assistant", "content": reply})
+            METRICS.observe("turn.local", time.perf_counter() - turn_start)
+            return None
+    if token_budget is not None:
+        # before every model call, so fast-path exchanges are covered too
+        items, saved = compact(items, token_budget, keep_turns)
+        if saved:
+            await emit(f"[compacted history, ~{saved} tokens saved]\n")
+    return items
+
+
+def record_turn(result: RunResultBase, turn_start: float) -> None:
+    usage = result.context_wrapper.usage
+    METRICS.observe("turn.wall", time.perf_counter() - turn_start)
+    METRICS.observe("turn.tokens_in", usage.input_tokens)
+    METRICS.observe("turn.tokens_out", usage.output_tokens)
+
 
 async def run_demo_loop(
-    agent: Agent[Any], *, stream: bool = True, context: TContext | None = None
+    agent: Agent[Any],
+    *,
+    stream: bool = True,
+    context: TContext | None = None,
+    token_budget: int | None = None,
+    keep_turns: int = 2,
+    router: Callable[[str], Awaitable[Optional[str]]] | None = None,
 ) -> None:
     """Run a simple REPL loop with the given agent.
 
@@ -29,9 +158,17 @@ async def run_demo_loop(
         agent: The starting agent to run.
         stream: Whether to stream the agent output.
         context: Additional context information to pass to the runner.
+        token_budget: If set, compact the history resent each turn to about
+            this many tokens (see compaction.compact).
+        keep_turns: Number of most recent user turns never compacted.
+        router: Optional fast path tried before the model. It gets the raw
+            user line and returns the reply to show (e.g. game output), or
+            None to hand the line to the agent. Handled exchanges are added
+            to the history so the agent sees them next turn.
     """
 
     current_agent = agent
+    hooks = TimingHooks()
     input_items: list[TResponseInputItem] = []
     total_tokens = 0
     while True:
@@ -46,31 +183,27 @@ async def run_demo_loop(
         if not user_input:
             continue
 
-        input_items.append({"role": "user", "content": user_input})
+        turn_start = time.perf_counter()
+        history = await begin_turn(input_items, user_input, _print, router=router,
+                                   token_budget=token_budget, keep_turns=keep_turns)
+        if history is None:
+            continue
+        input_items = history
 
         result: RunResultBase
-        if stream:
-            result = Runner.run_streamed(current_agent, input=input_items, context=context)
-            try:
-                async for event in result.stream_events():
-                    if isinstance(event, RawResponsesStreamEvent):
-                        if isinstance(event.data, ResponseTextDeltaEvent):
-                            print(event.data.delta, end="", flush=True)
-                    elif isinstance(event, RunItemStreamEvent):
-                        if event.item.type == "tool_call_item":
-                            print("\n[tool called]", flush=True)
-                        elif event.item.type == "tool_call_output_item":
-                            print(f"\n[tool output: {event.item.output}]", flush=True)
-                    elif isinstance(event, AgentUpdatedStreamEvent):
-                        print(f"\n[Agent updated: {event.new_agent.name}]", flush=True)
-            except Exception as e:
-                return f"event error: {e!r}"
-            print()
-        else:
-            result = await Runner.run(current_agent, input_items, context=context)
-            if result.final_output is not None:
-                print(result.final_output)
+        with span("turn", "turn"):
+            if stream:
+                try:
+                    result = await stream_turn(current_agent, input_items, _print, context=context, hooks=hooks)
+                except Exception as e:
+                    return f"event error: {e!r}"
+                print()
+            else:
+                result = await Runner.run(current_agent, input_items, context=context, hooks=hooks)
+                if result.final_output is not None:
+                    print(result.final_output)
 
         current_agent = result.last_agent
         input_items = result.to_input_list()
         total_tokens = result.context_wrapper.usage.total_tokens
+        record_turn(result, turn_start)
@@ -0,0 +1,80 @@
+import json
+import math
+import os
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from typing import Iterator, Optional, TextIO
+
+# Set ADVENT_METRICS=/path/to/events.jsonl to keep every event on disk
+METRICS_PATH = os.environ.get("ADVENT_METRICS")
+# latest samples kept per metric for the percentiles; the JSONL file has them all
+WINDOW = int(os.environ.get("ADVENT_METRICS_WINDOW", "10000"))
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile; `values` need not be sorted."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Metrics:
+    """
+    Timings and counters for one process.
+
+    observe() keeps a sample for the exit summary (the latest `window` per
+    metric, so a long-running server stays bounded) and, when a path is set,
+    appends a JSON line {"ts", "event", "value", ...fields} to it.
+    """
+
+    def __init__(self, path: Optional[str] = None, window: int = WINDOW):
+        self.samples: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.observed: Counter = Counter()  # samples ever taken, per metric
+        self.counters: Counter = Counter()
+        self._file: Optional[TextIO] = open(path, "a", buffering=1) if path else None
+
+    def emit(self, event: str, **fields) -> None:
+        if self._file is not None:
+            self._file.write(json.dumps({"ts": time.time(), "event": event, **fields}, default=str) + "\n")
+
+    def observe(self, name: str, value: float, **fields) -> None:
+        self.samples[name].append(value)
+        self.observed[name] += 1
+        self.emit(name, value=value, **fields)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    @contextmanager
+    def timer(self, name: str, **fields) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **fields)
+
+    def summary(self) -> str:
+        if not self.samples and not self.counters:
+            return "no metrics recorded"
+        lines = [f"{'metric':<24} {'n':>6} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}"]
+        for name in sorted(self.samples):
+            v = self.samples[name]
+            lines.append(
+                f"{name:<24} {self.observed[name]:>6} {percentile(v, 50):>10.4g} {percentile(v, 95):>10.4g}"
+                f" {percentile(v, 99):>10.4g} {max(v):>10.4g}"
+            )
+        for name in sorted(self.counters):
+            lines.append(f"{name:<24} {self.counters[name]:>6}")
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Process-wide recorder
+METRICS = Metrics(METRICS_PATH)
@@ -0,0 +1,808 @@
+import asyncio
+import bisect
+import codecs
+import itertools
+import os
+import re
+import select
+import signal
+import subprocess
+import tempfile
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Union
+
+import pexpect
+
+from metrics import METRICS
+
+READ_SIZE = 65536
+# characters of output kept per command; the middle of anything longer is dropped
+DEFAULT_CAP = 1 << 20
+# the same for tool output shown to a model, which pays for every token; see spill=True
+OUTPUT_CAP = 64 * 1024
+# spill files kept per process; older ones are deleted, the rest go with stop()
+SPILL_KEEP = 16
+
+# where a finished response ends: (end of output, end of framing, exit code)
+Frame = tuple[int, int, Optional[int]]
+
+
+@dataclass
+class Result:
+    output: str
+    exit_code: Optional[int] = None
+    dropped: int = 0            # characters cut from the middle of the output
+    elapsed: float = 0.0
+    spill: Optional[str] = None  # file with the whole output, when some was dropped and spilling is on
+    quiesced: bool = False       # completed because output went quiet, not by the protocol
+
+    @property
+    def status(self) -> str:
+        """exit_code for display: "0", "killed by SIGKILL", or "killed/timeout" when there is none."""
+        if self.exit_code is None:
+            return "killed/timeout"
+        if self.exit_code < 0:
+            try:
+                return f"killed by {signal.Signals(-self.exit_code).name}"
+            except ValueError:
+                return f"killed by signal {-self.exit_code}"
+        return str(self.exit_code)
+
+
+class PipelineTimeout(TimeoutError):
+    """
+    Pipelined commands ran out of time. `responses` are those answered
+    (when they were being kept); the first `sent` commands were written
+    whole, so the child has them even though some went unanswered.
+    """
+
+    def __init__(self, message: str, responses: list[str], sent: int):
+        super().__init__(message)
+        self.responses, self.sent = responses, sent
+
+
+class PipelineEOF(EOFError):
+    """
+    The child exited partway through pipelined commands. `responses` and
+    `sent` are as for PipelineTimeout; `partial` is what the command being
+    answered printed before the exit (e.g. advent's goodbye after "y").
+    """
+
+    def __init__(self, message: str, responses: list[str], sent: int, partial: str = ""):
+        super().__init__(message)
+        self.responses, self.sent, self.partial = responses, sent, partial
+
+
+# ---------- completion protocols ----------
+
+class PromptProtocol:
+    """
+    A response is complete when the output ends in the prompt (advent, node,
+    python -i). With a continuation prompt, multi-line input is sent one line
+    at a time like pexpect's REPLWrapper does.
+
+    With `sentinel`, a line the child reads and ignores (advent skips input
+    starting with "#"), every command is followed by that line. The child
+    only prompts for it once the command's response is finished, so a
+    response ends at two prompts in a row, wherever they fall in a read and
+    whatever the response text contains.
+    """
+    window = 256
+    eof_completes = False
+
+    def __init__(self, prompt: str, continuation: Optional[str] = None, sentinel: Optional[str] = None):
+        self.prompt = re.compile(f"(?:{prompt})\\Z")
+        self.sentinel = sentinel
+        self.framed = re.compile(f"(?:{prompt})(?:{prompt})") if sentinel else None
+        # a prompt at the start of a line separates pipelined responses
+        self.boundary = re.compile(f"\\n(?:{prompt})" + (f"(?:{prompt})" if sentinel else ""))
+        self.between = re.compile(f"(?:{prompt}|{continuation})\\Z") if continuation else None
+
+    def frame(self, command: str) -> tuple[list[str], Optional[str]]:
+        """Chunks to send, each awaiting its own response, and a token for find()."""
+        if self.sentinel is not None:
+            return [command.rstrip("\n") + "\n" + self.sentinel + "\n"], self.sentinel
+        if self.between is None:
+            return [command.rstrip("\n") + "\n"], None
+        lines = command.splitlines()
+        if command.endswith("\n") or not lines:
+            lines.append("")
+        return [line + "\n" for line in lines], None
+
+    def find(self, text: str, token: Optional[str], last: bool = True) -> Optional[Frame]:
+        if token is not None:
+            # framed: the first double prompt ends the response; the banner has no token
+            m = self.framed.search(text)
+        else:
+            m = (self.prompt if last or self.between is None else self.between).search(text)
+        return (m.start(), m.end(), None) if m else None
+
+    def clean(self, output: str) -> str:
+        return output.replace("\r\n", "\n").strip()
+
+
+class SentinelProtocol:
+    """
+    A response is complete when a unique marker line comes back, written by
+    a trailer command that also reports the exit code (bash: `echo M $?`).
+    """
+    window = 128
+    eof_completes = False
+
+    def __init__(self, trailer: str = "echo {marker} $?"):
+        self.trailer = trailer
+
+    def frame(self, command: str) -> tuple[list[str], Optional[str]]:
+        marker = f"__DONE__{uuid.uuid4().hex}__"
+        return [command.rstrip() + "\n" + self.trailer.format(marker=marker) + "\n"], marker
+
+    def find(self, text: str, token: Optional[str], last: bool = True) -> Optional[Frame]:
+        start = text.find(token + " ")
+        if start < 0:
+            return None
+        end = text.find("\n", start)
+        if end < 0:
+            return None
+        try:
+            code = int(text[start + len(token) + 1:end].strip())
+        except ValueError:
+            code = None
+        return start, end + 1, code
+
+    def clean(self, output: str) -> str:
+        return output
+
+
+class EOFProtocol:
+    """The command is the child's whole input; the response is everything until it exits."""
+    window = 0
+    eof_completes = True
+
+    def frame(self, command: str) -> tuple[list[str], Optional[str]]:
+        return [command], None
+
+    def find(self, text: str, token: Optional[str], last: bool = True) -> Optional[Frame]:
+        return None
+
+    def clean(self, output: str) -> str:
+        return output
+
+
+Protocol = Union[PromptProtocol, SentinelProtocol, EOFProtocol]
+
+
+# ---------- output accounting ----------
+
+class _Reader:
+    """
+    Collects one response: finds its frame and keeps at most `cap`
+    characters, the first and last half. With `spill_dir` set, a response
+    that overflows is written out whole to a file in that directory.
+    """
+
+    def __init__(self, protocol: Protocol, token: Optional[str], cap: int, last: bool,
+                 spill_dir: Optional[str] = None, prefix: str = "proc"):
+        self.protocol, self.token, self.last = protocol, token, last
+        self.spill_dir, self.prefix = spill_dir, prefix
+        self.spill = None
+        self.half = cap // 2
+        self.scan = ""                 # text not yet known to be output
+        self.head: list[str] = []
+        self.head_len = 0
+        self.tail = ""
+        self.dropped = 0
+        self.done = False
+        self.quiesced = False
+        self.exit_code: Optional[int] = None
+        self.rest = ""                 # arrived after the frame; belongs to the next response
+
+    def feed(self, text: str) -> bool:
+        self.scan += text
+        hit = self.protocol.find(self.scan, self.token, self.last)
+        if hit is None:
+            # everything but the last `window` chars can no longer hold the frame
+            keep = self.protocol.window
+            if len(self.scan) > keep:
+                self._keep(self.scan[:len(self.scan) - keep])
+                self.scan = self.scan[len(self.scan) - keep:]
+            return False
+        end, frame_end, self.exit_code = hit
+        self._keep(self.scan[:end])
+        self.rest, self.scan, self.done = self.scan[frame_end:], "", True
+        return True
+
+    def finish(self, exit_code: Optional[int]) -> None:
+        """The child closed its output (EOFProtocol)."""
+        self._keep(self.scan)
+        self.scan, self.done, self.exit_code = "", True, exit_code
+
+    def settle(self) -> None:
+        """Output stopped without a frame; take what arrived as the response."""
+        self.finish(None)
+        self.quiesced = True
+
+    def _keep(self, text: str) -> None:
+        if self.head_len < self.half:
+            take = text[:self.half - self.head_len]
+            self.head.append(take)
+            self.head_len += len(take)
+            text = text[len(take):]
+        if not text:
+            return
+        if self.spill is not None:
+            self.spill.write(text)
+        self.tail += text
+        if len(self.tail) > self.half:
+            if self.spill is None and self.spill_dir is not None:
+                self.spill = tempfile.NamedTemporaryFile(
+                    "w", encoding="utf-8", dir=self.spill_dir, prefix=f"{self.prefix}-", suffix=".out",
+                    delete=False)
+                self.spill.write("".join(self.head) + self.tail)
+            self.dropped += len(self.tail) - self.half
+            self.tail = self.tail[-self.half:]
+
+    def close(self) -> Optional[str]:
+        """Finish the spill file, if any, and return its path."""
+        if self.spill is None:
+            return None
+        self.spill.close()
+        return self.spill.name
+
+    def discard(self) -> None:
+        """Nobody will read this response: close and delete its spill file."""
+        path = self.close()
+        if path is not None:
+            _remove(path)
+
+    def output(self) -> str:
+        head = "".join(self.head)
+        if self.dropped:
+            where = f"; full output in {self.spill.name}" if self.spill is not None else ""
+            return f"{head}\n...[{self.dropped} chars dropped{where}]...\n{self.tail}"
+        return head + self.tail
+
+
+class _Pipeline:
+    """
+    Splits the output of commands written in one go at the prompt
+    protocol's line-initial boundaries: one response per command, or only
+    the latest with `keep_all` off (then at most `cap` characters are held).
+    """
+
+    def __init__(self, protocol: "PromptProtocol", count: int, cap: int, keep_all: bool):
+        self.protocol, self.count, self.cap, self.keep_all = protocol, count, cap, keep_all
+        self.text = ""                 # the response being read
+        self.responses: list[str] = []
+        self.last = ""                 # the latest complete response
+        self.seen = 0
+
+    def feed(self, text: str) -> bool:
+        self.text += text
+        pos = 0
+        for m in self.protocol.boundary.finditer(self.text):
+            self.seen += 1
+            self.last, pos = self.text[pos:m.start()], m.end()
+            if self.keep_all:
+                self.responses.append(self.protocol.clean(self.last))
+            if self.seen == self.count:
+                break
+        self.text = self.text[pos:]
+        if self.seen == self.count:
+            return True
+        if not self.keep_all and len(self.text) > self.cap:
+            self.text = self.text[-self.protocol.window:]
+        return False
+
+
+# ---------- the engine ----------
+
+class Process:
+    """
+    An interactive child process driven one command at a time.
+
+    The same buffering, framing, output cap, restart and metrics code serves
+    blocking callers (run) and asyncio callers (arun). Reads are
+    non-blocking os.read()s of up to READ_SIZE bytes; only the last
+    `protocol.window` characters are rescanned when new output arrives.
+
+    pty=True runs the child under a pseudo-terminal without echo (advent,
+    node); otherwise stdin/stdout pipes with stderr folded into stdout.
+    A command that times out leaves its response owed; it is read and
+    discarded before the next command goes out. With `quiet`, a response
+    whose output has started and then stalled that long is complete even
+    without its frame (a missed prompt), and anything that trickles in
+    after it is discarded before the next command.
+    """
+
+    def __init__(
+        self,
+        argv: Sequence[str],
+        protocol: Protocol,
+        *,
+        pty: bool = False,
+        cwd: Optional[str] = None,
+        env: Optional[dict] = None,
+        cap: int = DEFAULT_CAP,
+        name: str = "proc",
+        preexec_fn: Optional[Callable[[], None]] = None,
+        spill: bool = False,
+    ):
+        self.argv, self.protocol, self.pty = list(argv), protocol, pty
+        self.cwd, self.env, self.cap, self.name = cwd, env, cap, name
+        # spill=True: output over the cap is kept whole in a temp file (Result.spill);
+        # the latest SPILL_KEEP are kept until stop()
+        self.spill_dir = tempfile.gettempdir() if spill else None
+        self.preexec_fn = preexec_fn
+        self.proc: Union[pexpect.spawn, subprocess.Popen, None] = None
+        self.banner = ""
+        self._rfd = self._wfd = -1
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+        # a command timed out and its response (framed by this token) is still coming
+        self._owed = False
+        self._owed_token: Optional[str] = None
+        self._quiesced = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._spills: deque[str] = deque()
+        # bytes moved over the child's lifetimes, for the per-command counts on {name}.run
+        self.bytes_read = self.bytes_written = 0
+
+    # ---- lifecycle ----
+
+    def start(self, timeout: float = 10.0) -> str:
+        """Spawn the child; with a prompt protocol, wait for and return the banner."""
+        if self.pty:
+            self.proc = pexpect.spawn(self.argv[0], self.argv[1:], echo=False, cwd=self.cwd, env=self.env,
+                                      preexec_fn=self.preexec_fn)
+            self._rfd = self._wfd = self.proc.child_fd
+        else:
+            self.proc = subprocess.Popen(
+                self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                bufsize=0, cwd=self.cwd, env=self.env, preexec_fn=self.preexec_fn,
+            )
+            self._rfd, self._wfd = self.proc.stdout.fileno(), self.proc.stdin.fileno()
+            os.set_blocking(self._wfd, False)
+        os.set_blocking(self._rfd, False)
+        self._decoder.reset()
+        self._pending, self._owed, self._quiesced = "", False, False
+        METRICS.count(f"{self.name}.spawns")
+        self.banner = ""
+        if isinstance(self.protocol, PromptProtocol):
+            reader = self._sync_exchange([""], None, time.monotonic() + timeout)[0]
+            reader.discard()
+            self.banner = self.protocol.clean(reader.output())
+        return self.banner
+
+    def stop(self) -> None:
+        """Kill the child and delete the spill files of its responses."""
+        self._kill()
+        while self._spills:
+            _remove(self._spills.popleft())
+
+    def _kill(self) -> None:
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            if isinstance(proc, pexpect.spawn):
+                proc.terminate(force=True)
+            else:
+                for f in (proc.stdin, proc.stdout):
+                    f.close()
+                proc.kill()
+                proc.wait(timeout=2)
+        except Exception:
+            pass
+
+    def restart(self, timeout: float = 10.0) -> str:
+        self._kill()
+        METRICS.count(f"{self.name}.restarts")
+        return self.start(timeout)
+
+    def interrupt(self) -> None:
+        """Ctrl-C for the child, e.g. to break an endless loop in a REPL."""
+        if self.proc is not None:
+            os.kill(self.proc.pid, signal.SIGINT)
+
+    def isalive(self) -> bool:
+        if self.proc is None:
+            return False
+        if isinstance(self.proc, pexpect.spawn):
+            return self.proc.isalive()
+        return self.proc.poll() is None
+
+    def _ensure_running(self) -> None:
+        if self.isalive():
+            return
+        if self.proc is not None and not self.protocol.eof_completes:
+            self.restart()
+        else:
+            self._kill()
+            self.start()
+
+    # ---- low level ----
+
+    def _read(self) -> Optional[str]:
+        """Decoded text that is ready, None if nothing is, "" at end of file."""
+        try:
+            data = os.read(self._rfd, READ_SIZE)
+        except BlockingIOError:
+            return None
+        except OSError:
+            # Linux reports EIO on a pty master once the child has gone
+            data = b""
+        if not data:
+            return ""
+        METRICS.count(f"{self.name}.bytes_read", len(data))
+        self.bytes_read += len(data)
+        return self._decoder.decode(data)
+
+    def _write(self, data: bytes) -> int:
+        try:
+            n = os.write(self._wfd, data)
+        except BlockingIOError:
+            return 0
+        METRICS.count(f"{self.name}.bytes_written", n)
+        self.bytes_written += n
+        return n
+
+    def _close_input(self) -> None:
+        if isinstance(self.proc, pexpect.spawn):
+            self.proc.sendeof()
+        else:
+            self.proc.stdin.close()
+
+    def _exit_code(self) -> Optional[int]:
+        try:
+            if isinstance(self.proc, pexpect.spawn):
+                self.proc.wait()
+                if self.proc.exitstatus is None and self.proc.signalstatus is not None:
+                    return -self.proc.signalstatus  # as subprocess reports a signal
+                return self.proc.exitstatus
+            return self.proc.wait(timeout=1)
+        except Exception:
+            return None
+
+    def _on_eof(self, reader: _Reader) -> None:
+        if not self.protocol.eof_completes:
+            raise EOFError(f"{self.name} exited")
+        reader.finish(self._exit_code())
+
+    def _discard_ready(self) -> None:
+        """Drop output already waiting: the late end of a quiesced response."""
+        while self._read():
+            pass
+        self._pending, self._quiesced = "", False
+
+    def _readers(self, chunks: list[str], token: Optional[str]) -> list[_Reader]:
+        return [_Reader(self.protocol, token, self.cap, last=i == len(chunks) - 1,
+                        spill_dir=self.spill_dir, prefix=self.name) for i in range(len(chunks))]
+
+    # ---- blocking driver ----
+
+    def _sync_exchange(self, chunks: list[str], token: Optional[str], deadline: float,
+                       quiet: Optional[float] = None) -> list[_Reader]:
+        readers = self._readers(chunks, token)
+        try:
+            for chunk, reader in zip(chunks, readers):
+                data = chunk.encode()
+                if self._pending and reader.feed(self._pending):
+                    self._pending = reader.rest
+                    continue
+                heard = time.monotonic() if self._pending else None
+                self._pending = ""
+                closing = self.protocol.eof_completes
+                while not reader.done:
+                    now = time.monotonic()
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError(f"{self.name}: no complete response")
+                    wait = remaining
+                    if quiet is not None and heard is not None and not data:
+                        if now - heard >= quiet:
+                            reader.settle()
+                            self._quiesced = True
+                            break
+                        wait = min(remaining, heard + quiet - now)
+                    r, w, _ = select.select([self._rfd], [self._wfd] if data else [], [], wait)
+                    if w:
+                        data = data[self._write(data):]
+                        if not data and closing:
+                            self._close_input()
+                            closing = False
+                    if r:
+                        text = self._read()
+                        if text == "":
+                            self._on_eof(reader)
+                        elif text:
+                            heard = time.monotonic()
+                            if reader.feed(text):
+                                self._pending = reader.rest
+        except BaseException:
+            # abandoned: don't leave spill files behind
+            for reader in readers:
+                reader.discard()
+            raise
+        return readers
+
+    def run(self, command: str, timeout: float = 15.0, quiet: Optional[float] = None) -> Result:
+        """Send `command` and block until its response is complete."""
+        self._ensure_running()
+        t0 = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        if self._quiesced:
+            self._discard_ready()
+        if self._owed:
+            for reader in self._sync_exchange([""], self._owed_token, deadline):
+                reader.discard()
+            self._owed = False
+        chunks, token = self.protocol.frame(command)
+        self._owed, self._owed_token = True, token
+        moved = self.bytes_read, self.bytes_written
+        try:
+            readers = self._sync_exchange(chunks, token, deadline, quiet)
+        except TimeoutError:
+            METRICS.count(f"{self.name}.timeouts")
+            raise
+        self._owed = False
+        return self._result(readers, t0, moved)
+
+    def _pipeline_data(self, commands: Sequence[str]) -> tuple[bytes, list[int]]:
+        """The bytes to write, and the offset where each command's bytes end."""
+        if not isinstance(self.protocol, PromptProtocol):
+            raise TypeError(f"{self.name}: pipelining needs a prompt protocol")
+        chunks = ["".join(self.protocol.frame(c)[0]).encode() for c in commands]
+        return b"".join(chunks), list(itertools.accumulate(len(c) for c in chunks))
+
+    def replay(self, commands: Sequence[str], timeout: float = 60.0) -> str:
+        """
+        Pipe `commands` to a prompt-driven child in a single write and block
+        until every one has been answered, instead of a round trip each.
+        Output is discarded as it arrives; returns the last response.
+        """
+        data, ends = self._pipeline_data(commands)
+        self._ensure_running()
+        if not commands:
+            return ""
+        t0 = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        if self._quiesced:
+            self._discard_ready()
+        if self._owed:
+            for reader in self._sync_exchange([""], self._owed_token, deadline):
+                reader.discard()
+            self._owed = False
+        pipe = _Pipeline(self.protocol, len(commands), self.cap, keep_all=False)
+        self._owed, self._owed_token = True, None
+        done = pipe.feed(self._pending)
+        self._pending = ""
+        written = 0
+        while not done:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                METRICS.count(f"{self.name}.timeouts")
+                raise PipelineTimeout(f"{self.name}: replay answered {pipe.seen} of {len(commands)}",
+                                      [], bisect.bisect_right(ends, written))
+            r, w, _ = select.select([self._rfd], [self._wfd] if data else [], [], remaining)
+            if w:
+                n = self._write(data)
+                data, written = data[n:], written + n
+            if r:
+                chunk = self._read()
+                if chunk == "":
+                    raise PipelineEOF(f"{self.name} exited during replay", [],
+                                      bisect.bisect_right(ends, written))
+                done = pipe.feed(chunk or "")
+        self._pending = pipe.text
+        self._owed = False
+        METRICS.count(f"{self.name}.replays")
+        METRICS.observe(f"{self.name}.replay", time.perf_counter() - t0, commands=len(commands))
+        return self.protocol.clean(pipe.last)
+
+    # ---- asyncio driver ----
+
+    async def _async_exchange(self, chunks: list[str], token: Optional[str], deadline: float,
+                              quiet: Optional[float] = None) -> list[_Reader]:
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        readers = self._readers(chunks, token)
+        loop.add_reader(self._rfd, ready.set)
+        writing = False
+        try:
+            for chunk, reader in zip(chunks, readers):
+                data = chunk.encode()
+                if self._pending and reader.feed(self._pending):
+                    self._pending = reader.rest
+                    continue
+                heard = loop.time() if self._pending else None
+                self._pending = ""
+                closing = self.protocol.eof_completes
+                while not reader.done:
+                    if data:
+                        data = data[self._write(data):]
+                        if data and not writing:
+                            # the child stops reading while its output is unread:
+                            # keep reading and finish the write when there is room
+                            loop.add_writer(self._wfd, ready.set)
+                            writing = True
+                    if not data:
+                        if writing:
+                            loop.remove_writer(self._wfd)
+                            writing = False
+                        if closing:
+                            self._close_input()
+                            closing = False
+                    text = self._read()
+                    if text == "":
+                        self._on_eof(reader)
+                        continue
+                    if text is not None:
+                        heard = loop.time()
+                        if reader.feed(text):
+                            self._pending = reader.rest
+                        continue
+                    now = loop.time()
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    wait = remaining
+                    if quiet is not None and heard is not None and not data:
+                        if now - heard >= quiet:
+                            reader.settle()
+                            self._quiesced = True
+                            break
+                        wait = min(remaining, heard + quiet - now)
+                    ready.clear()
+                    try:
+                        await asyncio.wait_for(ready.wait(), wait)
+                    except asyncio.TimeoutError:
+                        if wait == remaining:
+                            raise
+        except BaseException:
+            # abandoned: don't leave spill files behind
+            for reader in readers:
+                reader.discard()
+            raise
+        finally:
+            if writing:
+                loop.remove_writer(self._wfd)
+            loop.remove_reader(self._rfd)
+        return readers
+
+    async def arun(self, command: str, timeout: float = 15.0, quiet: Optional[float] = None) -> Result:
+        """Send `command` and wait for its response without blocking the event loop."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self.isalive():
+                await asyncio.to_thread(self._ensure_running)
+            t0 = time.perf_counter()
+            deadline = asyncio.get_running_loop().time() + timeout
+            if self._quiesced:
+                self._discard_ready()
+            if self._owed:
+                for reader in await self._async_exchange([""], self._owed_token, deadline):
+                    reader.discard()
+                self._owed = False
+            chunks, token = self.protocol.frame(command)
+            self._owed, self._owed_token = True, token
+            moved = self.bytes_read, self.bytes_written
+            try:
+                readers = await self._async_exchange(chunks, token, deadline, quiet)
+            except asyncio.TimeoutError:
+                METRICS.count(f"{self.name}.timeouts")
+                raise
+            self._owed = False
+            return self._result(readers, t0, moved)
+
+    async def _async_pipeline(self, commands: Sequence[str], timeout: float, keep_all: bool) -> _Pipeline:
+        data, ends = self._pipeline_data(commands)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self.isalive():
+                await asyncio.to_thread(self._ensure_running)
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            if self._quiesced:
+                self._discard_ready()
+            if self._owed:
+                for reader in await self._async_exchange([""], self._owed_token, deadline):
+                    reader.discard()
+                self._owed = False
+            pipe = _Pipeline(self.protocol, len(commands), self.cap, keep_all)
+            self._owed, self._owed_token = True, None
+            done = pipe.feed(self._pending)
+            self._pending = ""
+            ready = asyncio.Event()
+            loop.add_reader(self._rfd, ready.set)
+            writing = False
+            written = 0
+            try:
+                while not done:
+                    if data:
+                        # the child stops reading while its output is unread:
+                        # keep reading and finish the write when there is room
+                        n = self._write(data)
+                        data, written = data[n:], written + n
+                        if data and not writing:
+                            loop.add_writer(self._wfd, ready.set)
+                            writing = True
+                    if not data and writing:
+                        loop.remove_writer(self._wfd)
+                        writing = False
+                    text = self._read()
+                    if text == "":
+                        raise PipelineEOF(f"{self.name} exited with {len(commands) - pipe.seen} commands unanswered",
+                                          pipe.responses, bisect.bisect_right(ends, written),
+                                          self.protocol.clean(pipe.text) if keep_all else "")
+                    if text is not None:
+                        done = pipe.feed(text)
+                        continue
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        METRICS.count(f"{self.name}.timeouts")
+                        raise PipelineTimeout(f"{self.name}: answered {pipe.seen} of {len(commands)}",
+                                              pipe.responses, bisect.bisect_right(ends, written))
+                    ready.clear()
+                    try:
+                        await asyncio.wait_for(ready.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                if writing:
+                    loop.remove_writer(self._wfd)
+                loop.remove_reader(self._rfd)
+            self._pending = pipe.text
+            self._owed = False
+        return pipe
+
+    async def arun_many(self, commands: Sequence[str], timeout: float = 60.0) -> list[str]:
+        """
+        Pipeline `commands` to a prompt-driven child: write them all at once
+        and split the output at prompt boundaries into one response each.
+        The child runs every command, so use arun() one at a time when a
+        later command depends on an earlier response.
+        """
+        if not commands:
+            return []
+        t0 = time.perf_counter()
+        pipe = await self._async_pipeline(commands, timeout, keep_all=True)
+        METRICS.observe(f"{self.name}.run_many", time.perf_counter() - t0, commands=len(commands))
+        return pipe.responses
+
+    async def areplay(self, commands: Sequence[str], timeout: float = 60.0) -> str:
+        """replay() without blocking the event loop: returns only the last response."""
+        if not commands:
+            return ""
+        t0 = time.perf_counter()
+        pipe = await self._async_pipeline(commands, timeout, keep_all=False)
+        METRICS.count(f"{self.name}.replays")
+        METRICS.observe(f"{self.name}.replay", time.perf_counter() - t0, commands=len(commands))
+        return self.protocol.clean(pipe.last)
+
+    def _result(self, readers: list[_Reader], t0: float, moved: tuple[int, int]) -> Result:
+        """The Result of one command; `moved` is (bytes_read, bytes_written) before it was sent."""
+        output = self.protocol.clean("".join(r.output() for r in readers))
+        spills = [path for path in (r.close() for r in readers) if path]
+        self._spills.extend(spills)
+        while len(self._spills) > SPILL_KEEP:
+            _remove(self._spills.popleft())
+        dropped = sum(r.dropped for r in readers)
+        elapsed = time.perf_counter() - t0
+        if dropped:
+            METRICS.count(f"{self.name}.chars_dropped", dropped)
+        METRICS.observe(f"{self.name}.run", elapsed, chars=len(output), dropped=dropped,
+                        bytes_out=self.bytes_written - moved[1], bytes_in=self.bytes_read - moved[0])
+        return Result(output=output, exit_code=readers[-1].exit_code, dropped=dropped, elapsed=elapsed,
+                      spill=spills[-1] if spills else None, quiesced=any(r.quiesced for r in readers))
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
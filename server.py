@@ -0,0 +1,246 @@
+"""
+Many players, one event loop: the copilot over local HTTP.
+
+    POST   /sessions/<id>/turn    body = what the player typed; the reply streams
+                                  back as chunked text/plain, like the terminal loop
+    DELETE /sessions/<id>         end the conversation and give its game back
+    GET    /stats                 sessions, turns in flight, metrics counters
+    GET    /trace                 spans so far as Chrome trace JSON (with ADVENT_TRACE set)
+
+    curl -N --data 'look' localhost:8765/sessions/alice/turn
+
+Session ids are 1-64 letters, digits, "_" or "-"; anything else is a 400.
+
+Each session keeps its own history and agent; turns of one session run one
+at a time, turns of different sessions interleave. Output is written with
+drain(), so a client that stops reading only stalls its own turn; one that
+stays stalled past WRITE_TIMEOUT is dropped.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from agents import Agent, TResponseInputItem
+
+from loop import TimingHooks, begin_turn, record_turn, stream_turn
+from metrics import METRICS
+from tracing import SESSION, TRACER, span
+
+HOST = os.environ.get("ADVENT_SERVER_HOST", "127.0.0.1")
+PORT = int(os.environ.get("ADVENT_SERVER_PORT", "8765"))
+# seconds a client may leave output unread before it is disconnected
+WRITE_TIMEOUT = float(os.environ.get("ADVENT_SERVER_WRITE_TIMEOUT", "30"))
+# conversations untouched this long are ended
+IDLE_TIMEOUT = float(os.environ.get("ADVENT_SERVER_IDLE_TIMEOUT", "1800"))
+MAX_BODY = 64 * 1024
+# session ids name the game's journal and map files, so they must already be file-safe:
+# the stores would map "alice!" and "alice_" onto one file
+SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+@dataclass
+class Player:
+    """Run context for one conversation; the game tools key their state on session_id."""
+    session_id: str
+
+
+@dataclass
+class Conversation:
+    player: Player
+    agent: Agent[Any]
+    items: list[TResponseInputItem] = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    used: float = field(default_factory=time.monotonic)
+
+
+class ClientGone(Exception):
+    pass
+
+
+class CopilotServer:
+    """
+    `build_agent` makes a fresh agent per conversation. `router(line, sid)`
+    is the optional fast path (see loop.run_demo_loop); `on_close(sid)`
+    releases whatever the session held, e.g. its pooled game.
+    """
+
+    def __init__(
+        self,
+        build_agent: Callable[[], Agent[Any]],
+        *,
+        router: Optional[Callable[[str, str], Awaitable[Optional[str]]]] = None,
+        on_close: Optional[Callable[[str], Awaitable[None]]] = None,
+        token_budget: Optional[int] = None,
+        keep_turns: int = 2,
+    ):
+        self.build_agent, self.router, self.on_close = build_agent, router, on_close
+        self.token_budget, self.keep_turns = token_budget, keep_turns
+        self.sessions: dict[str, Conversation] = {}
+        self.hooks = TimingHooks()
+        self.active = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    # ---- lifecycle ----
+
+    async def start(self, host: str = HOST, port: int = PORT) -> int:
+        """Listen and return the bound port (pass port=0 for any free one)."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self._sweeper = asyncio.create_task(self._sweep())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for sid in list(self.sessions):
+            await self.end(sid)
+
+    async def end(self, sid: str) -> bool:
+        if self.sessions.pop(sid, None) is None:
+            return False
+        METRICS.count("server.sessions_ended")
+        if self.on_close is not None:
+            await self.on_close(sid)
+        return True
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(min(60.0, IDLE_TIMEOUT))
+            now = time.monotonic()
+            for sid, conv in list(self.sessions.items()):
+                if now - conv.used > IDLE_TIMEOUT and not conv.lock.locked():
+                    await self.end(sid)
+
+    def conversation(self, sid: str) -> Conversation:
+        conv = self.sessions.get(sid)
+        if conv is None:
+            conv = self.sessions[sid] = Conversation(Player(sid), self.build_agent())
+            METRICS.count("server.sessions_started")
+        conv.used = time.monotonic()
+        return conv
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "active_turns": self.active,
+            "counters": dict(METRICS.counters),
+        }
+
+    # ---- one turn ----
+
+    async def turn(self, sid: str, line: str, emit: Callable[[str], Awaitable[None]]) -> None:
+        conv = self.conversation(sid)
+        # spans from this turn, its tools and its game I/O go on the session's row
+        SESSION.set(sid)
+        async with conv.lock:
+            self.active += 1
+            turn_start = time.perf_counter()
+            try:
+                history = await begin_turn(conv.items, line, emit, router=self._router_for(sid),
+                                           token_budget=self.token_budget, keep_turns=self.keep_turns)
+                if history is None:
+                    return
+                conv.items = history
+                with span("turn", "turn"):
+                    result = await stream_turn(conv.agent, conv.items, emit, context=conv.player,
+                                               hooks=self.hooks)
+                conv.agent = result.last_agent
+                conv.items = result.to_input_list()
+                record_turn(result, turn_start)
+                await emit("\n")
+            finally:
+                self.active -= 1
+                conv.used = time.monotonic()
+
+    def _router_for(self, sid: str) -> Optional[Callable[[str], Awaitable[Optional[str]]]]:
+        if self.router is None:
+            return None
+        return lambda line: self.router(line, sid)
+
+    # ---- HTTP ----
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, path, body = await _read_request(reader)
+            parts = [p for p in path.split("?", 1)[0].split("/") if p]
+            if len(parts) >= 2 and parts[0] == "sessions" and not SESSION_ID.fullmatch(parts[1]):
+                raise ValueError("session ids are 1-64 letters, digits, '_' or '-'")
+            if method == "GET" and parts == ["stats"]:
+                await _respond(writer, 200, json.dumps(self.stats()), "application/json")
+            elif method == "GET" and parts == ["trace"]:
+                await _respond(writer, 200, json.dumps(TRACER.chrome()), "application/json")
+            elif method == "POST" and len(parts) == 3 and parts[0] == "sessions" and parts[2] == "turn":
+                await self._stream_turn(writer, parts[1], body.decode("utf-8", "replace").strip())
+            elif method == "DELETE" and len(parts) == 2 and parts[0] == "sessions":
+                found = await self.end(parts[1])
+                await _respond(writer, 200 if found else 404, "ended\n" if found else "no such session\n")
+            else:
+                await _respond(writer, 404, "not found\n")
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            await _respond(writer, 400, f"bad request: {e}\n")
+        except (ClientGone, ConnectionError):
+            METRICS.count("server.clients_dropped")
+        finally:
+            writer.close()
+
+    async def _stream_turn(self, writer: asyncio.StreamWriter, sid: str, line: str) -> None:
+        if not line:
+            await _respond(writer, 400, "empty turn\n")
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; charset=utf-8\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+
+        async def emit(text: str) -> None:
+            data = text.encode()
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            try:
+                await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise ClientGone(sid)
+
+        try:
+            await self.turn(sid, line, emit)
+        except (ClientGone, ConnectionError):
+            raise
+        except Exception as e:
+            await emit(f"\n[error: {e!r}]\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+    request = (await reader.readline()).decode("latin-1").split()
+    if len(request) < 2:
+        raise ValueError("no request line")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", "0"))
+    if length > MAX_BODY:
+        raise ValueError("body too large")
+    body = await reader.readexactly(length) if length else b""
+    return request[0].upper(), request[1], body
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, text: str, ctype: str = "text/plain") -> None:
+    data = text.encode()
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}.get(status, "")
+    writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}; charset=utf-8\r\n"
+                 f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+    await writer.drain()
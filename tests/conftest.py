@@ -0,0 +1,75 @@
+import os
+import shlex
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the modules under test, and bench/ for the offline stand-ins (fake_model, fake_advent)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "bench")]
+
+from agents import function_tool, set_tracing_disabled  # noqa: E402
+
+from fake_model import scripted_input  # noqa: E402
+
+# offline: no OpenAI trace upload
+set_tracing_disabled(True)
+
+# bench/fake_advent.py stands in for the real game: same banner, prompt and quit
+FAKE_GAME = f"{shlex.quote(sys.executable)} {shlex.quote(os.path.join(ROOT, 'bench', 'fake_advent.py'))}"
+
+
+@function_tool
+def shout(text: str) -> str:
+    """Say it louder.
+
+    Args:
+        text: What to say.
+    """
+    return text.upper()
+
+
+@pytest.fixture
+def fake_game() -> str:
+    return FAKE_GAME
+
+
+@pytest.fixture
+def typed(monkeypatch):
+    """typed(lines): input() returns these lines, then EOF, as if a player typed them into run_demo_loop."""
+    import builtins
+
+    def type_lines(lines) -> None:
+        monkeypatch.setattr(builtins, "input", scripted_input(lines))
+    return type_lines
+
+
+@pytest.fixture
+def copilot(fake_game, tmp_path, monkeypatch):
+    """advent-agent.py loaded fresh, its pool playing the fake game; call tools with copilot.call()."""
+    import asyncio
+    import importlib.util
+    import json
+    import types
+
+    from agents.tool_context import ToolContext
+
+    monkeypatch.setenv("OPENAI_API_KEY", "offline")
+    monkeypatch.setenv("OPENAI_AGENTS_DISABLE_TRACING", "1")
+    monkeypatch.setenv("ADVENT_POOL_SIZE", "0")
+    spec = importlib.util.spec_from_file_location("advent_agent", os.path.join(ROOT, "advent-agent.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.POOL.factory = lambda: module.AsyncAdventSession(game=fake_game)
+    module.POOL.journals = module.JournalStore(str(tmp_path / "journals"))
+    module.MAPS = module.MapStore(str(tmp_path / "maps"))
+    context = types.SimpleNamespace(session_id="test")
+
+    def call(tool, **args) -> str:
+        payload = json.dumps(args)
+        ctx = ToolContext(context, tool_name=tool.name, tool_call_id="call", tool_arguments=payload)
+        return asyncio.run(tool.on_invoke_tool(ctx, payload))
+
+    module.call = call
+    yield module
+    module.POOL.close()
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from advent_aio import AsyncAdventSession
+
+
+@pytest.fixture(params=["pty", "pipe"])
+def session(request, fake_game):
+    session = AsyncAdventSession(game=fake_game, transport=request.param)
+    session.start()
+    yield session
+    session.stop()
+
+
+def test_eval_returns_one_response(session):
+    assert session.banner.startswith("Welcome to Adventure")
+    assert asyncio.run(session.eval("look")) == "You said 'look'."
+    assert session.journal == ["look"]
+
+
+def test_eval_many_splits_pipelined_responses(session):
+    commands = ["get lamp", "score", "east"]
+    responses = asyncio.run(session.eval_many(commands))
+    assert responses == ["You said 'get lamp'.", "You have scored 32 out of a possible 430, using 2 turns.",
+                         "You said 'east'."]
+    assert session.last_response == "You said 'east'."
+
+
+def test_restore_and_fork_replay_the_checkpoint(session):
+    async def play():
+        await session.eval("get lamp")
+        await session.eval("score")
+        checkpoint = session.checkpoint("before")
+        await session.eval("east")
+        same = await session.restore(checkpoint)
+        other = await session.fork(checkpoint)
+        try:
+            return same, other.last_response, await other.eval("score")
+        finally:
+            other.stop()
+
+    same, forked, score = asyncio.run(play())
+    assert same
+    assert session.journal == ["get lamp", "score"]
+    assert forked == session.last_response
+    assert "using 3 turns" in score
+
+
+def test_eval_during_restore_waits_for_the_restored_game(session):
+    async def play():
+        await session.eval("get lamp")
+        checkpoint = session.checkpoint("one")
+        await session.eval("east")
+        await session.eval("west")
+        restoring = asyncio.ensure_future(session.restore(checkpoint))
+        await asyncio.sleep(0)
+        score = await session.eval("score")
+        return await restoring, score
+
+    same, score = asyncio.run(play())
+    assert same
+    # played after the restore, on top of the checkpoint's one command
+    assert "using 2 turns" in score
+    assert session.journal == ["get lamp", "score"]
+
+
+def test_eval_many_timeout_says_what_was_answered_and_sent(session):
+    from procio import PipelineTimeout
+
+    with pytest.raises(PipelineTimeout) as e:
+        asyncio.run(session.eval_many(["look", "sleep 1", "score"], timeout=0.3))
+    assert e.value.responses == ["You said 'look'."]
+    assert e.value.sent == 3
+
+
+def test_slow_response_does_not_block_the_event_loop(session, fake_game):
+    other = AsyncAdventSession(game=fake_game, transport=session.transport)
+    other.start()
+    # the order things happened in: each game's start and end, and ticks of a third task
+    log: list[str] = []
+
+    async def ticker():
+        while True:
+            await asyncio.sleep(0.01)
+            log.append("tick")
+
+    async def sleep_in(name: str, game: AsyncAdventSession) -> str:
+        log.append(f"{name} start")
+        reply = await game.eval("sleep 0.5", timeout=5)
+        log.append(f"{name} end")
+        return reply
+
+    async def play():
+        beat = asyncio.ensure_future(ticker())
+        try:
+            return await asyncio.gather(sleep_in("a", session), sleep_in("b", other))
+        finally:
+            beat.cancel()
+
+    try:
+        replies = asyncio.run(play())
+    finally:
+        other.stop()
+    assert replies == ["Zzzzz.", "Zzzzz."]
+    # both games slept at once, and the loop ran other tasks meanwhile
+    both_asleep = log[max(log.index("a start"), log.index("b start")):min(log.index("a end"), log.index("b end"))]
+    assert both_asleep and "tick" in both_asleep
+
+
+def test_eval_many_ended_game_says_what_was_answered(session):
+    from procio import PipelineEOF
+
+    with pytest.raises(PipelineEOF) as e:
+        asyncio.run(session.eval_many(["score", "quit", "y"]))
+    assert len(e.value.responses) == 2 and e.value.responses[1] == "Do you really want to quit now?"
+    assert e.value.partial == "OK"
+    assert e.value.sent == 3
+    assert not session.isalive()
+    assert asyncio.run(session.eval("look")) == "You said 'look'."
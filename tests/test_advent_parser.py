@@ -0,0 +1,48 @@
+from advent_parser import StateTracker, parse
+
+ROAD = ("You are standing at the end of a road before a small brick building. Around you is a\n"
+        "forest. A small stream flows out of the building and down a gully.")
+BUILDING = ("You are inside a building, a well house for a large spring.\n\n"
+            "There are some keys on the ground here.\n\n"
+            "There is a shiny brass lamp nearby.\n\n"
+            "There is food here.")
+INVENTORY = "You are currently holding the following:\nBrass lantern\nSet of keys"
+
+
+def test_parse_room_objects_and_echo():
+    state = parse(f"east\r\n{BUILDING}\r\n\r\n> ", command="east")
+    assert state.location == "you are inside a building, a well house for a large spring"
+    assert state.objects == ["some keys", "a shiny brass lamp", "food"]
+    assert state.inventory is None and state.score is None
+    assert parse(ROAD).exits == []
+    assert parse("You are in a valley in the forest beside a stream tumbling along a rocky bed. "
+                 "The stream flows downstream to the south.").exits == ["downstream", "south"]
+
+
+def test_parse_inventory_score_lamp_and_events():
+    assert parse(INVENTORY).inventory == ["Brass lantern", "Set of keys"]
+    assert parse("You're not carrying anything.").inventory == []
+    state = parse("You have scored 32 out of a possible 430, using 5 turns.")
+    assert (state.score, state.max_score) == (32, 430)
+    assert parse("Your lamp is now on.").lamp == "on"
+    assert parse("Your lamp has run out of power.").lamp == "dead"
+    dark = parse("It is now pitch dark.  If you proceed you will likely fall into a pit.")
+    assert dark.dark and dark.events == ["darkness"]
+    assert parse("I don't know that word.").compact() == {"events": ["unknown_word"]}
+
+
+def test_tracker_keeps_what_later_responses_leave_out():
+    tracker = StateTracker()
+    tracker.observe(BUILDING)
+    tracker.observe(INVENTORY)
+    tracker.observe("OK")
+    state = tracker.state
+    assert state.location.startswith("you are inside a building")
+    assert state.inventory == ["Brass lantern", "Set of keys"]
+    assert len(state.objects) == 3
+    # going into the dark forgets the room, not what is carried
+    tracker.observe("It is now pitch dark.  If you proceed you will likely fall into a pit.")
+    assert state.location is None and state.objects == [] and state.dark
+    assert state.inventory == ["Brass lantern", "Set of keys"]
+    tracker.observe(ROAD)
+    assert not state.dark and state.location.startswith("you are standing at the end of a road")
@@ -0,0 +1,72 @@
+import asyncio
+import shlex
+import sys
+
+import pytest
+
+from advent_aio import AsyncAdventSession
+from advent_session import AdventSession, game_argv, unecho
+
+# like advent: commands read from a pipe (not the skipped comments) are printed back
+ECHOING_GAME = '''
+import sys
+echo = not sys.stdin.isatty()
+sys.stdout.write("\\nWelcome to Adventure!!  Would you like instructions?\\n\\n> ")
+sys.stdout.flush()
+for line in sys.stdin:
+    if line.startswith("#"):
+        sys.stdout.write("> ")
+    else:
+        if echo:
+            sys.stdout.write("> " + line)
+        sys.stdout.write("\\nYou said %r.\\n\\n> " % line.strip())
+    sys.stdout.flush()
+'''
+
+
+@pytest.fixture
+def echoing_game(tmp_path) -> str:
+    script = tmp_path / "echoing_game.py"
+    script.write_text(ECHOING_GAME)
+    return f"{shlex.quote(sys.executable)} {shlex.quote(str(script))}"
+
+
+def test_unecho_drops_only_the_command():
+    assert unecho("look", "look\n\nYou said 'look'.") == "You said 'look'."
+    assert unecho("look", "> look\nYou said 'look'.") == "You said 'look'."
+    assert unecho("look", "You said 'look'.") == "You said 'look'."
+    assert unecho("look", "look") == ""
+
+
+def test_pipe_transport_runs_the_game_unbuffered():
+    argv = game_argv("advent -r save", "pipe")
+    assert argv[-3:] == ["advent", "-r", "save"]
+    assert game_argv("advent -r save", "pty") == ["advent", "-r", "save"]
+
+
+@pytest.mark.parametrize("transport", ["pty", "pipe"])
+def test_both_transports_return_the_same_responses(echoing_game, transport):
+    session = AdventSession(game=echoing_game, transport=transport)
+    session.start()
+    try:
+        assert session.proc.banner.startswith("Welcome to Adventure")
+        assert [session.eval(c) for c in ("look", "get lamp", "look")] == [
+            "You said 'look'.", "You said 'get lamp'.", "You said 'look'."]
+    finally:
+        session.stop()
+
+
+@pytest.mark.parametrize("transport", ["pty", "pipe"])
+def test_async_session_shares_the_response_handling(echoing_game, transport):
+    session = AsyncAdventSession(game=echoing_game, transport=transport)
+    session.start()
+
+    async def play():
+        return [await session.eval("look"), *await session.eval_many(["get lamp", "look"])]
+
+    try:
+        assert asyncio.run(play()) == [
+            "You said 'look'.", "You said 'get lamp'.", "You said 'look'."]
+        assert session.journal == ["look", "get lamp", "look"]
+    finally:
+        session.stop()
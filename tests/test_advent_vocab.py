@@ -0,0 +1,35 @@
+import json
+
+from advent_vocab import awaiting_answer, check, command_class, is_command, lookup
+
+
+def test_words_match_on_their_first_five_letters():
+    assert lookup("lantern") == "lantern"
+    assert lookup("LANTE") == "lantern"
+    assert lookup("northx") == "north"
+    assert lookup("grab") is None
+    assert lookup("get!") is None
+
+
+def test_check_canonicalises_and_suggests():
+    assert check("  GET   Lamp ") == ("get lamp", {})
+    canonical, unknown = check("get lampp")
+    assert canonical == "get"
+    assert list(unknown) == ["lampp"] and unknown["lampp"][0] == "lamp"
+    assert is_command("north") and is_command("get lamp")
+    assert not is_command("get the lamp") and not is_command("where am i?") and not is_command("")
+    assert command_class("n") == "move" and command_class("take lamp") == "take"
+    assert command_class("frobnicate") == "other"
+    assert awaiting_answer("Do you really want to quit now?")
+
+
+def test_unknown_word_is_rejected_without_a_round_trip(copilot):
+    copilot.VALIDATE = True
+    # the banner asks a question: any answer goes through
+    assert copilot.call(copilot.game_eval, code="nope") == "You said 'nope'."
+    reply = json.loads(copilot.call(copilot.game_eval, code="frobnicate lamp"))
+    assert reply["rejected"] == "frobnicate lamp" and "frobnicate" in reply["unknown"]
+    session = copilot.POOL.acquire("test")
+    assert session.journal == ["nope"]
+    assert copilot.call(copilot.game_eval, code="GET LAMP") == "You said 'get lamp'."
+    assert session.journal == ["nope", "get lamp"]
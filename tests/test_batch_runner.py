@@ -0,0 +1,25 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_fake_batch_plays_every_game_and_summarizes(tmp_path):
+    out = tmp_path / "runs"
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    subprocess.run([sys.executable, os.path.join(ROOT, "demo", "batch_runner.py"), "--fake", "--games", "4",
+                    "--concurrency", "2", "--out", str(out)],
+                   cwd=tmp_path, env=env, check=True, capture_output=True, timeout=120)
+    summary = json.loads((out / "summary.json").read_text())
+    assert summary["games"] == 4
+    assert summary["ends"] == {"finished": 4}
+    assert summary["score"]["min"] == summary["score"]["max"] == 32
+    games = [json.loads(line) for line in (out / "games.jsonl").read_text().splitlines()]
+    assert sorted(g["game"] for g in games) == [0, 1, 2, 3]
+    for g in games:
+        # the scripted walk, each command answered by that game's own worker
+        assert g["steps"] == 6
+        assert g["final"] == f"game {g['game']} done"
+        assert g["transcript"][1] == ["look", "You said 'look'."]
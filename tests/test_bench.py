@@ -0,0 +1,27 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_every_benchmark_runs_offline(tmp_path):
+    out = tmp_path / "results.json"
+    # a terminal game the user may want to --resume
+    (tmp_path / "journals").mkdir()
+    saved = tmp_path / "journals" / "default.jsonl"
+    saved.write_text('"get lamp"\n')
+    # no key and no advent: the suite must run on the fake game and model alone
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    subprocess.run([sys.executable, os.path.join(ROOT, "bench", "run.py"), "--reps", "3", "--json", str(out)],
+                   cwd=tmp_path, env=env, check=True, capture_output=True, timeout=120)
+    results = json.loads(out.read_text())["results"]
+    assert "demo_loop" in results and "game_session" in results
+    for name, row in results.items():
+        assert "error" not in row, (name, row)
+        assert row["n"] == 3 and row["ops_per_s"] > 0
+    # the copilot's journals and maps in the working directory are left alone
+    assert sorted(os.listdir(tmp_path)) == ["journals", "results.json"]
+    assert os.listdir(tmp_path / "journals") == ["default.jsonl"]
+    assert saved.read_text() == '"get lamp"\n'
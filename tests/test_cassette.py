@@ -0,0 +1,50 @@
+import asyncio
+import os
+
+import pytest
+from agents import Agent, Runner
+
+from cassette import Cassette, CassetteMiss, wrap_agent
+from conftest import shout
+from fake_model import FakeModel
+from loop import stream_turn
+
+
+def agent_on(model: FakeModel, cassette: Cassette) -> Agent:
+    return wrap_agent(Agent(name="Loud", instructions="", tools=[shout], model=model), cassette)
+
+
+def test_replay_answers_from_disk_without_the_model(tmp_path):
+    path = str(tmp_path / "tape")
+    recorder = FakeModel(tool="shout", argument="text")
+    recorded = asyncio.run(Runner.run(agent_on(recorder, Cassette(path, mode="record")), "hello"))
+    assert recorded.final_output == "HELLO" and recorder.calls == 2
+
+    # a new process: only the files are shared
+    live = FakeModel(tool="shout", argument="text")
+    tape = Cassette(path, mode="replay", miss="fail")
+    replayed = asyncio.run(Runner.run(agent_on(live, tape), "hello"))
+    assert replayed.final_output == "HELLO"
+    assert live.calls == 0 and tape.hits == 2
+    assert replayed.context_wrapper.usage.input_tokens == recorded.context_wrapper.usage.input_tokens
+
+    # and streamed, as the demo loop plays it
+    async def ignore(text: str) -> None:
+        pass
+
+    streamed = asyncio.run(stream_turn(agent_on(live, tape), [{"role": "user", "content": "hello"}], ignore))
+    assert streamed.final_output == "HELLO" and live.calls == 0
+
+
+def test_miss_policy(tmp_path):
+    path = str(tmp_path / "tape")
+    with pytest.raises(CassetteMiss):
+        asyncio.run(Runner.run(agent_on(FakeModel(tool="shout", argument="text"),
+                                         Cassette(path, miss="fail")), "hello"))
+    model = FakeModel(tool="shout", argument="text")
+    asyncio.run(Runner.run(agent_on(model, Cassette(path, miss="passthrough")), "hello"))
+    assert model.calls == 2
+    # passthrough stored nothing; record stores what it fetched
+    assert not os.path.exists(path + ".idx")
+    asyncio.run(Runner.run(agent_on(model, Cassette(path, miss="record")), "hello"))
+    assert len(open(path + ".idx").readlines()) == 2
@@ -0,0 +1,59 @@
+import os
+
+from cave_map import CaveMap, MapStore, room_key
+
+ROAD = ("You are standing at the end of a road before a small brick building. Around you is a "
+        "forest. A small stream flows out of the building and down a gully.")
+ROAD_SHORT = "You're at end of road again."
+BUILDING = "You are inside a building, a well house for a large spring."
+VALLEY = "You are in a valley in the forest beside a stream tumbling along a rocky bed."
+FOREST = "You are in open forest, with a deep valley to one side."
+
+
+def test_room_key_ignores_failures():
+    assert room_key(ROAD) == "you are standing at the end of a road before a small brick building"
+    assert room_key("You can't go that way.") is None
+    assert room_key("OK") is None
+
+
+def test_revisit_from_two_directions_is_one_room():
+    cave = CaveMap()
+    road = cave.observe("look", ROAD)
+    building = cave.observe("east", BUILDING)
+    # back by a verb never seen from here: only the short description comes back
+    assert cave.observe("west", ROAD_SHORT) == road
+    valley = cave.observe("south", VALLEY)
+    # and again from another room
+    assert cave.observe("north", ROAD_SHORT) == road
+    assert len(cave.rooms) == 3
+    cave.current = valley
+    assert cave.path(valley, building) == [("north", road), ("east", building)]
+    assert cave.path(building, valley) == [("west", road), ("south", valley)]
+
+
+def test_ambiguous_short_description_is_a_new_room():
+    cave = CaveMap()
+    cave.observe("look", VALLEY)
+    cave.observe("west", FOREST)
+    # "forest" appears in both known rooms; don't guess
+    assert cave.observe("plugh", "You're in forest.") == "you're in forest"
+
+
+def test_map_is_saved_per_session(tmp_path):
+    store = MapStore(str(tmp_path))
+    store.observe("s", "look", ROAD)
+    store.observe("s", "east", BUILDING)
+    again = MapStore(str(tmp_path)).get("s")
+    assert again.exits(room_key(ROAD)) == {"east": room_key(BUILDING)}
+    assert again.current == room_key(BUILDING)
+
+
+def test_dropped_map_is_forgotten(tmp_path):
+    store = MapStore(str(tmp_path))
+    store.observe("s", "look", ROAD)
+    store.observe("t", "look", BUILDING)
+    store.drop("s")
+    store.drop("never-seen")
+    assert os.listdir(tmp_path) == ["t.json"]
+    assert store.get("s").rooms == {} and store.get("s").current is None
+    assert store.get("t").current == room_key(BUILDING)
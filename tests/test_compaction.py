@@ -0,0 +1,56 @@
+import json
+
+from compaction import compact, estimate_tokens
+
+ROOM = "You are inside a building, a well house for a large spring. " * 10
+
+
+def call(name: str, output: str, n: int) -> list[dict]:
+    return [{"type": "function_call", "call_id": f"c{n}", "name": name, "arguments": "{}"},
+            {"type": "function_call_output", "call_id": f"c{n}", "output": output}]
+
+
+def history() -> list[dict]:
+    batch = json.dumps([{"command": "east", "output": ROOM}, {"command": "get lamp", "output": "OK"}])
+    return [
+        {"role": "user", "content": "look around"},
+        *call("game_eval", ROOM, 1),
+        {"role": "user", "content": "go get the lamp"},
+        *call("game_eval_batch", batch, 2),
+        {"role": "user", "content": "back to the road"},
+        *call("route_to", "Arrived via west:\n" + ROOM, 3),
+        {"role": "user", "content": "east"},
+        {"role": "assistant", "content": ROOM},  # answered by the fast path
+        {"role": "user", "content": "now what?"},
+        {"role": "user", "content": "and then?"},
+    ]
+
+
+def outputs(items: list[dict]) -> dict:
+    return {i["call_id"]: i["output"] for i in items if i.get("type") == "function_call_output"}
+
+
+def test_under_budget_is_untouched():
+    items = history()
+    assert compact(items, budget=10_000) == (items, 0)
+
+
+def test_every_game_output_is_collapsed():
+    items, saved = compact(history(), budget=300)
+    assert saved > 0
+    out = outputs(items)
+    assert out["c1"].startswith("You are inside a building")
+    assert out["c2"].startswith("east; get lamp [earlier output,")
+    assert out["c3"].startswith("Arrived via west: [earlier output,")
+    reply = next(i for i in items if i.get("role") == "assistant")
+    assert reply["content"].endswith("chars elided]")
+    # calls keep their outputs, and the recent turns are verbatim
+    assert [i["call_id"] for i in items if i.get("type") == "function_call"] == list(out)
+    assert items[-2:] == history()[-2:]
+
+
+def test_drops_oldest_turns_when_still_over_budget():
+    items, _ = compact(history(), budget=200)
+    assert sum(estimate_tokens(i) for i in items) <= 200
+    assert items[0]["role"] == "user"
+    assert items[-2:] == history()[-2:]
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import sys
+
+from fake_model import FakeModel
+from loop import run_demo_loop
+
+
+def test_game_eval_batch_runs_every_command(copilot):
+    results = json.loads(copilot.call(copilot.game_eval_batch, commands=["look", "score"]))
+    assert [r["command"] for r in results] == ["look", "score"]
+    assert "using 2 turns" in results[1]["output"]
+
+
+def test_game_eval_batch_timeout_reports_sent_commands(copilot):
+    copilot.BATCH_TIMEOUT = 0.2
+    copilot.VALIDATE = False
+    results = json.loads(copilot.call(copilot.game_eval_batch, commands=["look", "sleep 1", "score"]))
+    assert results[0]["command"] == "look"
+    assert "error" in results[1]
+    # all three went out in one write: nothing was skipped
+    assert results[2] == {"sent_no_response": ["sleep 1", "score"]}
+    assert len(results) == 3
+
+
+# three rooms of the real cave, with advent's short descriptions on revisits
+TINY_CAVE = '''
+import sys
+ROOMS = {
+    "road": ("You are standing at the end of a road before a small brick building.",
+             "You're at end of road again.", {"east": "building", "south": "valley"}),
+    "building": ("You are inside a building, a well house for a large spring.",
+                 "You're inside building.", {"west": "road"}),
+    "valley": ("You are in a valley in the forest beside a stream tumbling along a rocky bed.",
+               "You're in valley.", {"north": "road"}),
+}
+here, seen, moves = "road", {"road"}, []
+sys.stdout.write("\\nWelcome to Adventure!!\\n\\n> ")
+sys.stdout.flush()
+for line in sys.stdin:
+    cmd = line.strip()
+    if cmd.startswith("#"):
+        sys.stdout.write("> ")
+    else:
+        if cmd == "moves":
+            text = " ".join(moves)
+        elif cmd == "look":
+            text = ROOMS[here][0]
+        elif cmd in ROOMS[here][2]:
+            moves.append(cmd)
+            here = ROOMS[here][2][cmd]
+            text = ROOMS[here][1] if here in seen else ROOMS[here][0]
+            seen.add(here)
+        else:
+            text = "You can't go that way."
+        sys.stdout.write("\\n" + text + "\\n\\n> ")
+    sys.stdout.flush()
+'''
+
+
+def test_route_to_walks_the_shortest_known_path(copilot, tmp_path):
+    script = tmp_path / "tiny_cave.py"
+    script.write_text(TINY_CAVE)
+    copilot.POOL.factory = lambda: copilot.AsyncAdventSession(game=f"{sys.executable} {script}")
+    copilot.VALIDATE = False
+    for move in ["look", "east", "west", "south", "north", "south"]:
+        copilot.call(copilot.game_eval, code=move)
+    out = copilot.call(copilot.route_to, room="well house")
+    assert out.startswith("Arrived via north east")
+    # only the two moves of the route reached the game, in one tool call
+    assert copilot.call(copilot.game_eval, code="moves") == "east west south north south north east"
+
+
+def test_plain_commands_skip_the_model(copilot, typed, capsys):
+    agent = copilot.build_agent()
+    agent.model = model = FakeModel()
+    typed(["get lamp", "score", "what should I try next?"])
+    asyncio.run(run_demo_loop(agent, stream=False, router=lambda line: copilot.play_direct(line, "test")))
+    shown = capsys.readouterr().out
+    assert "You said 'get lamp'." in shown
+    assert "using 2 turns" in shown
+    # only the question went to the model: a tool call and its summary
+    assert model.calls == 2
+
+
+def test_game_eval_batch_keeps_the_answers_before_the_game_exits(copilot):
+    copilot.VALIDATE = False
+    results = json.loads(copilot.call(copilot.game_eval_batch, commands=["score", "quit", "y", "look"]))
+    assert [r.get("command") for r in results[:3]] == ["score", "quit", "y"]
+    assert "using 1 turns" in results[0]["output"]
+    assert results[1]["output"] == "Do you really want to quit now?"
+    assert results[2]["output"] == "OK"
+    assert "exited" in results[3]["error"]
+    # written with the rest, but the game was gone before reading it
+    assert results[4] == {"sent_no_response": ["look"]}
+    assert len(results) == 5
+
+
+def test_end_session_forgets_the_map(copilot):
+    copilot.MAPS.observe("test", "look", "You are inside a building, a well house for a large spring.")
+    assert os.listdir(copilot.MAPS.directory) == ["test.json"]
+    asyncio.run(copilot.end_session("test"))
+    assert os.listdir(copilot.MAPS.directory) == []
+    # a new player on the same id starts without a position
+    assert copilot.MAPS.get("test").current is None
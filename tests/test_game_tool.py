@@ -0,0 +1,54 @@
+import os
+import shlex
+import sys
+import time
+
+from conftest import FAKE_GAME, ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "demo"))
+
+from game_tool import GameSession  # noqa: E402
+
+
+def test_game_session_sends_and_keeps_last_response():
+    session = GameSession(cmd=shlex.split(FAKE_GAME), timeout=5.0)
+    try:
+        assert session.last.startswith("Welcome to Adventure")
+        assert session.send("look\n") == "You said 'look'."
+        assert session.last == "You said 'look'."
+        # the game exits; the next command is answered by a new one
+        session.send("quit")
+        assert "exited" in session.send("y")
+        assert session.send("score").startswith("You have scored")
+    finally:
+        session.close()
+
+
+def test_large_response_is_read_whole_in_linear_time():
+    session = GameSession(cmd=shlex.split(FAKE_GAME), timeout=10.0)
+    size = 900_000
+    try:
+        started = time.perf_counter()
+        out = session.send(f"dump {size}")
+        elapsed = time.perf_counter() - started
+        # the prompt is only looked for in new output, so the read doesn't rescan the dump
+        assert size - 1 <= len(out) < size + 100
+        assert out.endswith("all alike.")
+        assert elapsed < 3.0
+        assert session.send("look") == "You said 'look'."
+    finally:
+        session.close()
+
+
+def test_batch_ignores_unknown_stop_events(monkeypatch):
+    import game_tool
+
+    session = GameSession(cmd=shlex.split(FAKE_GAME), timeout=5.0)
+    monkeypatch.setattr(game_tool, "_game", session)
+    try:
+        session.send("n")  # past the instructions question
+        out = game_tool.game_io_batch(["look", "score"], stop_on=["death", "treasure_found"])
+        assert [r["command"] for r in out["results"]] == ["look", "score"]
+        assert out["skipped"] == []
+    finally:
+        session.close()
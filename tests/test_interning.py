@@ -0,0 +1,30 @@
+from cave_map import room_key
+from interning import DescriptionStore, DescriptionTable
+
+ROAD = ("You are standing at the end of a road before a small brick building. Around you is a\n"
+        "forest. A small stream flows out of the building and down a gully.")
+
+
+def test_repeated_description_becomes_a_reference():
+    table = DescriptionTable()
+    first = table.shrink(f"{ROAD}\n\nThere is a shiny brass lamp nearby.")
+    assert first == f"[R1] {ROAD}\n\nThere is a shiny brass lamp nearby."
+    again = table.shrink(f"{ROAD}\n\nThere is a shiny brass lamp nearby.")
+    assert again == "[R1: You are standing at the end of a road be…]\n\nThere is a shiny brass lamp nearby."
+    assert table.saved_chars == len(ROAD) - len(again.split("\n\n")[0])
+    # the reference gives back the whole text, however it is written
+    assert table.expand("[R1: You are standing…]") == ROAD
+    assert table.expand("r1") == ROAD
+    assert table.expand("R9") == "Unknown reference 'R9'."
+
+
+def test_short_replies_and_sessions_are_kept_apart():
+    store = DescriptionStore()
+    assert store.shrink("a", "OK") == "OK"
+    assert store.shrink("a", "OK") == "OK"
+    store.shrink("a", ROAD)
+    # another conversation has not seen the description yet
+    assert store.shrink("b", ROAD).startswith("[R1] You are standing")
+    store.drop("a")
+    assert store.shrink("a", ROAD).startswith("[R1] ")
+    assert room_key(store.get("a").expand("R1")) == room_key(ROAD)
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pytest
+
+from advent_aio import AsyncAdventSession
+from advent_session import AdventSession
+from journal import Journal, JournalStore
+
+
+def test_journal_survives_reopen_and_torn_last_line(tmp_path):
+    path = str(tmp_path / "s.jsonl")
+    journal = Journal(path)
+    journal.extend(["get lamp", "east"])
+    with open(path, "a") as f:
+        f.write('"west')  # a crash mid-write
+    assert Journal(path).commands == ["get lamp", "east"]
+    journal.rewrite(["get lamp"])
+    assert [json.loads(line) for line in open(path)] == ["get lamp"]
+
+
+def test_store_keys_journals_by_session(tmp_path):
+    store = JournalStore(str(tmp_path))
+    store.get("a/b").append("look")
+    assert JournalStore(str(tmp_path)).get("a/b").commands == ["look"]
+    store.drop("a/b")
+    assert JournalStore(str(tmp_path)).get("a/b").commands == []
+
+
+# the same checks for the blocking and the asyncio session
+
+def run(session, method, *args):
+    out = getattr(session, method)(*args)
+    return asyncio.run(out) if asyncio.iscoroutine(out) else out
+
+
+@pytest.fixture(params=[AdventSession, AsyncAdventSession])
+def make(request, fake_game, tmp_path):
+    sessions = []
+
+    def make():
+        session = request.param(game=fake_game)
+        session.log = Journal(str(tmp_path / "game.jsonl"))
+        sessions.append(session)
+        return session
+
+    yield make
+    for session in sessions:
+        session.stop()
+
+
+def test_crashed_game_is_replayed_from_the_journal(make):
+    session = make()
+    session.start()
+    for command in ["get lamp", "east", "west"]:
+        run(session, "eval", command)
+    session.proc.stop()  # the game dies
+    assert "using 4 turns" in run(session, "eval", "score")
+    # and a new copilot with the same journal picks up from there
+    again = make()
+    again.start()
+    assert "using 5 turns" in run(again, "eval", "score")
+
+
+def test_game_that_ends_is_not_replayed(make):
+    session = make()
+    session.start()
+    run(session, "eval", "get lamp")
+    run(session, "eval", "quit")
+    with pytest.raises(EOFError):
+        run(session, "eval", "y")
+    assert session.log.commands == []
+    assert "using 1 turns" in run(session, "eval", "score")
+
+
+def test_journal_ending_in_an_exit_starts_a_new_game(make):
+    session = make()
+    session.log.extend(["get lamp", "quit", "y"])
+    session.start()
+    assert "using 1 turns" in run(session, "eval", "score")
+    assert session.log.commands == ["score"]
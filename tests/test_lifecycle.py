@@ -0,0 +1,131 @@
+import resource
+import sys
+import threading
+import time
+
+import pexpect
+
+from lifecycle import ChildRegistry, rlimits
+
+PRINT_AS = f"{sys.executable} -c 'import resource; print(resource.getrlimit(resource.RLIMIT_AS)[0])'"
+
+
+def registry(**kwargs) -> ChildRegistry:
+    return ChildRegistry(reap_interval=3600, **kwargs)
+
+
+def address_space_limit(reg: ChildRegistry, **kwargs) -> int:
+    child = reg.spawn("s", PRINT_AS, encoding="utf-8", **kwargs)
+    child.expect(pexpect.EOF, timeout=10)
+    return int(child.before.strip())
+
+
+def test_no_address_space_limit_unless_asked():
+    reg = registry()
+    try:
+        assert address_space_limit(reg) == resource.getrlimit(resource.RLIMIT_AS)[0]
+        assert address_space_limit(reg, limits=rlimits(memory_mb=512)) == 512 * 1024 * 1024
+    finally:
+        reg.close()
+
+
+def test_reap_skips_a_child_in_use_and_closes_it_once_idle():
+    reg = registry(idle_timeout=0.05)
+    try:
+        child = reg.spawn("s", "cat")
+        in_call, done = threading.Event(), threading.Event()
+
+        def long_call():
+            with reg.lease("s") as leased:
+                assert leased is child
+                in_call.set()
+                done.wait(5)
+
+        caller = threading.Thread(target=long_call)
+        caller.start()
+        in_call.wait(5)
+        time.sleep(0.1)
+        reg.reap()
+        assert "s" in reg and child.isalive()
+        done.set()
+        caller.join()
+        reg.reap()
+        assert "s" in reg  # the call just ended: not idle yet
+        time.sleep(0.1)
+        reg.reap()
+        assert "s" not in reg
+        assert reg.stats()["evicted_idle"] == 1
+    finally:
+        reg.close()
+
+
+def test_lru_eviction_and_dead_children():
+    reg = registry(capacity=2)
+    try:
+        a = reg.spawn("a", "cat")
+        reg.spawn("b", "cat")
+        reg.get("a")
+        reg.spawn("c", "true")
+        assert "b" not in reg and "a" in reg
+        assert reg.get("a") is a
+        reg.get("c").expect(pexpect.EOF, timeout=5)
+        time.sleep(0.1)
+        reg.reap()
+        assert "c" not in reg
+        assert reg.stats()["reaped"] == 1
+    finally:
+        reg.close()
+
+
+def in_call(reg: ChildRegistry, session_id: str) -> tuple[threading.Thread, threading.Event, list]:
+    """A thread holding the session's lease until the returned event is set; it logs when it is done."""
+    inside, done, log = threading.Event(), threading.Event(), []
+
+    def call():
+        with reg.lease(session_id) as child:
+            inside.set()
+            done.wait(5)
+            log.append(("call ended", child.isalive()))
+
+    caller = threading.Thread(target=call)
+    caller.start()
+    inside.wait(5)
+    return caller, done, log
+
+
+def test_lru_eviction_passes_over_a_child_in_use():
+    reg = registry(capacity=2)
+    try:
+        a = reg.spawn("a", "cat")
+        b = reg.spawn("b", "cat")
+        caller, done, log = in_call(reg, "a")
+        reg.spawn("c", "cat")
+        # "a" is older but mid-call, so "b" goes
+        assert "a" in reg and "b" not in reg and a.isalive() and not b.isalive()
+        done.set()
+        caller.join()
+        assert log == [("call ended", True)]
+    finally:
+        reg.close()
+
+
+def test_stop_and_respawn_wait_for_the_call_to_end():
+    reg = registry()
+    try:
+        for end in (lambda: reg.stop("s"), lambda: reg.spawn("s", "cat")):
+            reg.spawn("s", "cat")
+            caller, done, log = in_call(reg, "s")
+            ender = threading.Thread(target=lambda: (end(), log.append("closed")))
+            ender.start()
+            time.sleep(0.1)
+            assert log == []  # still waiting for the call
+            done.set()
+            caller.join()
+            ender.join(5)
+            assert log == [("call ended", True), "closed"]
+        # a caller may stop the child it holds
+        with reg.lease("s"):
+            assert reg.stop("s")
+        assert "s" not in reg
+    finally:
+        reg.close()
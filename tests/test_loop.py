@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from agents import Agent
+
+import loop
+from conftest import shout
+from fake_model import FakeModel
+from metrics import Metrics, percentile
+
+
+def test_percentile_is_nearest_rank():
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 99) == 5.0
+    assert percentile(values, 1) == 1.0
+
+
+def test_samples_are_bounded_per_metric():
+    metrics = Metrics(window=3)
+    for n in range(10):
+        metrics.observe("game.run", float(n))
+    assert list(metrics.samples["game.run"]) == [7.0, 8.0, 9.0]
+    # the summary still counts every sample, over the latest ones
+    row = metrics.summary().splitlines()[1].split()
+    assert row[:3] == ["game.run", "10", "8"]
+
+
+def test_turn_records_model_tool_and_turn_timings(tmp_path, monkeypatch):
+    path = tmp_path / "events.jsonl"
+    metrics = Metrics(str(path))
+    monkeypatch.setattr(loop, "METRICS", metrics)
+    agent = Agent(name="Loud", instructions="", tools=[shout], model=FakeModel(tool="shout", argument="text"))
+    shown: list[str] = []
+
+    async def emit(text: str) -> None:
+        shown.append(text)
+
+    async def turn():
+        started = loop.time.perf_counter()
+        result = await loop.stream_turn(agent, [{"role": "user", "content": "hello"}], emit,
+                                        hooks=loop.TimingHooks())
+        loop.record_turn(result, started)
+        return result
+
+    result = asyncio.run(turn())
+    metrics.close()
+    assert result.final_output == "HELLO"
+    assert "HELLO" in "".join(shown)
+    # a tool call and a summary: two model calls, one tool call
+    assert len(metrics.samples["model.call"]) == 2
+    assert len(metrics.samples["tool.shout"]) == 1
+    for name in ("turn.first_delta", "turn.wall", "turn.tokens_in", "turn.tokens_out"):
+        assert len(metrics.samples[name]) == 1
+    assert metrics.samples["turn.tokens_in"][0] == result.context_wrapper.usage.input_tokens > 0
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    calls = [e for e in events if e["event"] == "model.call"]
+    assert all(e["tokens_in"] > 0 and e["value"] >= 0 for e in calls)
+    assert "tool.shout" in metrics.summary()
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import shlex
+import signal
+
+import pytest
+
+import procio
+from metrics import Metrics
+from procio import EOFProtocol, Process, PromptProtocol, Result, SentinelProtocol, SPILL_KEEP
+
+
+@pytest.fixture
+def bash():
+    proc = Process(["/bin/bash", "--noprofile", "--norc"], SentinelProtocol(), name="bash", cap=1000, spill=True)
+    proc.start()
+    yield proc
+    proc.stop()
+
+
+def test_sentinel_reports_exit_codes_and_keeps_state(bash):
+    assert bash.run("cd /tmp; false").exit_code == 1
+    result = bash.run("pwd")
+    assert (result.exit_code, result.output.strip()) == (0, "/tmp")
+
+
+def test_output_over_the_cap_keeps_head_and_tail_and_spills(bash):
+    result = bash.run("seq 1 10000")
+    assert result.dropped > 0
+    assert result.output.startswith("1\n2\n") and result.output.rstrip().endswith("10000")
+    with open(result.spill) as f:
+        assert f.read().split() == [str(n) for n in range(1, 10001)]
+
+
+def test_spill_files_are_capped_and_removed_on_stop(bash):
+    spills = [bash.run("seq 1 2000").spill for _ in range(SPILL_KEEP + 2)]
+    assert not os.path.exists(spills[0]) and not os.path.exists(spills[1])
+    assert all(os.path.exists(p) for p in spills[2:])
+    bash.stop()
+    assert not any(os.path.exists(p) for p in spills)
+
+
+def test_timed_out_command_leaves_no_spill_and_session_usable(bash):
+    before = set(os.listdir(bash.spill_dir))
+    with pytest.raises(TimeoutError):
+        bash.run("seq 1 5000; sleep 1", timeout=0.3)
+    assert set(os.listdir(bash.spill_dir)) - before == set()
+    assert bash.run("echo ok").output.strip() == "ok"
+
+
+def test_killed_child_reports_the_signal():
+    proc = Process(["/bin/sh", "-c", "kill -9 $$"], EOFProtocol(), pty=True, name="sh")
+    proc.start()
+    try:
+        result = proc.run("")
+    finally:
+        proc.stop()
+    assert result.exit_code == -signal.SIGKILL
+    assert result.status == "killed by SIGKILL"
+    assert Result("", exit_code=None).status == "killed/timeout"
+    assert Result("", exit_code=0).status == "0"
+
+
+def test_prompt_protocol_pipelines_and_replays(fake_game):
+    proc = Process(shlex.split(fake_game), PromptProtocol("> ", sentinel="#"), name="game")
+    proc.start()
+    try:
+        assert proc.banner.startswith("Welcome")
+        assert proc.replay(["a", "b", "read"]).startswith("The message reads:")
+        responses = asyncio.run(proc.arun_many(["read", "score"]))
+        assert responses[0] == "The message reads:\n> \n> Beware the dwarves > \n..."
+        assert "using 5 turns" in responses[1]
+        assert "using 7 turns" in asyncio.run(proc.areplay(["x", "score"]))
+    finally:
+        proc.stop()
+
+
+def test_framed_response_is_not_cut_at_a_prompt_in_the_text(fake_game):
+    proc = Process(shlex.split(fake_game), PromptProtocol("> ", sentinel="#"), name="game")
+    proc.start()
+    try:
+        # "> " at line starts and line ends inside the text, then the real prompt
+        assert proc.run("read").output == "The message reads:\n> \n> Beware the dwarves > \n..."
+        # the sentinel's own prompt was consumed with it, nothing is left over
+        assert proc.run("look").output == "You said 'look'."
+        assert "using 3 turns" in proc.run("score").output
+    finally:
+        proc.stop()
+
+
+def test_run_event_counts_the_bytes_each_way(fake_game, tmp_path, monkeypatch):
+    path = tmp_path / "events.jsonl"
+    metrics = Metrics(str(path))
+    monkeypatch.setattr(procio, "METRICS", metrics)
+    proc = Process(shlex.split(fake_game), PromptProtocol("> ", sentinel="#"), name="game", pty=False)
+    proc.start()
+    try:
+        output = proc.run("look").output
+    finally:
+        proc.stop()
+        metrics.close()
+    (event,) = [json.loads(line) for line in path.read_text().splitlines()
+                if json.loads(line)["event"] == "game.run"]
+    assert event["bytes_out"] == len(b"look\n#\n")
+    # the response, its blank lines and both prompts
+    assert event["bytes_in"] == len(f"\n{output}\n\n> > ".encode())
@@ -0,0 +1,98 @@
+import asyncio
+import itertools
+import json
+
+from fake_model import FakeModel
+from server import CopilotServer
+
+
+async def request(port: int, method: str, path: str, body: str = "") -> tuple[int, str]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = body.encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    raw = (await reader.read()).decode()
+    writer.close()
+    head, _, payload = raw.partition("\r\n\r\n")
+    return int(head.split()[1]), payload
+
+
+class StampedModel(FakeModel):
+    """FakeModel that logs +1 when a call starts and -1 when it ends to a shared list."""
+
+    def __init__(self, stamps: list[int], **kwargs):
+        super().__init__(**kwargs)
+        self.stamps = stamps
+
+    async def stream_response(self, *args, **kwargs):
+        self.stamps.append(1)
+        async for event in super().stream_response(*args, **kwargs):
+            yield event
+        self.stamps.append(-1)
+
+
+def most_in_flight(stamps: list[int]) -> int:
+    return max(itertools.accumulate(stamps), default=0)
+
+
+def test_players_get_their_own_conversation_and_game(copilot):
+    stamps: list[int] = []
+
+    def new_agent():
+        agent = copilot.build_agent()
+        agent.model = StampedModel(stamps, latency=0.2)
+        return agent
+
+    async def play():
+        server = CopilotServer(new_agent, on_close=copilot.end_session)
+        port = await server.start(port=0)
+        try:
+            await request(port, "POST", "/sessions/alice/turn", "look")
+            assert most_in_flight(stamps) == 1
+            alice, bob = await asyncio.gather(
+                request(port, "POST", "/sessions/alice/turn", "score"),
+                request(port, "POST", "/sessions/bob/turn", "score"),
+            )
+            # both players' turns ran at once: one's model call started before the other's ended
+            assert most_in_flight(stamps) == 2
+            stats = json.loads((await request(port, "GET", "/stats"))[1])
+            ended = await request(port, "DELETE", "/sessions/bob")
+            again = await request(port, "DELETE", "/sessions/bob")
+            empty = await request(port, "POST", "/sessions/bob/turn", "")
+            # would share a journal and map file with "alice_"
+            unsafe = await request(port, "POST", "/sessions/alice!/turn", "look")
+            return alice, bob, stats, ended, again, empty, unsafe
+        finally:
+            await server.close()
+
+    alice, bob, stats, ended, again, empty, unsafe = asyncio.run(play())
+    assert alice[0] == bob[0] == 200
+    assert "using 2 turns" in alice[1]
+    assert "using 1 turns" in bob[1]
+    assert stats["sessions"] == 2 and stats["active_turns"] == 0
+    assert ended[0] == 200 and again[0] == 404
+    assert empty[0] == 400
+    assert unsafe[0] == 400 and "session ids" in unsafe[1]
+
+
+def test_fast_path_answers_without_the_model(copilot):
+    model = FakeModel()
+
+    def new_agent():
+        agent = copilot.build_agent()
+        agent.model = model
+        return agent
+
+    async def play():
+        server = CopilotServer(new_agent, router=copilot.play_direct, on_close=copilot.end_session)
+        port = await server.start(port=0)
+        try:
+            reply = await request(port, "POST", "/sessions/carol/turn", "score")
+            return reply, list(server.sessions["carol"].items)
+        finally:
+            await server.close()
+
+    (status, body), items = asyncio.run(play())
+    assert status == 200 and "using 1 turns" in body
+    assert model.calls == 0
+    assert [item["role"] for item in items] == ["user", "assistant"]
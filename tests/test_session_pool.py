@@ -0,0 +1,78 @@
+import threading
+import time
+
+from advent_session import AdventSession, SessionPool
+from journal import JournalStore
+
+
+class SlowSession:
+    """Takes a while to start, so concurrent acquires overlap the spawn."""
+
+    def __init__(self):
+        self.alive = False
+        self.stopped = False
+        self.log = None
+
+    def start(self) -> None:
+        time.sleep(0.2)
+        self.alive = True
+
+    def stop(self) -> None:
+        self.alive = False
+        self.stopped = True
+
+    def isalive(self) -> bool:
+        return self.alive
+
+
+def test_concurrent_acquire_shares_one_lease():
+    pool = SessionPool(size=0, factory=SlowSession)
+    got = []
+    threads = [threading.Thread(target=lambda: got.append(pool.acquire("p"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(got) == 4
+    assert all(s is got[0] for s in got)
+    stats = pool.stats()
+    assert stats["spawned"] == 1
+    assert stats["leased"] == 1
+    pool.close()
+
+
+def test_acquire_takes_warm_session_and_refills():
+    pool = SessionPool(size=1, factory=SlowSession)
+    pool.fill()
+    warm = pool._idle[0]
+    assert pool.acquire("a") is warm
+    assert pool.metrics.hits == 1
+    pool.release("a")
+    pool.close()
+
+
+def test_dead_idle_sessions_are_stopped():
+    pool = SessionPool(size=2, factory=SlowSession)
+    pool.fill()
+    dead = list(pool._idle)
+    for session in dead:
+        session.alive = False  # the game died while waiting in the pool
+    fresh = pool.acquire("a")
+    assert fresh not in dead and fresh.alive
+    deadline = time.monotonic() + 5
+    while not all(s.stopped for s in dead) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert all(s.stopped for s in dead)
+    pool.close()
+
+
+def test_pooled_game_plays_and_resets(fake_game, tmp_path):
+    pool = SessionPool(size=1, factory=lambda: AdventSession(game=fake_game),
+                       journals=JournalStore(str(tmp_path)))
+    pool.fill()
+    session = pool.acquire("s")
+    assert "You said 'look'" in session.eval("look")
+    fresh = pool.reset("s")
+    assert fresh is not session
+    assert fresh.log.commands == []
+    pool.close()
@@ -0,0 +1,64 @@
+import sys
+import time
+
+from procio import Process, PromptProtocol
+from timeouts import MIN_SAMPLES, AdaptiveTimeout
+
+# answers "stall" in two parts a second apart; the prompt only comes with the second
+STALLING = '''
+import sys, time
+sys.stdout.write("ready\\n> ")
+sys.stdout.flush()
+for line in sys.stdin:
+    if line.strip() == "stall":
+        sys.stdout.write("first part\\n")
+        sys.stdout.flush()
+        time.sleep(1.0)
+        sys.stdout.write("second part\\n> ")
+    else:
+        sys.stdout.write("You said %r.\\n> " % line.strip())
+    sys.stdout.flush()
+'''
+
+
+def test_deadline_follows_observed_latency():
+    t = AdaptiveTimeout(floor=0.5, ceiling=10.0, factor=4, quiet_floor=0.1)
+    # too few samples: the ceiling
+    t.observe("move", 0.2)
+    assert t.timeout("move") == 10.0 and t.quiet("move") == 10.0
+    for _ in range(MIN_SAMPLES):
+        t.observe("move", 0.2)
+    assert t.timeout("move") == 0.8
+    assert abs(t.quiet("move") - 0.4) < 1e-9
+    # a class without its own history borrows from all commands
+    assert t.timeout("take") == 0.8
+    # clamped at both ends
+    for _ in range(MIN_SAMPLES):
+        t.observe("save", 0.01)
+    assert t.timeout("save") == 0.5
+    for _ in range(MIN_SAMPLES):
+        t.observe("load", 60.0)
+    assert t.timeout("load") == 10.0
+    t.timed_out("load")
+    t.quiesced("load")
+    stats = t.stats()["load"]
+    assert (stats["n"], stats["timeouts"], stats["quiesced"]) == (MIN_SAMPLES, 1, 1)
+
+
+def test_quiet_output_completes_a_response_without_its_prompt(tmp_path):
+    script = tmp_path / "stalling.py"
+    script.write_text(STALLING)
+    proc = Process([sys.executable, str(script)], PromptProtocol("> "), name="stalling")
+    proc.start()
+    try:
+        result = proc.run("stall", timeout=5.0, quiet=0.3)
+        # returned in the gap, before the game wrote the second part
+        assert result.quiesced
+        assert result.output == "first part"
+        # the late rest of that response is not taken for the next one's
+        time.sleep(1.0)
+        result = proc.run("look", timeout=5.0, quiet=0.3)
+        assert not result.quiesced
+        assert result.output == "You said 'look'."
+    finally:
+        proc.stop()
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from tracing import SESSION, Tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.span("game.read", "io"):
+        pass
+    tracer.complete("model", 0.0, 1.0)
+    assert tracer.events == []
+    assert tracer.span("a") is tracer.span("b")
+    assert tracer.export("unused.json") is None
+
+
+def test_spans_land_on_their_session_row_and_export(tmp_path):
+    tracer = Tracer(enabled=True)
+
+    async def turn(sid: str) -> None:
+        SESSION.set(sid)
+        with tracer.span("turn", "turn", player=sid):
+            with tracer.span("game.read", "io", command="look"):
+                await asyncio.sleep(0.01)
+
+    async def serve():
+        await asyncio.gather(turn("alice"), turn("bob"))
+
+    asyncio.run(serve())
+    rows = {e["args"]["name"]: e["tid"] for e in tracer.events if e["ph"] == "M"}
+    assert sorted(rows) == ["alice", "bob"]
+    spans = [e for e in tracer.events if e["ph"] == "X"]
+    assert len(spans) == 4
+    for e in spans:
+        assert e["dur"] >= 10_000  # microseconds
+    alice = [e for e in spans if e["tid"] == rows["alice"]]
+    read, whole = sorted(alice, key=lambda e: e["dur"])
+    assert (read["name"], whole["name"]) == ("game.read", "turn")
+    # nested: the read lies inside its turn
+    assert whole["ts"] <= read["ts"] and read["ts"] + read["dur"] <= whole["ts"] + whole["dur"]
+    assert whole["args"] == {"player": "alice"}
+
+    path = tracer.export(str(tmp_path / "trace.json"))
+    trace = json.loads(open(path).read())
+    assert trace["traceEvents"] == tracer.events
+    assert trace["otherData"] == {"dropped_events": 0}
+
+
+def test_events_past_the_limit_are_counted_not_kept():
+    tracer = Tracer(enabled=True, max_events=3)
+    for n in range(5):
+        tracer.complete(f"e{n}", 0.0, 1.0, session="main")
+    # one row name and two spans fit
+    assert len(tracer.events) == 3 and tracer.dropped == 3
+    assert tracer.chrome()["otherData"]["dropped_events"] == 3
@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import defaultdict, deque
+from typing import Optional
+
+from metrics import METRICS, percentile
+
+# Bounds for every adaptive deadline, in seconds
+FLOOR = float(os.environ.get("ADVENT_TIMEOUT_FLOOR", "2.0"))
+CEILING = float(os.environ.get("ADVENT_TIMEOUT_CEILING", "15.0"))
+# deadline = FACTOR x this percentile of the recent latencies
+PERCENTILE = float(os.environ.get("ADVENT_TIMEOUT_PERCENTILE", "99"))
+FACTOR = float(os.environ.get("ADVENT_TIMEOUT_FACTOR", "4"))
+# output that has been silent this long (at least) counts as a whole response
+QUIET_FLOOR = float(os.environ.get("ADVENT_QUIET_FLOOR", "0.25"))
+
+WINDOW = 256      # latencies kept per class
+MIN_SAMPLES = 16  # fewer than this and the class borrows from "all", then CEILING
+
+
+class AdaptiveTimeout:
+    """
+    Deadlines learned from how long responses actually take.
+
+    observe(cls, seconds) adds a latency to a rolling window for its class
+    (e.g. "move", "take", "spawn") and to the session-wide "all" window.
+    timeout(cls) is FACTOR x the PERCENTILE of that window, clamped to
+    [floor, ceiling]; until a class has MIN_SAMPLES it uses "all", and until
+    that has enough it is the ceiling. quiet(cls) is how long output may
+    stall mid-response before the response is taken as complete, for when
+    the end-of-response marker is never seen.
+    """
+
+    def __init__(
+        self,
+        floor: float = FLOOR,
+        ceiling: float = CEILING,
+        pct: float = PERCENTILE,
+        factor: float = FACTOR,
+        quiet_floor: float = QUIET_FLOOR,
+        window: int = WINDOW,
+        name: str = "game",
+    ):
+        self.floor, self.ceiling, self.pct, self.factor = floor, ceiling, pct, factor
+        self.quiet_floor, self.name = quiet_floor, name
+        self._samples: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._counts: dict[str, dict[str, int]] = defaultdict(lambda: {"timeouts": 0, "quiesced": 0})
+        self._lock = threading.Lock()
+
+    def _window(self, cls: str) -> Optional[list[float]]:
+        for key in (cls, "all"):
+            samples = self._samples.get(key)
+            if samples is not None and len(samples) >= MIN_SAMPLES:
+                return list(samples)
+        return None
+
+    def timeout(self, cls: str = "all") -> float:
+        with self._lock:
+            samples = self._window(cls)
+        if samples is None:
+            return self.ceiling
+        return min(self.ceiling, max(self.floor, self.factor * percentile(samples, self.pct)))
+
+    def quiet(self, cls: str = "all") -> float:
+        with self._lock:
+            samples = self._window(cls)
+        if samples is None:
+            return self.ceiling
+        return min(self.ceiling, max(self.quiet_floor, 2 * percentile(samples, self.pct)))
+
+    def observe(self, cls: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[cls].append(seconds)
+            if cls != "all":
+                self._samples["all"].append(seconds)
+
+    def timed_out(self, cls: str) -> None:
+        with self._lock:
+            self._counts[cls]["timeouts"] += 1
+        METRICS.count(f"{self.name}.timeouts_adaptive")
+
+    def quiesced(self, cls: str) -> None:
+        """A response was taken as complete because its output went quiet."""
+        with self._lock:
+            self._counts[cls]["quiesced"] += 1
+        METRICS.count(f"{self.name}.quiesced")
+
+    def stats(self) -> dict:
+        """Per class: sample count, p50/p99 latency, current deadline and quiet window, misses."""
+        with self._lock:
+            classes = sorted(set(self._samples) | set(self._counts))
+            snapshot = {cls: list(self._samples.get(cls, ())) for cls in classes}
+            counts = {cls: dict(self._counts.get(cls, {"timeouts": 0, "quiesced": 0})) for cls in classes}
+        out = {}
+        for cls in classes:
+            samples = snapshot[cls]
+            out[cls] = {
+                "n": len(samples),
+                "p50": percentile(samples, 50) if samples else None,
+                "p99": percentile(samples, 99) if samples else None,
+                "timeout": self.timeout(cls),
+                "quiet": self.quiet(cls),
+                **counts[cls],
+            }
+        return out
@@ -0,0 +1,99 @@
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, ContextManager, Iterator, Optional
+
+# Set ADVENT_TRACE=trace.json to record spans and write them there on exit;
+# open the file in https://ui.perfetto.dev or chrome://tracing
+TRACE_PATH = os.environ.get("ADVENT_TRACE")
+# events kept in memory; later ones are counted and dropped
+MAX_EVENTS = int(os.environ.get("ADVENT_TRACE_MAX_EVENTS", "500000"))
+
+# The conversation being served; each one gets its own row in the trace
+SESSION: contextvars.ContextVar[str] = contextvars.ContextVar("trace_session", default="main")
+
+_NULL = contextlib.nullcontext()
+
+
+class Tracer:
+    """
+    Spans in Chrome trace event format.
+
+    span() is a context manager that records one complete ("X") event on
+    the current session's row; complete() records one from timestamps
+    taken elsewhere (e.g. agent hooks). While disabled, span() hands back a
+    shared no-op context manager and nothing is allocated or stored.
+    """
+
+    def __init__(self, enabled: bool = False, max_events: int = MAX_EVENTS):
+        self.enabled, self.max_events = enabled, max_events
+        self.events: list[dict] = []
+        self.dropped = 0
+        self._pid = os.getpid()
+        self._rows: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now() -> float:
+        """Microseconds, in the clock span timestamps use."""
+        return time.perf_counter_ns() / 1000
+
+    def _row(self, session: str) -> int:
+        tid = self._rows.get(session)
+        if tid is None:
+            with self._lock:
+                tid = self._rows.get(session)
+                if tid is None:
+                    tid = self._rows[session] = len(self._rows) + 1
+                    self.events.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                                        "args": {"name": session}})
+        return tid
+
+    def complete(self, name: str, start: float, end: float, cat: str = "", session: Optional[str] = None,
+                 **args: Any) -> None:
+        if not self.enabled:
+            return
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        event = {"name": name, "cat": cat, "ph": "X", "ts": start, "dur": end - start, "pid": self._pid,
+                 "tid": self._row(session or SESSION.get())}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def _span(self, name: str, cat: str, args: dict) -> Iterator[None]:
+        session = SESSION.get()
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.complete(name, start, self.now(), cat, session, **args)
+
+    def span(self, name: str, cat: str = "", **args: Any) -> ContextManager:
+        """Time the body as one event named `name`, with `args` shown on it."""
+        if not self.enabled:
+            return _NULL
+        return self._span(name, cat, args)
+
+    def chrome(self) -> dict:
+        return {"traceEvents": list(self.events), "displayTimeUnit": "ms",
+                "otherData": {"dropped_events": self.dropped}}
+
+    def export(self, path: Optional[str] = None) -> Optional[str]:
+        """Write the trace as JSON to `path` (default ADVENT_TRACE); returns the path written."""
+        path = path or TRACE_PATH
+        if not self.enabled or not path:
+            return None
+        with open(path, "w") as f:
+            json.dump(self.chrome(), f)
+        return path
+
+
+# Process-wide tracer
+TRACER = Tracer(enabled=bool(TRACE_PATH))
+span = TRACER.span